@@ -0,0 +1,161 @@
+"""
+GMGN 分析结果缓存 - analyze 的统计状态保存在快照旁的 .analysis 文件中
+缓存以快照的大小、修改时间和内容哈希为键：大小和修改时间都没变时直接命中，
+只有修改时间变了（例如复制、touch）时再计算内容哈希确认。
+快照没变、日志（.journal / .journal.N）只在末尾追加了新用户时，从上次读到的位置继续读日志，
+把新用户累加到保存的 UserStats 状态上；日志中出现已有用户的更新、日志被轮转或快照被压缩重写时完整重新计算
+"""
+import hashlib
+import os
+from pathlib import Path
+from binary_snapshot import MappedSnapshot, binary_path_for
+from journal_store import JournalStore, read_journal
+from json_codec import dumps_bytes, loads
+from json_stream import SnapshotReader
+from user_stats import UserStats
+from user_table import _user_id, _user_key
+
+# 缓存格式版本，UserStats 状态的结构变化时递增
+CACHE_VERSION = 1
+# 计算内容哈希时每次读取的字节数
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def cache_path_for(snapshot_file):
+    """快照对应的缓存文件: gmgn_users_dedup.json -> gmgn_users_dedup.json.analysis"""
+    snapshot_file = Path(snapshot_file)
+    return snapshot_file.with_name(snapshot_file.name + '.analysis')
+
+
+def file_hash(path):
+    """文件内容的 blake2b 哈希"""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    def __init__(self, snapshot_file):
+        self.snapshot_file = Path(snapshot_file)
+        self.cache_file = cache_path_for(self.snapshot_file)
+        self.journal = JournalStore(self.snapshot_file, history=False, handle_index=False)
+        self.status = None  # hit / incremental / full
+        self.new_users = 0  # 增量更新时累加的用户数
+
+    def _load(self):
+        try:
+            with open(self.cache_file, 'rb') as f:
+                cache = loads(f.read())
+        except (OSError, ValueError):
+            return None
+        return cache if isinstance(cache, dict) and cache.get('version') == CACHE_VERSION else None
+
+    def _save(self, cache):
+        tmp_file = self.cache_file.with_name(self.cache_file.name + '.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(dumps_bytes(cache))
+        os.replace(tmp_file, self.cache_file)
+
+    def _snapshot_key(self, cached=None):
+        """快照的 (大小, 修改时间, 内容哈希)；大小和修改时间与缓存一致时沿用缓存的哈希"""
+        stat = self.snapshot_file.stat()
+        if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+            return dict(cached)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': file_hash(self.snapshot_file)}
+
+    def _journal_sizes(self):
+        return [(path.name, path.stat().st_size) for path in self.journal.journal_files()]
+
+    def stats(self, use_cache=True):
+        """返回 (UserStats, last_updated)，并按需要更新缓存文件"""
+        cache = self._load() if use_cache else None
+        if cache is not None:
+            snapshot = self._snapshot_key(cache['snapshot'])
+            if snapshot['size'] == cache['snapshot']['size'] and snapshot['hash'] == cache['snapshot']['hash']:
+                result = self._incremental(cache, snapshot)
+                if result is not None:
+                    return result
+        return self._full()
+
+    def _incremental(self, cache, snapshot):
+        """快照内容没变：日志没变时直接命中，只追加了新用户时累加，否则返回 None"""
+        offsets = dict(cache['journals'])
+        sizes = self._journal_sizes()
+        if any(name in offsets and size < offsets[name] for name, size in sizes) \
+                or not set(offsets) <= {name for name, _ in sizes}:
+            return None  # 日志被轮转或截断
+
+        stats = UserStats.from_state(cache['stats'])
+        if snapshot != cache['snapshot'] or any(size != offsets.get(name) for name, size in sizes):
+            entries = []
+            journals = []
+            for path in self.journal.journal_files():
+                batch, offset = read_journal(path, offsets.get(path.name, 0))
+                entries += batch
+                journals.append((path.name, offset))
+
+            added = [user for entry in entries for user in entry.get('users', [])]
+            if added:
+                base = MappedSnapshot.open(binary_path_for(self.snapshot_file), self.snapshot_file)
+                if base is None:
+                    return None  # 没有可用的二进制快照，无法快速判断是否为已有用户
+                known = set(cache['journal_ids'])
+                for user in added:
+                    key = _user_id(_user_key(user['user_id']))
+                    if key in known or base.find(user['user_id']) is not None:
+                        return None  # 已有用户被更新，统计无法按差值修正
+                    known.add(key)
+                    stats.add(user)
+                cache['journal_ids'] = list(known)
+                cache['last_updated'] = entries[-1].get('ts', cache['last_updated'])
+                self.new_users = len(added)
+
+            cache['snapshot'] = snapshot
+            cache['journals'] = journals
+            cache['stats'] = stats.state()
+            self._save(cache)
+        self.status = 'incremental' if self.new_users else 'hit'
+        return stats, cache['last_updated']
+
+    def _full(self):
+        """完整计算：快照 + 日志"""
+        snapshot = self._snapshot_key()
+        journals = []
+        journal_ids = set()
+        last_updated = None
+        for path in self.journal.journal_files():
+            entries, offset = read_journal(path)
+            journals.append((path.name, offset))
+            for entry in entries:
+                journal_ids.update(_user_id(_user_key(user['user_id'])) for user in entry.get('users', []))
+                last_updated = entry.get('ts', last_updated)
+
+        if journal_ids:
+            # 日志中有数据：按 JournalStore 的方式合并快照和日志后统计（与爬虫加载的结果一致）
+            self.journal.load()
+            stats = UserStats().add_all(self.journal.users.values())
+        else:
+            # 流式读取快照，一次遍历完成全部统计，不保留用户列表
+            reader = SnapshotReader(self.snapshot_file)
+            stats = UserStats().add_all(reader)
+            last_updated = reader.meta.get('last_updated', 'N/A')
+
+        self._save({
+            'version': CACHE_VERSION,
+            'snapshot': snapshot,
+            'journals': journals,
+            'journal_ids': sorted(journal_ids),
+            'last_updated': last_updated,
+            'stats': stats.state(),
+        })
+        self.status = 'full'
+        return stats, last_updated
+
+    def describe(self):
+        return {
+            'hit': '统计缓存: 命中（数据未变化）',
+            'incremental': f'统计缓存: 增量更新（新增 {self.new_users} 个用户）',
+            'full': '统计缓存: 已重新计算',
+        }.get(self.status, '')
@@ -1,78 +1,105 @@
 """
 GMGN 用户数据分析工具
 分析已抓取的用户数据，生成统计报告
+支持 JSON 快照文件和 SQLite 数据库（.db）两种数据源
 """
-import json
+import time
+from datetime import datetime
 from pathlib import Path
-from collections import Counter
+from sqlite_store import SqliteStore
+from json_stream import SnapshotReader
+from analysis_cache import AnalysisCache
+from query_index import QueryIndex, QUERY_LIMIT
+from handle_search import HandleIndex, MIN_SIMILARITY, SEARCH_LIMIT
+from journal_store import JournalStore
+from binary_snapshot import MappedSnapshot, binary_path_for
+from user_stats import PERCENTILES, TOP_K, TAG_TOP_K, TOP_TAGS
+from tag_export import export_tags, EXPORT_WORKERS
+from columnar_export import export_columnar
+from follower_history import history_path_for, load_series
 
-def analyze_users(json_file='gmgn_users_dedup.json'):
-    """分析用户数据"""
+def collect_stats_sqlite(store):
+    """从 SQLite 数据库计算统计数据（聚合和 Top-N 都走索引查询）"""
+    tag_counts = store.tag_counts()
+    followers = store.follower_stats()
+    followers['percentiles'] = {p: store.follower_percentile(p) for p in PERCENTILES}
+    return {
+        'total_users': store.count(),
+        'tag_counts': tag_counts,
+        'followers': followers,
+        'top_users': store.top_users(TOP_K),
+        'platform_counts': store.platform_counts(),
+        'tag_top_users': [(tag, count, store.top_users(TAG_TOP_K, tag=tag)) for tag, count in tag_counts[:TOP_TAGS]],
+    }
+
+def open_sqlite(db_path):
+    """以只读分析的方式打开数据库（不导出 JSON）"""
+    return SqliteStore(db_path.with_suffix('.json'), db_file=db_path, export_json=False)
+
+def analyze_users(json_file='gmgn_users_dedup.json', use_cache=True):
+    """分析用户数据（JSON 快照的统计结果缓存在 .analysis 文件中，use_cache=False 时重新计算）"""
     json_path = Path(json_file)
 
     if not json_path.exists():
         print(f"错误: 文件 {json_file} 不存在")
         return
 
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    if json_path.suffix == '.db':
+        store = open_sqlite(json_path)
+        stats = collect_stats_sqlite(store)
+        last_updated = store.last_updated()
+    else:
+        # 数据没变化时直接使用缓存的统计状态，日志只追加了新用户时增量累加
+        cache = AnalysisCache(json_path)
+        user_stats, last_updated = cache.stats(use_cache)
+        stats = user_stats.report()
+
+    print_report(stats, json_path.absolute(), last_updated)
+    if json_path.suffix != '.db':
+        print(f"\n⚡ {cache.describe()}")
 
-    users = data.get('users', [])
-    total_users = len(users)
+def print_report(stats, source, last_updated='N/A'):
+    """打印统计报告（stats 为 UserStats/LiveStats.report() 或 collect_stats_sqlite 的结果）"""
+    total_users = stats['total_users']
 
     print("=" * 60)
     print("GMGN 用户数据分析报告")
     print("=" * 60)
-    print(f"数据文件: {json_path.absolute()}")
-    print(f"最后更新: {data.get('last_updated', 'N/A')}")
+    print(f"数据文件: {source}")
+    print(f"最后更新: {last_updated}")
     print(f"总用户数: {total_users}\n")
 
     if total_users == 0:
         print("没有数据可分析")
         return
 
-    # 统计标签分布
-    all_tags = []
-    for user in users:
-        all_tags.extend(user.get('user_tags', []))
-
-    tag_counter = Counter(all_tags)
-
     print("📊 用户标签分布:")
     print("-" * 60)
-    for tag, count in tag_counter.most_common():
+    for tag, count in stats['tag_counts']:
         percentage = (count / total_users) * 100
         print(f"  {tag:20s} {count:6d} 个用户 ({percentage:.1f}%)")
 
-    # 统计粉丝数
-    followers_list = [user.get('followers', 0) for user in users]
-    avg_followers = sum(followers_list) / len(followers_list) if followers_list else 0
-    max_followers = max(followers_list) if followers_list else 0
-    min_followers = min(followers_list) if followers_list else 0
-
     print(f"\n📈 粉丝数统计:")
     print("-" * 60)
-    print(f"  平均粉丝数: {avg_followers:.0f}")
-    print(f"  最多粉丝数: {max_followers}")
-    print(f"  最少粉丝数: {min_followers}")
-
-    # Top 10 粉丝最多的用户
-    top_users = sorted(users, key=lambda x: x.get('followers', 0), reverse=True)[:10]
+    print(f"  平均粉丝数: {stats['followers']['avg']:.0f}")
+    print(f"  最多粉丝数: {stats['followers']['max']}")
+    print(f"  最少粉丝数: {stats['followers']['min']}")
+    # 实时统计的分位数是分桶上界
+    bound = '≤ ' if stats['followers'].get('approximate') else ''
+    print("  粉丝数分位: " + ' / '.join(
+        f"P{p} {bound}{value}" for p, value in stats['followers']['percentiles'].items()))
 
     print(f"\n🏆 Top 10 粉丝最多的用户:")
     print("-" * 60)
-    for i, user in enumerate(top_users, 1):
+    for i, user in enumerate(stats['top_users'], 1):
         handle = user.get('handle', 'N/A')
         followers = user.get('followers', 0)
         tags = ', '.join(user.get('user_tags', []))
         print(f"  {i:2d}. @{handle:20s} {followers:6d} 粉丝 [{tags}]")
 
-    # 统计平台分布
-    platform_counter = Counter([user.get('platform', 0) for user in users])
-
     print(f"\n🌐 平台分布:")
     print("-" * 60)
-    for platform, count in platform_counter.most_common():
+    for platform, count in stats['platform_counts']:
         platform_name = "Twitter" if platform == 0 else f"Platform {platform}"
         percentage = (count / total_users) * 100
         print(f"  {platform_name:20s} {count:6d} 个用户 ({percentage:.1f}%)")
@@ -80,12 +107,8 @@ def analyze_users(json_file='gmgn_users_dedup.json'):
     # 按标签分组的Top用户
     print(f"\n📋 按标签分类的热门用户:")
     print("-" * 60)
-    for tag, _ in tag_counter.most_common(5):  # 只显示前5个标签
-        tag_users = [u for u in users if tag in u.get('user_tags', [])]
-        tag_users.sort(key=lambda x: x.get('followers', 0), reverse=True)
-        top_tag_users = tag_users[:3]  # 每个标签显示前3个用户
-
-        print(f"\n  [{tag}] - {len(tag_users)} 个用户")
+    for tag, count, top_tag_users in stats['tag_top_users']:
+        print(f"\n  [{tag}] - {count} 个用户")
         for i, user in enumerate(top_tag_users, 1):
             handle = user.get('handle', 'N/A')
             followers = user.get('followers', 0)
@@ -93,60 +116,265 @@ def analyze_users(json_file='gmgn_users_dedup.json'):
 
     print("\n" + "=" * 60)
 
-def export_by_tag(json_file='gmgn_users_dedup.json', output_dir='exports'):
-    """按标签导出用户数据"""
+def export_by_tag(json_file='gmgn_users_dedup.json', output_dir='exports', workers=EXPORT_WORKERS, force=False):
+    """按标签导出用户数据（只重新导出内容有变化的标签）"""
     json_path = Path(json_file)
 
     if not json_path.exists():
         print(f"错误: 文件 {json_file} 不存在")
         return
 
-    with open(json_path, 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    users = data.get('users', [])
     output_path = Path(output_dir)
-    output_path.mkdir(exist_ok=True)
+    exported, skipped, removed = export_tags(json_path, output_path, workers, force)
+
+    for tag, count in exported.items():
+        output_file = output_path / f"{tag}_users.json"
+        print(f"✅ 导出 {tag}: {count} 个用户 -> {output_file}")
+    if skipped:
+        print(f"⏭️  未变化，跳过 {len(skipped)} 个标签: {', '.join(skipped)}")
+    if removed:
+        print(f"🗑️  已不存在，删除 {len(removed)} 个标签的文件: {', '.join(removed)}")
+
+    print(f"\n所有标签已导出到: {output_path.absolute()}")
+
+def import_sqlite(json_file='gmgn_users_dedup.json', db_file=None):
+    """把 JSON 快照和尚未压缩的日志（.journal / .journal.N）导入 SQLite 数据库，与首次加载数据库时的导入一致"""
+    json_path = Path(json_file)
+
+    if not json_path.exists() and not JournalStore(json_path, history=False, handle_index=False).journal_files():
+        print(f"错误: 文件 {json_file} 不存在")
+        return
+
+    store = SqliteStore(json_path, db_file=db_file, export_json=False)
+    count = store.import_journal_store()
+    print(f"✅ 导入 {count} 个用户 -> {store.db_file.absolute()}")
+
+def export_json(db_file='gmgn_users_dedup.db', json_file=None):
+    """把 SQLite 数据库导出为 JSON 快照"""
+    db_path = Path(db_file)
+
+    if not db_path.exists():
+        print(f"错误: 文件 {db_file} 不存在")
+        return
+
+    json_path = Path(json_file) if json_file else db_path.with_suffix('.json')
+    count = open_sqlite(db_path).export(json_path)
+    print(f"✅ 导出 {count} 个用户 -> {json_path.absolute()}")
+
+def export_columnar_file(json_file='gmgn_users_dedup.json', output_file=None, file_format=None, dataset=None):
+    """导出为 Parquet / Arrow IPC / CSV 列式文件（用户数据或 KOL 数据）"""
+    json_path = Path(json_file)
+
+    if not json_path.exists():
+        print(f"错误: 文件 {json_file} 不存在")
+        return
+
+    try:
+        output_path, rows = export_columnar(json_path, output_file, file_format, dataset)
+    except (ValueError, RuntimeError) as e:
+        print(f"错误: {e}")
+        return
+    print(f"✅ 导出 {rows} 行 -> {output_path.absolute()}")
+
+def show_history(json_file='gmgn_users_dedup.json', who=None, top=10):
+    """显示粉丝数历史：指定用户（handle 或 user_id）时打印完整序列，否则列出增长最多的用户"""
+    json_path = Path(json_file)
+    if json_path.suffix == '.db':
+        json_path = json_path.with_suffix('.json')
+    history_path = history_path_for(json_path)
+
+    if not history_path.exists():
+        print(f"错误: 历史文件 {history_path} 不存在（爬虫运行时才会记录）")
+        return
+
+    if json_file.endswith('.db'):
+        users = open_sqlite(Path(json_file)).iter_users()
+    elif json_path.exists():
+        users = SnapshotReader(json_path, 'users')
+    else:
+        users = []
+
+    if who:
+        handle = who.lstrip('@').lower()
+        user_id = who
+        for user in users:
+            if str(user.get('handle', '')).lower() == handle or str(user['user_id']) == who:
+                user_id, handle = str(user['user_id']), user.get('handle')
+                break
+        points = load_series(history_path, [user_id]).get(str(user_id), [])
+        if not points:
+            print(f"没有 {who} 的历史记录")
+            return
 
-    # 按标签分组
-    tag_groups = {}
+        print(f"\n📈 @{handle} ({user_id}) 粉丝数历史，共 {len(points)} 个点:")
+        previous = None
+        for timestamp, followers in points:
+            change = '' if previous is None else f" ({followers - previous:+,})"
+            print(f"  {datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')}  {followers:>12,}{change}")
+            previous = followers
+        return
+
+    series = load_series(history_path)
+    growth = sorted(((points[-1][1] - points[0][1], user_id) for user_id, points in series.items()
+                     if len(points) > 1), reverse=True)[:top]
+    handles = {user_id: None for _, user_id in growth}
     for user in users:
-        for tag in user.get('user_tags', []):
-            if tag not in tag_groups:
-                tag_groups[tag] = []
-            tag_groups[tag].append(user)
+        if str(user['user_id']) in handles:
+            handles[str(user['user_id'])] = user.get('handle')
 
-    # 导出每个标签
-    for tag, tag_users in tag_groups.items():
-        tag_users.sort(key=lambda x: x.get('followers', 0), reverse=True)
+    print(f"\n📈 粉丝数历史: {len(series)} 个用户, {sum(len(points) for points in series.values())} 个点")
+    print(f"\n🚀 增长最多的 {len(growth)} 个用户:")
+    for i, (change, user_id) in enumerate(growth, 1):
+        points = series[user_id]
+        print(f"  {i:2d}. @{handles[user_id] or user_id}: {points[0][1]:,} -> {points[-1][1]:,} ({change:+,})")
 
-        output_file = output_path / f"{tag}_users.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump({
-                'tag': tag,
-                'total_users': len(tag_users),
-                'users': tag_users
-            }, f, ensure_ascii=False, indent=2)
+def query_users(json_file='gmgn_users_dedup.json', tags=(), min_followers=None, max_followers=None, platform=None,
+                handle_prefix=None, sort='followers', limit=QUERY_LIMIT, show=True, rebuild=False):
+    """按标签 / 粉丝数区间 / 平台 / handle 前缀组合查询（走 .json.idx 查询索引），返回用户列表
 
-        print(f"✅ 导出 {tag}: {len(tag_users)} 个用户 -> {output_file}")
+    二进制快照（.json.bin）缺失或过期时会先生成它；rebuild 时强制重建索引和二进制快照
+    """
+    json_path = Path(json_file)
+    if json_path.suffix == '.db':
+        print("错误: query 只支持 JSON 快照（SQLite 数据库请直接用 SQL 查询）")
+        return []
+    if not json_path.exists():
+        print(f"错误: 文件 {json_file} 不存在")
+        return []
 
-    print(f"\n所有标签已导出到: {output_path.absolute()}")
+    index = QueryIndex.open(json_path, rebuild)
+    start = time.perf_counter()
+    users, plan = index.query(tags, min_followers, max_followers, platform, handle_prefix, sort, limit)
+    elapsed = (time.perf_counter() - start) * 1000
+    if show:
+        print(f"\n🔎 找到 {len(users)} 个用户（{plan}，耗时 {elapsed:.2f}ms）:")
+        for i, user in enumerate(users, 1):
+            tags_text = ','.join(user.get('user_tags', []))
+            print(f"  {i:3d}. @{user.get('handle') or 'N/A':20s} {user.get('followers') or 0:>10,} 粉丝  "
+                  f"[{tags_text}] platform={user.get('platform', 0)}")
+    return users
+
+def search_users(query, json_file='gmgn_users_dedup.json', limit=SEARCH_LIMIT, min_similarity=MIN_SIMILARITY, show=True):
+    """按 handle 模糊搜索（走 .json.trigram 索引，拼写不完全一致也能找到），返回结果列表"""
+    json_path = Path(json_file)
+    if json_path.suffix == '.db':
+        json_path = json_path.with_suffix('.json')
+        seed_users = open_sqlite(Path(json_file)).iter_users
+    else:
+        # handle 日志还不存在（爬虫没有运行过）时从快照和日志中的全部用户生成
+        def seed_users():
+            store = JournalStore(json_path, history=False, handle_index=False)
+            store.load()
+            return store.users.values()
+
+    if not Path(json_file).exists():
+        print(f"错误: 文件 {json_file} 不存在")
+        return []
+
+    index = HandleIndex.open(json_path, seed_users)
+    start = time.perf_counter()
+    results = index.search(query, limit, min_similarity)
+    elapsed = (time.perf_counter() - start) * 1000
+    if show:
+        # 有二进制快照时顺便显示粉丝数
+        base = MappedSnapshot.open(binary_path_for(json_path), json_path)
+        print(f"\n🔎 \"{query}\" 的相似 handle: {len(results)} 个（共 {len(index)} 个 handle，耗时 {elapsed:.2f}ms）")
+        for i, result in enumerate(results, 1):
+            row = base.find(result['user_id']) if base is not None else None
+            followers = f"{base.followers(row):>10,} 粉丝" if row is not None else ''
+            print(f"  {i:3d}. @{result['handle']:20s} 相似度 {result['similarity']:.2f}  "
+                  f"编辑距离 {result['distance']}  {followers}")
+    return results
 
 if __name__ == '__main__':
     import sys
 
     if len(sys.argv) > 1:
         command = sys.argv[1]
-        json_file = sys.argv[2] if len(sys.argv) > 2 else 'gmgn_users_dedup.json'
+        json_file = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith('--') else 'gmgn_users_dedup.json'
 
         if command == 'analyze':
-            analyze_users(json_file)
+            analyze_users(json_file, use_cache='--no-cache' not in sys.argv)
         elif command == 'export':
-            export_by_tag(json_file)
+            workers = EXPORT_WORKERS
+            if '--workers' in sys.argv:
+                idx = sys.argv.index('--workers')
+                if idx + 1 < len(sys.argv):
+                    workers = int(sys.argv[idx + 1])
+            export_by_tag(json_file, workers=workers, force='--force' in sys.argv)
+        elif command == 'export-columnar':
+            options = {}
+            for flag in ('--format', '--output', '--dataset'):
+                if flag in sys.argv:
+                    idx = sys.argv.index(flag)
+                    if idx + 1 < len(sys.argv):
+                        options[flag[2:]] = sys.argv[idx + 1]
+            export_columnar_file(json_file, options.get('output'), options.get('format'), options.get('dataset'))
+        elif command == 'history':
+            who, top = None, 10
+            if '--user' in sys.argv:
+                idx = sys.argv.index('--user')
+                if idx + 1 < len(sys.argv):
+                    who = sys.argv[idx + 1]
+            if '--top' in sys.argv:
+                idx = sys.argv.index('--top')
+                if idx + 1 < len(sys.argv):
+                    top = int(sys.argv[idx + 1])
+            show_history(json_file, who, top)
+        elif command == 'query':
+            options = {}
+            for flag in ('--tag', '--min', '--max', '--platform', '--handle', '--sort', '--limit'):
+                if flag in sys.argv:
+                    idx = sys.argv.index(flag)
+                    if idx + 1 < len(sys.argv):
+                        options[flag[2:]] = sys.argv[idx + 1]
+            query_users(json_file,
+                        tags=[tag for tag in options.get('tag', '').split(',') if tag],
+                        min_followers=int(options['min']) if 'min' in options else None,
+                        max_followers=int(options['max']) if 'max' in options else None,
+                        platform=int(options['platform']) if 'platform' in options else None,
+                        handle_prefix=options.get('handle', '').lstrip('@') or None,
+                        sort=options.get('sort', 'followers'),
+                        limit=int(options.get('limit', QUERY_LIMIT)),
+                        rebuild='--rebuild-index' in sys.argv)
+        elif command == 'search':
+            # python analyze_data.py search <handle> [json_file|db_file]
+            if len(sys.argv) < 3 or sys.argv[2].startswith('--'):
+                print("用法: python analyze_data.py search <handle> [json_file|db_file] [--limit N] [--min-similarity 0.3]")
+            else:
+                search_file = sys.argv[3] if len(sys.argv) > 3 and not sys.argv[3].startswith('--') \
+                    else 'gmgn_users_dedup.json'
+                limit, min_similarity = SEARCH_LIMIT, MIN_SIMILARITY
+                if '--limit' in sys.argv:
+                    idx = sys.argv.index('--limit')
+                    if idx + 1 < len(sys.argv):
+                        limit = int(sys.argv[idx + 1])
+                if '--min-similarity' in sys.argv:
+                    idx = sys.argv.index('--min-similarity')
+                    if idx + 1 < len(sys.argv):
+                        min_similarity = float(sys.argv[idx + 1])
+                search_users(sys.argv[2], search_file, limit, min_similarity)
+        elif command == 'import-sqlite':
+            import_sqlite(json_file, sys.argv[3] if len(sys.argv) > 3 else None)
+        elif command == 'export-json':
+            export_json(sys.argv[2] if len(sys.argv) > 2 else 'gmgn_users_dedup.db',
+                        sys.argv[3] if len(sys.argv) > 3 else None)
         else:
             print("用法:")
-            print("  python analyze_data.py analyze [json_file]  - 分析数据")
-            print("  python analyze_data.py export [json_file]   - 按标签导出")
+            print("  python analyze_data.py analyze [json_file|db_file] [--no-cache]  - 分析数据（结果缓存在 .analysis 文件中）")
+            print("  python analyze_data.py export [json_file|db_file] [--workers N] [--force]  - 按标签导出（跳过未变化的标签）")
+            print("  python analyze_data.py export-columnar [文件] [--format parquet|arrow|csv] [--output 文件] [--dataset users|kol]")
+            print("                                                        - 导出列式文件（Parquet/Arrow 需要 pyarrow）")
+            print("  python analyze_data.py history [json_file|db_file] [--user handle|user_id] [--top N]")
+            print("                                                        - 粉丝数历史（指定用户或增长排行）")
+            print("  python analyze_data.py query [json_file] [--tag kol,founder] [--min N] [--max N] [--platform N]")
+            print("                                  [--handle 前缀] [--sort followers|followers-asc|handle] [--limit N]")
+            print("                                  [--rebuild-index]")
+            print("                                                        - 组合查询（走 .json.idx 查询索引）")
+            print("  python analyze_data.py search <handle> [json_file|db_file] [--limit N] [--min-similarity 0.3]")
+            print("                                                        - handle 模糊搜索（走 .json.trigram 索引）")
+            print("  python analyze_data.py import-sqlite [json_file] [db_file]  - 导入 SQLite 数据库")
+            print("  python analyze_data.py export-json [db_file] [json_file]    - 从 SQLite 导出 JSON")
     else:
         # 默认执行分析
-        analyze_users()
\ No newline at end of file
+        analyze_users()
@@ -0,0 +1,291 @@
+"""
+GMGN API 直连翻页 - 复用浏览器捕获到的搜索请求，脱离浏览器自动翻页
+浏览器捕获到第一个 /vas/api/v1/twitter/user/search 响应后，记录请求的 URL 模板、
+请求头和 Cookie；之后并发地翻页、替换查询参数，结果与浏览器捕获的数据合并到同一个 users_dict。
+HTTP 请求由线程池中的 requests 完成（项目没有依赖异步 HTTP 客户端）：requests.Session
+不保证线程安全，每个工作线程使用自己的 Session 和连接池，计数和解析都在事件循环中进行
+"""
+import asyncio
+import json
+import sys
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import requests
+from requests.adapters import HTTPAdapter
+from crawler_metrics import metrics
+from json_codec import loads_async
+
+# 捕获到的请求模板保存位置
+TEMPLATE_FILE = 'api_template.json'
+# 同时进行的请求数
+REPLAY_CONCURRENCY = 4
+# 每组查询最多翻多少页
+REPLAY_MAX_PAGES = 50
+# 同一组查询两页之间的间隔（秒）
+REPLAY_PAGE_DELAY = 0.5
+
+# 响应 data 中可能表示下一页游标的字段
+CURSOR_FIELDS = ('next', 'cursor', 'next_cursor')
+# 不随模板重放的请求头（由 HTTP 客户端自行生成）
+SKIP_HEADERS = {'host', 'content-length', 'cookie', 'connection', 'accept-encoding'}
+
+
+class ApiTemplate:
+    def __init__(self, url, method='GET', headers=None, cookies=None, post_data=None):
+        self.url = url
+        self.method = method
+        self.headers = headers or {}
+        self.cookies = cookies or {}
+        self.post_data = post_data
+
+    @classmethod
+    async def from_response(cls, response, context):
+        """从浏览器捕获的响应中提取请求模板"""
+        request = response.request
+        headers = await request.all_headers()
+        cookies = await context.cookies(request.url)
+        return cls(
+            url=request.url,
+            method=request.method,
+            headers={k: v for k, v in headers.items()
+                     if not k.startswith(':') and k.lower() not in SKIP_HEADERS},
+            cookies={c['name']: c['value'] for c in cookies},
+            post_data=request.post_data,
+        )
+
+    @classmethod
+    def load(cls, path=TEMPLATE_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(**json.load(f))
+
+    def save(self, path=TEMPLATE_FILE):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'url': self.url,
+                'method': self.method,
+                'headers': self.headers,
+                'cookies': self.cookies,
+                'post_data': self.post_data,
+            }, f, ensure_ascii=False, indent=2)
+
+    @property
+    def params(self):
+        """模板 URL 中的查询参数；同名参数出现多次时无法按字典替换，直接报错"""
+        pairs = parse_qsl(urlsplit(self.url).query, keep_blank_values=True)
+        params = dict(pairs)
+        if len(params) != len(pairs):
+            counts = Counter(name for name, _ in pairs)
+            repeated = sorted(name for name, count in counts.items() if count > 1)
+            raise ValueError(f"请求模板中的查询参数重复，无法直连翻页: {', '.join(repeated)}")
+        return params
+
+    def build_url(self, params, base_url=None):
+        """用新的查询参数（以及可选的服务器地址）生成请求 URL"""
+        parts = urlsplit(self.url)
+        scheme, netloc = parts.scheme, parts.netloc
+        if base_url:
+            base = urlsplit(base_url)
+            scheme, netloc = base.scheme, base.netloc
+        return urlunsplit((scheme, netloc, parts.path, urlencode(params), ''))
+
+
+class ApiReplayer:
+    def __init__(self, template, merge, concurrency=REPLAY_CONCURRENCY, max_pages=REPLAY_MAX_PAGES,
+                 page_delay=REPLAY_PAGE_DELAY, base_url=None, cursor_param='cursor', page_param=None):
+        self.template = template
+        self.merge = merge  # 合并函数，返回新增用户数（例如 FlushWriter.merge）
+        self.concurrency = concurrency
+        self.max_pages = max_pages
+        self.page_delay = page_delay
+        self.base_url = base_url
+        self.cursor_param = cursor_param
+        self.page_param = page_param
+
+        # 每个工作线程一个 Session，线程内的请求复用连接
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='gmgn-replay')
+        self._local = threading.local()
+        self._sessions = []
+        self._sessions_lock = threading.Lock()
+        self._semaphore = None
+
+        # 统计信息
+        self.pages = 0
+        self.users = 0
+        self.new_users = 0
+        self.errors = 0
+
+    def _session(self):
+        """当前工作线程的 Session，第一次使用时创建"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1)
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            session.headers.update(self.template.headers)
+            session.cookies.update(self.template.cookies)
+            self._local.session = session
+            with self._sessions_lock:
+                self._sessions.append(session)
+        return session
+
+    def _fetch(self, url):
+        """在线程池中执行的同步请求，返回读取完响应体的 Response"""
+        return self._session().request(self.template.method, url,
+                                       data=self.template.post_data, timeout=15)
+
+    async def fetch(self, params):
+        url = self.template.build_url(params, self.base_url)
+        async with self._semaphore:
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(self.executor, self._fetch, url)
+        metrics.inc('responses_seen')
+        metrics.inc('responses_matched')
+        response.raise_for_status()
+        with metrics.time('parse'):
+            return await loads_async(response.content)
+
+    def _next_params(self, params, data, users):
+        """根据响应计算下一页的查询参数，没有下一页时返回 None"""
+        payload = data.get('data') or {}
+        if payload.get('has_more') is False:
+            return None
+
+        for field in CURSOR_FIELDS:
+            cursor = payload.get(field)
+            if cursor:
+                if cursor == params.get(self.cursor_param):
+                    return None
+                return {**params, self.cursor_param: cursor}
+
+        if self.page_param and str(params.get(self.page_param, '')).isdigit():
+            current = int(params[self.page_param])
+            # offset 类参数按本页条数递增，page 类参数加 1
+            step = len(users) if 'offset' in self.page_param else 1
+            return {**params, self.page_param: str(current + step)}
+
+        return None
+
+    async def crawl(self, overrides=None):
+        """按一组查询参数连续翻页，直到没有下一页或达到页数上限"""
+        params = {**self.template.params, **(overrides or {})}
+
+        for _ in range(self.max_pages):
+            try:
+                data = await self.fetch(params)
+            except Exception as e:
+                self.errors += 1
+                metrics.inc('errors')
+                print(f"❌ 请求失败: {e}")
+                return
+
+            if data.get('code') != 0 or 'users' not in (data.get('data') or {}):
+                return
+            users = data['data']['users']
+            if not users:
+                return
+
+            metrics.inc('responses_parsed')
+            new_users = self.merge(users)
+            self.pages += 1
+            self.users += len(users)
+            self.new_users += new_users
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] 🔁 直连第 {self.pages} 页: "
+                  f"{len(users)} 个用户，新增: {new_users} 个")
+
+            params = self._next_params(params, data, users)
+            if params is None:
+                return
+            await asyncio.sleep(self.page_delay)
+
+    async def run(self, variations=None):
+        """并发执行所有查询组合"""
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        try:
+            await asyncio.gather(*(self.crawl(overrides) for overrides in (variations or [{}])))
+        finally:
+            self.executor.shutdown(wait=True)
+            for session in self._sessions:
+                session.close()
+
+    def print_summary(self):
+        """打印直连统计"""
+        print(f"   - 直连翻页数: {self.pages}")
+        print(f"   - 直连获取用户: {self.users}，新增: {self.new_users}")
+        print(f"   - 直连请求失败: {self.errors}")
+
+
+def load_variations(path):
+    """读取查询组合文件：JSON 数组，每项是要覆盖的查询参数，例如 [{"q": "binance"}]"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+async def main():
+    from flush_writer import FlushWriter
+    from storage import open_store, STORAGE_BACKEND
+    try:
+        from config import STORAGE_BACKEND
+    except ImportError:
+        pass  # 使用 storage 中的默认值
+
+    def arg(name, default=None):
+        if name in sys.argv:
+            idx = sys.argv.index(name)
+            if idx + 1 < len(sys.argv):
+                return sys.argv[idx + 1]
+        return default
+
+    if '--help' in sys.argv or '-h' in sys.argv:
+        print("GMGN API 直连翻页")
+        print("\n用法:")
+        print("  python api_replay.py [选项]")
+        print("\n选项:")
+        print(f"  --template <文件>     请求模板（默认 {TEMPLATE_FILE}，由 v2 爬虫 --replay 模式生成）")
+        print("  --queries <文件>      查询组合文件，JSON 数组，例如 [{\"q\": \"binance\"}]")
+        print("  --base-url <地址>     替换请求的服务器地址，例如本地测试服务 http://127.0.0.1:8000")
+        print(f"  --concurrency <数量>  并发请求数（默认 {REPLAY_CONCURRENCY}）")
+        print(f"  --max-pages <数量>    每组查询最多翻页数（默认 {REPLAY_MAX_PAGES}）")
+        print("  --page-param <参数>   没有游标时用于翻页的查询参数，例如 offset 或 page")
+        print("  --output <文件名>     输出文件（默认 gmgn_users_dedup.json）")
+        return
+
+    template_file = arg('--template', TEMPLATE_FILE)
+    if not Path(template_file).exists():
+        print(f"错误: 模板文件 {template_file} 不存在，请先运行 python gmgn_crawler_v2.py --replay")
+        return
+
+    template = ApiTemplate.load(template_file)
+    queries = arg('--queries')
+    variations = load_variations(queries) if queries else None
+
+    store = open_store(arg('--output', 'gmgn_users_dedup.json'), STORAGE_BACKEND)  # 与爬虫使用同一存储后端
+    store.load()
+    print(f"✓ 加载已有数据: {len(store.users)} 个用户")
+    writer = FlushWriter(store)
+    writer.start()
+
+    replayer = ApiReplayer(
+        template, writer.merge,
+        concurrency=int(arg('--concurrency', REPLAY_CONCURRENCY)),
+        max_pages=int(arg('--max-pages', REPLAY_MAX_PAGES)),
+        base_url=arg('--base-url'),
+        page_param=arg('--page-param'),
+    )
+    try:
+        await replayer.run(variations)
+    finally:
+        writer.close()
+
+    print(f"\n📊 统计信息：")
+    replayer.print_summary()
+    print(f"   - 累计用户数（去重后）: {len(store.users)}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
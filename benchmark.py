@@ -0,0 +1,436 @@
+"""
+GMGN 爬虫性能基准测试
+启动本地假 gmgn 服务器（/vas/api/v1/twitter/user/search 返回合成用户，可调每页用户数和重复率），
+用无头 Chromium 驱动各个爬虫版本（请求拦截 vs 响应监听），测量每秒捕获数、合并延迟、
+保存延迟分位数和峰值内存；另外在不同数据量下单独测量存储层的合并和保存延迟。
+每次运行的结果以一行 JSON 追加到 benchmark_results.jsonl，便于跟踪性能回退
+"""
+import asyncio
+import contextlib
+import io
+import json
+import math
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+from flush_writer import FlushWriter
+from journal_store import JournalStore
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows 上没有 resource 模块，不统计峰值内存
+
+API_PATH = '/vas/api/v1/twitter/user/search'
+RESULTS_FILE = 'benchmark_results.jsonl'
+
+# 默认参数
+PAGE_SIZE = 50  # 每个响应的用户数
+OVERLAP = 0.3  # 响应中已出现过的用户比例
+REQUESTS = 200  # 每个爬虫版本的请求数
+CONCURRENCY = 4  # 页面中同时发出的请求数
+PAGES_PER_QUERY = 20  # 每个查询的页数（直连翻页时 has_more 变为 false）
+STORE_SIZES = (1000, 10000, 100000)  # 存储基准的数据量
+STORE_ROUNDS = 5  # 每个数据量下测量保存的次数
+STORE_PAGES_PER_ROUND = 5  # 两次保存之间合并的响应数
+TIMEOUT = 120  # 每个爬虫版本的最长运行时间（秒）
+
+TAGS = ('kol', 'founder', 'companies', 'master', 'media', 'trader', 'politics', 'celebrity', 'exchange')
+
+# 爬虫版本: 名称 -> (模块, 类名, 捕获方式)
+VARIANTS = {
+    'v2': ('gmgn_crawler_v2', 'GmgnCrawlerV2', 'response'),
+    'advanced': ('gmgn_crawler_advanced', 'GmgnCrawlerAdvanced', 'route'),
+    'dedup': ('gmgn_crawler_dedup', 'GmgnCrawlerDedup', 'route'),
+    'simple': ('gmgn_crawler_simple', 'GmgnCrawlerSimple', 'response'),
+}
+
+# 假服务器首页：按参数循环请求搜索接口，结束后把标题改为 done
+INDEX_HTML = """<!DOCTYPE html>
+<html><head><title>running</title></head><body><script>
+const params = new URLSearchParams(location.search);
+const total = Number(params.get('requests') || 100);
+const concurrency = Number(params.get('concurrency') || 4);
+let next = 0;
+async function worker() {
+  while (next < total) {
+    const i = next++;
+    await fetch('%s?q=bench&cursor=' + i).then(r => r.text()).catch(() => null);
+  }
+}
+Promise.all(Array.from({length: concurrency}, worker)).then(() => { document.title = 'done'; });
+</script></body></html>
+""" % API_PATH
+
+
+class SyntheticUsers:
+    """生成合成用户，overlap 比例的用户从已生成的用户中重复抽取"""
+
+    def __init__(self, page_size=PAGE_SIZE, overlap=OVERLAP, seed=0):
+        self.page_size = page_size
+        self.overlap = overlap
+        self.random = random.Random(seed)
+        self.users = []
+        self.lock = threading.Lock()
+
+    def new_user(self):
+        user_id = str(10 ** 17 + len(self.users))
+        return {
+            'handle': f"bench_{len(self.users)}",
+            'user_id': user_id,
+            'user_tags': self.random.sample(TAGS, self.random.choice((1, 1, 1, 2))),
+            'platform': 0,
+            'followers': int(self.random.lognormvariate(4, 2)),
+            'followed': False,
+        }
+
+    def page(self):
+        with self.lock:
+            users = []
+            for _ in range(self.page_size):
+                if self.users and self.random.random() < self.overlap:
+                    user = dict(self.random.choice(self.users))
+                    user['followers'] += self.random.randint(0, 3)
+                else:
+                    user = self.new_user()
+                    self.users.append(user)
+                users.append(user)
+            return users
+
+
+class FakeGmgnServer:
+    """本地 HTTP 服务器，返回与 gmgn 搜索接口相同结构的响应"""
+
+    def __init__(self, page_size=PAGE_SIZE, overlap=OVERLAP, pages_per_query=PAGES_PER_QUERY, port=0):
+        self.synthetic = SyntheticUsers(page_size, overlap)
+        self.pages_per_query = pages_per_query
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                if parts.path == API_PATH:
+                    server.requests += 1
+                    query = parse_qs(parts.query)
+                    cursor = query.get('cursor', ['0'])[0]
+                    page = int(cursor) if cursor.isdigit() else 0
+                    has_more = page + 1 < server.pages_per_query
+                    body = json.dumps({'code': 0, 'msg': 'success', 'data': {
+                        'users': server.synthetic.page(),
+                        'next': str(page + 1) if has_more else '',
+                        'has_more': has_more,
+                    }}).encode('utf-8')
+                    content_type = 'application/json'
+                elif parts.path == '/':
+                    body = INDEX_HTML.encode('utf-8')
+                    content_type = 'text/html; charset=utf-8'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def percentiles(samples, points=(50, 90, 99)):
+    """毫秒级分位数（最近秩法）"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    result = {}
+    for p in points:
+        rank = max(1, math.ceil(p / 100 * len(ordered)))
+        result[f"p{p}"] = round(ordered[rank - 1] * 1000, 3)
+    result['max'] = round(ordered[-1] * 1000, 3)
+    return result
+
+
+def peak_rss_mb():
+    """当前进程的峰值内存（MB），不包括浏览器进程"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def timed(func, samples):
+    """包装函数，把每次调用的耗时追加到 samples"""
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+    return wrapper
+
+
+async def bench_variant(name, server, requests=REQUESTS, concurrency=CONCURRENCY, timeout=TIMEOUT):
+    """用无头 Chromium 驱动一个爬虫版本，返回测量结果"""
+    from importlib import import_module
+    from playwright.async_api import async_playwright
+    from page_pool import PagePool
+    from route_policy import TARGET_ROUTE_PATTERN
+
+    module_name, class_name, mode = VARIANTS[name]
+    workdir = Path(tempfile.mkdtemp(prefix=f"gmgn_bench_{name}_"))
+    merge_samples = []
+    result = {'variant': name, 'mode': mode, 'requests': requests}
+
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            crawler_class = getattr(import_module(module_name), class_name)
+            crawler = crawler_class(workdir / 'users.json')
+            # 接口前缀指向本地服务器
+            crawler.target_url_prefix = server.url + API_PATH
+            if hasattr(crawler, 'response_queue'):
+                crawler.response_queue.url_prefix = crawler.target_url_prefix
+            crawler.writer.merge = timed(crawler.writer.merge, merge_samples)
+            crawler.writer.start()
+
+            async with async_playwright() as p:
+                browser = await p.chromium.launch(headless=True)
+                try:
+                    if hasattr(crawler, 'response_queue'):
+                        # v2: 有界队列 + 工作协程，页面由 PagePool 打开以便按页面统计
+                        crawler.page_pool = PagePool(browser, {})
+                        page = (await crawler.page_pool.open(1))[0]
+                    else:
+                        page = await browser.new_page()
+
+                    if mode == 'route':
+                        await page.route(TARGET_ROUTE_PATTERN, crawler.handle_route)
+                    elif hasattr(crawler, 'response_queue'):
+                        crawler.response_queue.start()
+                        page.on('response', crawler.response_queue.submit)
+                    else:
+                        page.on('response', lambda response: asyncio.create_task(crawler.handle_response(response)))
+
+                    start = time.perf_counter()
+                    await page.goto(f"{server.url}/?requests={requests}&concurrency={concurrency}")
+                    deadline = start + timeout
+                    while crawler.request_count < requests and time.perf_counter() < deadline:
+                        await asyncio.sleep(0.01)
+                    if hasattr(crawler, 'response_queue'):
+                        await crawler.response_queue.drain()
+                    elapsed = time.perf_counter() - start
+                finally:
+                    await browser.close()
+
+            save_samples = []
+            timed(crawler.save_data, save_samples)()
+            crawler.writer.close()
+
+        result.update({
+            'captured': crawler.request_count,
+            'elapsed_s': round(elapsed, 3),
+            'captures_per_s': round(crawler.request_count / elapsed, 2) if elapsed else None,
+            'users': len(crawler.users_dict),
+            'merge_ms': percentiles(merge_samples),
+            'save_ms': percentiles(save_samples),
+            'peak_rss_mb': peak_rss_mb(),
+        })
+    except Exception as e:
+        message = str(e).strip().splitlines()
+        result['error'] = f"{type(e).__name__}: {message[0] if message else ''}"
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return result
+
+
+def bench_store(size, page_size=PAGE_SIZE, overlap=OVERLAP, rounds=STORE_ROUNDS):
+    """不启动浏览器，测量存储层在 size 个用户时的合并延迟和 save_data 延迟"""
+    workdir = Path(tempfile.mkdtemp(prefix='gmgn_bench_store_'))
+    try:
+        store = JournalStore(workdir / 'users.json')
+        writer = FlushWriter(store)
+        synthetic = SyntheticUsers(page_size, 0)
+        while len(synthetic.users) < size:
+            store.update(synthetic.page())
+        store.compact()
+        synthetic.overlap = overlap
+
+        merge_samples = []
+        save_samples = []
+        merge = timed(writer.merge, merge_samples)
+        for _ in range(rounds):
+            for _ in range(STORE_PAGES_PER_ROUND):
+                merge(synthetic.page())
+            start = time.perf_counter()
+            writer.flush()
+            store.compact()
+            save_samples.append(time.perf_counter() - start)
+        writer.close()
+
+        return {
+            'variant': 'store',
+            'size': size,
+            'users': len(store.users),
+            'merge_ms': percentiles(merge_samples),
+            'save_ms': percentiles(save_samples),
+            'snapshot_mb': round(store.snapshot_file.stat().st_size / (1024 * 1024), 2),
+            'peak_rss_mb': peak_rss_mb(),
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=Path(__file__).parent, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_result(result):
+    if 'error' in result:
+        print(f"  ❌ {result['variant']:10s} {result['error']}")
+    elif result['variant'] == 'store':
+        print(f"  💾 store {result['users']:>8d} 用户  合并 p50 {result['merge_ms'].get('p50')} ms"
+              f"  保存 p50 {result['save_ms'].get('p50')} ms / p99 {result['save_ms'].get('p99')} ms"
+              f"  峰值内存 {result['peak_rss_mb']} MB")
+    else:
+        print(f"  🚀 {result['variant']:10s} ({result['mode']}) {result['captures_per_s']} 次/秒"
+              f"  捕获 {result['captured']}/{result['requests']}  合并 p50 {result['merge_ms'].get('p50')} ms"
+              f"  保存 {result['save_ms'].get('p50')} ms  峰值内存 {result['peak_rss_mb']} MB")
+
+
+async def run(variants, sizes, requests, page_size, overlap, concurrency, output):
+    params = {'variants': variants, 'sizes': sizes, 'requests': requests, 'page_size': page_size,
+              'overlap': overlap, 'concurrency': concurrency}
+    results = []
+
+    print("=" * 70)
+    print("GMGN 爬虫性能基准测试")
+    print("=" * 70)
+
+    if variants:
+        server = FakeGmgnServer(page_size, overlap, pages_per_query=requests).start()
+        print(f"📡 假服务器: {server.url}{API_PATH}")
+        try:
+            for name in variants:
+                result = await bench_variant(name, server, requests, concurrency)
+                print_result(result)
+                results.append(result)
+        finally:
+            server.stop()
+
+    for size in sizes:
+        result = bench_store(size, page_size, overlap)
+        print_result(result)
+        results.append(result)
+
+    record = {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': params,
+        'results': results,
+    }
+    with open(output, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    print(f"\n📝 结果已追加到: {Path(output).absolute()}")
+
+
+def main():
+    variants = list(VARIANTS)
+    sizes = list(STORE_SIZES)
+    requests = REQUESTS
+    page_size = PAGE_SIZE
+    overlap = OVERLAP
+    concurrency = CONCURRENCY
+    output = RESULTS_FILE
+
+    def option(flag):
+        if flag in sys.argv:
+            idx = sys.argv.index(flag)
+            if idx + 1 < len(sys.argv):
+                return sys.argv[idx + 1]
+        return None
+
+    if '--help' in sys.argv or '-h' in sys.argv:
+        print("GMGN 爬虫性能基准测试")
+        print("\n用法:")
+        print("  python benchmark.py [选项]")
+        print("\n选项:")
+        print(f"  --variants <列表>    要测试的爬虫版本，逗号分隔（默认: {','.join(VARIANTS)}）")
+        print("  --no-browser         只测存储层，不启动浏览器")
+        print(f"  --sizes <列表>       存储基准的数据量，逗号分隔（默认: {','.join(map(str, STORE_SIZES))}）")
+        print(f"  --requests <数量>    每个爬虫版本的请求数（默认: {REQUESTS}）")
+        print(f"  --page-size <数量>   每个响应的用户数（默认: {PAGE_SIZE}）")
+        print(f"  --overlap <比例>     响应中重复用户的比例（默认: {OVERLAP}）")
+        print(f"  --concurrency <数量> 页面中同时发出的请求数（默认: {CONCURRENCY}）")
+        print(f"  --output <文件>      结果文件（默认: {RESULTS_FILE}）")
+        print("  --serve [端口]       只启动假服务器，可配合 api_replay.py --base-url 使用")
+        return
+
+    if option('--variants'):
+        variants = [v.strip() for v in option('--variants').split(',') if v.strip()]
+        unknown = [v for v in variants if v not in VARIANTS]
+        if unknown:
+            print(f"错误: 未知的爬虫版本 {', '.join(unknown)}（可选: {', '.join(VARIANTS)}）")
+            return
+    if '--no-browser' in sys.argv:
+        variants = []
+    if option('--sizes'):
+        sizes = [int(s) for s in option('--sizes').split(',') if s.strip()]
+    if option('--requests'):
+        requests = int(option('--requests'))
+    if option('--page-size'):
+        page_size = int(option('--page-size'))
+    if option('--overlap'):
+        overlap = float(option('--overlap'))
+    if option('--concurrency'):
+        concurrency = int(option('--concurrency'))
+    if option('--output'):
+        output = option('--output')
+
+    if '--serve' in sys.argv:
+        port = option('--serve')
+        server = FakeGmgnServer(page_size, overlap, port=int(port) if port and port.isdigit() else 8000).start()
+        print(f"📡 假服务器已启动: {server.url}{API_PATH}（Ctrl+C 停止）")
+        try:
+            server.thread.join()
+        except KeyboardInterrupt:
+            server.stop()
+        return
+
+    asyncio.run(run(variants, sizes, requests, page_size, overlap, concurrency, output))
+
+
+if __name__ == '__main__':
+    main()
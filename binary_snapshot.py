@@ -0,0 +1,376 @@
+"""
+GMGN 二进制快照 - 与 JSON 快照同时写出，启动时直接 mmap，不再解析 JSON
+文件结构（小端）:
+  文件头 | 定长记录表 | 按 user_id 排序的行号索引 | 标签名（JSON 数组）| 字符串堆
+每条记录 44 字节，handle / user_id 存在字符串堆中；字段不标准的用户整条以 JSON 存入字符串堆。
+文件头记录了对应 JSON 快照的大小和修改时间，两者不一致时视为过期，回退到解析 JSON。
+字符串堆的偏移和长度是 32 位无符号整数，超出范围时不写出二进制快照（只保留 JSON 快照）。
+加载只读取文件头和标签名，用户记录在访问时才从映射中解码，去重检查直接在索引上二分查找，
+启动耗时与数据量无关
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+from json_codec import dumps_bytes, loads
+from user_table import UserTable, _user_key, _user_id
+
+MAGIC = b'GMGNBIN1'
+VERSION = 1
+
+# magic, version, 记录长度, 用户数, JSON 大小, JSON 修改时间(ns),
+# 记录表偏移, 索引偏移, 标签偏移, 标签长度, 字符串堆偏移
+HEADER = struct.Struct('<8sIIQQqQQQQQ')
+# user_id 偏移/长度, handle 偏移/长度, followers, 标签位集合, 附加 JSON 偏移/长度, platform, followed, flags
+RECORD = struct.Struct('<IIIIqQIIbbBx')
+
+# 字符串堆的最大字节数（偏移 / 长度为 uint32）
+HEAP_LIMIT = 0xFFFFFFFF
+
+FLAG_RAW = 1  # 附加 JSON 是完整的用户字典
+FLAG_TAG_LIST = 2  # 附加 JSON 是标签列表（顺序特殊或标签 ID 超过 63）
+
+
+def binary_path_for(snapshot_file):
+    """JSON 快照对应的二进制快照: gmgn_users_dedup.json -> gmgn_users_dedup.json.bin"""
+    snapshot_file = Path(snapshot_file)
+    return snapshot_file.with_name(snapshot_file.name + '.bin')
+
+
+def _canonical_id(user_id):
+    """与 UserTable 相同的 user_id 规范化（'00123' 和 123 不会混淆）"""
+    return _user_id(_user_key(user_id)).encode('utf-8')
+
+
+class BinarySnapshotWriter:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.records = bytearray()
+        self.heap = bytearray()
+        self.ids = []  # 行号 -> 规范化的 user_id，用于生成索引
+        self.tag_names = []
+        self.tag_ids = {}
+        self.overflow = False  # 字符串堆超出 HEAP_LIMIT，不再写入，close() 时放弃
+
+    def _store(self, data):
+        offset = len(self.heap)
+        if offset + len(data) > HEAP_LIMIT:
+            raise OverflowError(f"二进制快照的字符串堆超过 {HEAP_LIMIT} 字节")
+        self.heap += data
+        return offset, len(data)
+
+    def write(self, user):
+        if self.overflow:
+            return
+        try:
+            self._write(user)
+        except OverflowError:
+            # 与 JSON 快照共用一次遍历，这里不能抛出，只放弃二进制快照
+            self.overflow = True
+            self.records = bytearray()
+            self.heap = bytearray()
+            self.ids = []
+
+    def _write(self, user):
+        user_id = _canonical_id(user['user_id'])
+        self.ids.append(user_id)
+        id_off, id_len = self._store(user_id)
+
+        if not UserTable._compressible(user):
+            extra_off, extra_len = self._store(dumps_bytes(user))
+            self.records += RECORD.pack(id_off, id_len, 0, 0, 0, 0, extra_off, extra_len, 0, 0, FLAG_RAW)
+            return
+
+        bits = 0
+        tag_ids = []
+        for tag in user['user_tags']:
+            tag_id = self.tag_ids.get(tag)
+            if tag_id is None:
+                tag_id = self.tag_ids[tag] = len(self.tag_names)
+                self.tag_names.append(tag)
+            bits |= 1 << tag_id
+            tag_ids.append(tag_id)
+
+        flags, extra_off, extra_len = 0, 0, 0
+        if tag_ids != sorted(set(tag_ids)) or bits >= 1 << 64:
+            flags, bits = FLAG_TAG_LIST, 0
+            extra_off, extra_len = self._store(dumps_bytes(user['user_tags']))
+
+        handle_off, handle_len = self._store(user['handle'].encode('utf-8'))
+        self.records += RECORD.pack(id_off, id_len, handle_off, handle_len, user['followers'], bits,
+                                    extra_off, extra_len, user['platform'], user['followed'], flags)
+
+    def passthrough(self, users):
+        """边写入边原样返回用户，便于和 JSON 快照共用一次遍历"""
+        for user in users:
+            self.write(user)
+            yield user
+
+    def close(self, json_file):
+        """写出文件，返回是否成功；json_file 为同时写好的 JSON 快照，记录其大小和修改时间用于校验"""
+        if self.overflow:
+            print(f"⚠ 字符串堆超过 {HEAP_LIMIT} 字节，不写出二进制快照: {self.path}")
+            return False
+        stat = Path(json_file).stat()
+        index_bytes = array('I', sorted(range(len(self.ids)), key=self.ids.__getitem__)).tobytes()
+        tags = json.dumps(self.tag_names, ensure_ascii=False).encode('utf-8')
+
+        records_offset = HEADER.size
+        index_offset = records_offset + len(self.records)
+        tags_offset = index_offset + len(index_bytes)
+        heap_offset = tags_offset + len(tags)
+
+        tmp_file = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_file, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, RECORD.size, len(self.ids), stat.st_size, stat.st_mtime_ns,
+                                records_offset, index_offset, tags_offset, len(tags), heap_offset))
+            f.write(self.records)
+            f.write(index_bytes)
+            f.write(tags)
+            f.write(self.heap)
+
+        try:
+            os.replace(tmp_file, self.path)
+        except OSError:
+            # Windows 上正在被映射的文件不能替换；JSON 修改时间已变，旧文件下次启动时会被判为过期
+            tmp_file.unlink(missing_ok=True)
+            return False
+        return True
+
+
+class MappedSnapshot:
+    """只读的映射快照，按行号解码用户，按 user_id 二分查找"""
+
+    def __init__(self, path, mm, header):
+        (_, _, _, self.count, _, _, self.records_offset, index_offset,
+         tags_offset, tags_length, self.heap_offset) = header
+        self.path = path
+        self.mm = mm
+        self.index = memoryview(mm)[index_offset:index_offset + 4 * self.count].cast('I')
+        self.tag_names = json.loads(mm[tags_offset:tags_offset + tags_length].decode('utf-8'))
+
+    @classmethod
+    def open(cls, path, json_file):
+        """打开二进制快照；文件不存在、格式不对或与 JSON 快照不一致时返回 None"""
+        path, json_file = Path(path), Path(json_file)
+        try:
+            stat = json_file.stat()
+            with open(path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        if len(mm) < HEADER.size:
+            mm.close()
+            return None
+        header = HEADER.unpack_from(mm, 0)
+        magic, version, record_size, _, json_size, json_mtime_ns = header[:6]
+        if (magic != MAGIC or version != VERSION or record_size != RECORD.size
+                or json_size != stat.st_size or json_mtime_ns != stat.st_mtime_ns
+                or array('I').itemsize != 4 or sys.byteorder != 'little'):
+            mm.close()
+            return None
+        return cls(path, mm, header)
+
+    def __len__(self):
+        return self.count
+
+    def _record(self, row):
+        return RECORD.unpack_from(self.mm, self.records_offset + row * RECORD.size)
+
+    def _heap(self, offset, length):
+        start = self.heap_offset + offset
+        return self.mm[start:start + length]
+
+    def user_id(self, row):
+        id_off, id_len = struct.unpack_from('<II', self.mm, self.records_offset + row * RECORD.size)
+        return self._heap(id_off, id_len).decode('utf-8')
+
+    def followers(self, row):
+        return struct.unpack_from('<q', self.mm, self.records_offset + row * RECORD.size + 16)[0]
+
+    def find(self, user_id):
+        """二分查找 user_id，返回行号，不存在时返回 None"""
+        key = _canonical_id(user_id)
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            row = self.index[mid]
+            id_off, id_len = struct.unpack_from('<II', self.mm, self.records_offset + row * RECORD.size)
+            if self._heap(id_off, id_len) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count:
+            row = self.index[lo]
+            if self.user_id(row).encode('utf-8') == key:
+                return row
+        return None
+
+    def tags_of(self, bits):
+        tags = []
+        tag_id = 0
+        while bits:
+            if bits & 1:
+                tags.append(self.tag_names[tag_id])
+            bits >>= 1
+            tag_id += 1
+        return tags
+
+    def row_user(self, row):
+        """把一行解码成原来的字典格式"""
+        (id_off, id_len, handle_off, handle_len, followers, bits,
+         extra_off, extra_len, platform, followed, flags) = self._record(row)
+        if flags & FLAG_RAW:
+            return loads(self._heap(extra_off, extra_len))
+        if flags & FLAG_TAG_LIST:
+            tags = loads(self._heap(extra_off, extra_len))
+        else:
+            tags = self.tags_of(bits)
+        return {
+            'handle': self._heap(handle_off, handle_len).decode('utf-8'),
+            'user_id': self._heap(id_off, id_len).decode('utf-8'),
+            'user_tags': tags,
+            'platform': platform,
+            'followers': followers,
+            'followed': bool(followed),
+        }
+
+
+class MappedUserTable:
+    """映射快照 + 内存中的 UserTable 覆盖层，接口与 UserTable 相同
+
+    快照中的用户按原行号排列，被更新的用户和新用户写入覆盖层；
+    新用户的行号从快照用户数开始依次编号，与整体加载时的插入顺序一致
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.overlay = UserTable()
+        self.global_rows = array('q')  # 覆盖层行号 -> 整体行号
+        self.replaced = {}  # 快照行号 -> 覆盖层行号（被更新过的快照用户）
+        self.new_rows = array('q')  # 整体行号 - 快照用户数 -> 覆盖层行号
+
+    def row_user(self, row):
+        if row < len(self.base):
+            overlay_row = self.replaced.get(row)
+            if overlay_row is None:
+                return self.base.row_user(row)
+        else:
+            overlay_row = self.new_rows[row - len(self.base)]
+        return self.overlay.row_user(overlay_row)
+
+    def _followers(self, row):
+        if row < len(self.base):
+            overlay_row = self.replaced.get(row)
+            if overlay_row is None:
+                return self.base.followers(row)
+        else:
+            overlay_row = self.new_rows[row - len(self.base)]
+        return self.overlay.followers[overlay_row]
+
+    def row_of(self, user_id):
+        overlay_row = self.overlay.index.get(_user_key(user_id))
+        if overlay_row is not None:
+            return self.global_rows[overlay_row]
+        row = self.base.find(user_id)
+        if row is None:
+            raise KeyError(user_id)
+        return row
+
+    # ---- 字典接口 ----
+
+    def __len__(self):
+        return len(self.base) + len(self.new_rows)
+
+    def __contains__(self, user_id):
+        return user_id in self.overlay or self.base.find(user_id) is not None
+
+    def __getitem__(self, user_id):
+        user = self.get(user_id)
+        if user is None:
+            raise KeyError(user_id)
+        return user
+
+    def get(self, user_id, default=None):
+        user = self.overlay.get(user_id)
+        if user is not None:
+            return user
+        row = self.base.find(user_id)
+        return default if row is None else self.base.row_user(row)
+
+    def __setitem__(self, user_id, user):
+        if user_id in self.overlay:
+            self.overlay[user_id] = user
+            return
+
+        base_row = self.base.find(user_id)
+        overlay_row = len(self.overlay)
+        self.overlay[user_id] = user
+        if base_row is not None:
+            self.replaced[base_row] = overlay_row
+            self.global_rows.append(base_row)
+        else:
+            self.global_rows.append(len(self))
+            self.new_rows.append(overlay_row)
+
+    def __iter__(self):
+        for row in range(len(self.base)):
+            yield self.base.user_id(row)
+        for overlay_row in self.new_rows:
+            yield _user_id(self.overlay.keys_by_row[overlay_row])
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        return (self.row_user(row) for row in range(len(self)))
+
+    def items(self):
+        return zip(iter(self), self.values())
+
+    def rebase(self, base):
+        """换到压缩后新写出的映射快照上：覆盖层中与新快照内容相同的用户直接丢弃，
+        压缩期间又有变化的用户和新快照之后的新用户留在覆盖层；行号改为新快照的顺序（与重新启动后加载的一致）"""
+        kept = []
+        for overlay_row, global_row in enumerate(self.global_rows):
+            user = self.overlay.row_user(overlay_row)
+            base_row = base.find(user['user_id'])
+            if base_row is None or base.row_user(base_row) != user:
+                kept.append((global_row, base_row, user))
+        kept.sort(key=lambda item: item[0])
+
+        self.base = base
+        self.overlay = UserTable()
+        self.global_rows = array('q')
+        self.replaced = {}
+        self.new_rows = array('q')
+        for _, base_row, user in kept:
+            overlay_row = len(self.overlay)
+            self.overlay[user['user_id']] = user
+            if base_row is not None:
+                self.replaced[base_row] = overlay_row
+                self.global_rows.append(base_row)
+            else:
+                self.global_rows.append(len(self))
+                self.new_rows.append(overlay_row)
+
+    # ---- 快照 ----
+
+    def snapshot(self):
+        """拷贝覆盖层（映射快照本身只读，可以共用），用于后台写快照"""
+        table = MappedUserTable.__new__(MappedUserTable)
+        table.base = self.base
+        table.overlay = self.overlay.snapshot()
+        table.global_rows = array('q', self.global_rows)
+        table.replaced = self.replaced.copy()
+        table.new_rows = array('q', self.new_rows)
+        return table
+
+    def sorted_users(self):
+        """按 followers 降序逐个返回用户字典（粉丝数相同时保持插入顺序）"""
+        rows = sorted(range(len(self)), key=self._followers, reverse=True)
+        return (self.row_user(row) for row in rows)
@@ -0,0 +1,62 @@
+"""
+GMGN 变化感知的合并 - JournalStore 和 SqliteStore 共用
+逐个字段比较新旧记录：内容完全相同的重复捕获直接跳过（不写内存、不写日志、不更新统计），
+有变化的字段计入 field_changes；新用户和粉丝数有变化的用户记录一个粉丝数历史点，
+新用户和改了 handle 的用户记入 handle 日志（模糊搜索索引的数据源，见 handle_search.py）
+"""
+import time
+from crawler_metrics import metrics
+
+
+class ChangeAwareMerge:
+    """混入类，使用方需要提供 users、lock、stats、history、handles、field_changes 属性"""
+
+    def apply(self, users):
+        """合并一批用户，返回 (新增用户数, 新增或内容有变化的用户列表)"""
+        new_users = 0
+        changed = []
+        now = time.time()
+        with self.lock:
+            for user in users:
+                user_id = user['user_id']
+                old = self.users.get(user_id)
+                if old is None:
+                    new_users += 1
+                elif old == user:
+                    continue  # 重复捕获且内容没变
+                else:
+                    for field in old.keys() | user.keys():
+                        if old.get(field) != user.get(field):
+                            self.field_changes[field] += 1
+
+                self.users[user_id] = user  # 更新或添加用户
+                changed.append(user)
+                if self.stats is not None:
+                    self.stats.update(old, user)
+                if self.history is not None and (old is None or old.get('followers') != user.get('followers')):
+                    self.history.record(user_id, user.get('followers'), now)
+                if self.handles is not None and (old is None or old.get('handle') != user.get('handle')):
+                    self.handles.record(user_id, user.get('handle'))
+
+        metrics.inc('users_new', new_users)
+        metrics.inc('users_updated', len(changed) - new_users)
+        return new_users, changed
+
+    def update(self, users):
+        """只合并到内存，返回新增用户数"""
+        return self.apply(users)[0]
+
+    def flush_history(self):
+        """把待写入的粉丝数历史点和 handle 记录追加到各自的文件"""
+        if self.history is not None:
+            with self.lock:
+                written = self.history.flush()
+            metrics.inc('bytes_written', written)
+        if self.handles is not None:
+            # handle 日志还不存在时先写入当前全部用户：锁内只拷贝用户表，逐个序列化和写盘在锁外进行，
+            # 已有大量用户时也不会挡住合并
+            with self.handles.write_lock:
+                with self.lock:
+                    taken = self.handles.take(lambda: self.users.snapshot().values())
+                written = self.handles.write(*taken)
+            metrics.inc('bytes_written', written)
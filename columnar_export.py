@@ -0,0 +1,198 @@
+"""
+GMGN 列式导出 - 把用户数据和 KOL 数据导出为 Parquet / Arrow IPC / CSV
+下游任务不用每次重新解析缩进格式的 JSON；每列都有固定类型（followers int64、platform int8、
+user_tags list<string>，KOL 的 profit float64、wins/losses int32 等）。
+流式读取数据源，每 CHUNK_ROWS 行写出一个 RecordBatch / Parquet row group，内存占用与数据量无关。
+Parquet 和 Arrow IPC 需要安装 pyarrow（pip install pyarrow），CSV 只用标准库
+"""
+import csv
+import os
+from pathlib import Path
+from json_stream import SnapshotReader
+from sqlite_store import SqliteStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+# 每批写出的行数
+CHUNK_ROWS = 10000
+
+# CSV 中 user_tags 列表的分隔符
+CSV_TAG_SEPARATOR = '|'
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow', 'csv': '.csv'}
+
+# 列定义: (列名, 类型名)，类型名对应 _ARROW_TYPES 和 _CONVERTERS
+USER_COLUMNS = (
+    ('user_id', 'string'),
+    ('handle', 'string'),
+    ('user_tags', 'list<string>'),
+    ('platform', 'int8'),
+    ('followers', 'int64'),
+    ('followed', 'bool'),
+)
+
+KOL_COLUMNS = (
+    ('wallet_address', 'string'),
+    ('name', 'string'),
+    ('telegram', 'string'),
+    ('twitter', 'string'),
+    ('profit', 'float64'),
+    ('wins', 'int32'),
+    ('losses', 'int32'),
+    ('timeframe', 'int32'),
+)
+
+# 数据集: 名称 -> (JSON 中的数组字段, 列定义)
+DATASETS = {
+    'users': ('users', USER_COLUMNS),
+    'kol': ('data', KOL_COLUMNS),
+}
+
+
+def _optional(convert):
+    return lambda value: None if value is None else convert(value)
+
+
+_CONVERTERS = {
+    'string': _optional(str),
+    'list<string>': _optional(lambda tags: [str(tag) for tag in tags]),
+    'int8': _optional(int),
+    'int32': _optional(int),
+    'int64': _optional(int),
+    'float64': _optional(float),
+    'bool': _optional(bool),
+}
+
+
+def _arrow_type(type_name):
+    if type_name == 'list<string>':
+        return pa.list_(pa.string())
+    return {
+        'string': pa.string(),
+        'int8': pa.int8(),
+        'int32': pa.int32(),
+        'int64': pa.int64(),
+        'float64': pa.float64(),
+        'bool': pa.bool_(),
+    }[type_name]
+
+
+def arrow_schema(columns):
+    return pa.schema([(name, _arrow_type(type_name)) for name, type_name in columns])
+
+
+def detect_dataset(path):
+    """根据文件顶层的数组字段判断数据集：users 为用户数据，data 为 KOL 数据；.db 文件为用户数据"""
+    path = Path(path)
+    if path.suffix == '.db':
+        return 'users'
+    datasets = {key: name for name, (key, _) in DATASETS.items()}
+    key = SnapshotReader(path).first_array(datasets)
+    if key is None:
+        raise ValueError(f"无法识别数据集: {path} 中没有 {' / '.join(datasets)} 数组（可用 --dataset 指定）")
+    return datasets[key]
+
+
+def iter_records(path, dataset):
+    """流式读取数据源中的记录，.db 文件按粉丝数降序读取；JSON 中没有该数据集的数组时报错"""
+    path = Path(path)
+    if path.suffix == '.db':
+        yield from SqliteStore(path.with_suffix('.json'), db_file=path, export_json=False).iter_users()
+        return
+    key, _ = DATASETS[dataset]
+    reader = SnapshotReader(path, key)
+    yield from reader
+    if not reader.found:
+        raise ValueError(f"{path} 中没有 {key} 数组，不是 {dataset} 数据集（可用 --dataset 指定）")
+
+
+def iter_chunks(records, columns, chunk_rows=CHUNK_ROWS):
+    """把记录按列转换好类型，每 chunk_rows 行返回一次 {列名: 值列表}"""
+    converters = [(name, _CONVERTERS[type_name]) for name, type_name in columns]
+    chunk = {name: [] for name, _ in columns}
+    rows = 0
+    for record in records:
+        for name, convert in converters:
+            chunk[name].append(convert(record.get(name)))
+        rows += 1
+        if rows == chunk_rows:
+            yield chunk
+            chunk = {name: [] for name, _ in columns}
+            rows = 0
+    if rows:
+        yield chunk
+
+
+def _write_arrow(records, columns, tmp_file, file_format, chunk_rows):
+    schema = arrow_schema(columns)
+    if file_format == 'parquet':
+        writer = pq.ParquetWriter(tmp_file, schema)
+        write = writer.write_table
+        to_output = lambda batch: pa.Table.from_batches([batch])
+    else:
+        writer = pa_ipc.new_file(tmp_file, schema)
+        write = writer.write_batch
+        to_output = lambda batch: batch
+
+    rows = 0
+    try:
+        for chunk in iter_chunks(records, columns, chunk_rows):
+            batch = pa.RecordBatch.from_pydict(chunk, schema=schema)
+            write(to_output(batch))
+            rows += batch.num_rows
+    finally:
+        writer.close()
+    return rows
+
+
+def _write_csv(records, columns, tmp_file):
+    converters = [(name, type_name, _CONVERTERS[type_name]) for name, type_name in columns]
+    rows = 0
+    with open(tmp_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow([name for name, _ in columns])
+        for record in records:
+            row = []
+            for name, type_name, convert in converters:
+                value = convert(record.get(name))
+                if type_name == 'list<string>' and value is not None:
+                    value = CSV_TAG_SEPARATOR.join(value)
+                row.append('' if value is None else value)
+            writer.writerow(row)
+            rows += 1
+    return rows
+
+
+def export_columnar(path, output_file=None, file_format=None, dataset=None, chunk_rows=CHUNK_ROWS):
+    """导出列式文件，返回 (输出文件, 行数)；未指定格式时有 pyarrow 用 Parquet，否则用 CSV"""
+    path = Path(path)
+    dataset = dataset or detect_dataset(path)
+    if dataset not in DATASETS:
+        raise ValueError(f"未知数据集: {dataset}（可选: {', '.join(DATASETS)}）")
+    file_format = file_format or ('parquet' if pa is not None else 'csv')
+    if file_format not in FORMATS:
+        raise ValueError(f"未知格式: {file_format}（可选: {', '.join(FORMATS)}）")
+    if file_format != 'csv' and pa is None:
+        raise RuntimeError(f"导出 {file_format} 需要安装 pyarrow: pip install pyarrow")
+
+    _, columns = DATASETS[dataset]
+    output_file = Path(output_file) if output_file else path.with_suffix(FORMATS[file_format])
+    tmp_file = output_file.with_name(output_file.name + '.tmp')
+
+    records = iter_records(path, dataset)
+    try:
+        if file_format == 'csv':
+            rows = _write_csv(records, columns, tmp_file)
+        else:
+            rows = _write_arrow(records, columns, tmp_file, file_format, chunk_rows)
+    except BaseException:
+        Path(tmp_file).unlink(missing_ok=True)
+        raise
+
+    os.replace(tmp_file, output_file)
+    return output_file, rows
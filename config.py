@@ -14,4 +14,43 @@ PROXY = "http://127.0.0.1:7890"  # 修改为你的实际代理地址，如果不
 HEADLESS = False  # False 表示显示浏览器窗口
 
 # 输出文件
-OUTPUT_FILE = "gmgn_users_dedup.json"
\ No newline at end of file
+OUTPUT_FILE = "gmgn_users_dedup.json"
+
+# 后台保存设置
+FLUSH_INTERVAL = 2.0  # 两次写盘的最大间隔（秒）
+FLUSH_MAX_PENDING_USERS = 500  # 待保存用户数达到该值时立即写盘
+
+# 屏蔽图片、媒体、字体和第三方统计脚本，加快页面加载、节省代理流量
+BLOCK_RESOURCES = False
+
+# 响应处理队列（v2 版本）
+RESPONSE_QUEUE_SIZE = 100  # 队列最多缓存的响应数，满了之后丢弃并计数
+RESPONSE_WORKERS = 4  # 并发处理响应的工作协程数
+
+# 多页面并行捕获（v2 版本 --pages / --proxies）
+MAX_PAGES = 8  # 同时打开的页面数上限
+
+# 存储后端: "journal"（追加写日志 + JSON 快照）或 "sqlite"（SQLite 数据库，停止时导出 JSON）
+STORAGE_BACKEND = "journal"
+
+# 实时统计（v2 版本）：每捕获多少个请求打印一行统计摘要，0 表示不打印
+LIVE_STATS_EVERY = 20
+
+# 运行指标（所有爬虫版本）
+SUMMARY_INTERVAL = 10  # 每隔多少秒打印一行运行摘要（替代逐个请求的多行输出）
+METRICS_PORT = None  # 设为端口号（例如 9108）时在 http://127.0.0.1:<端口>/metrics 提供 Prometheus 指标
+
+# 代理池（v2 版本 --proxy-pool）：多个代理轮换使用，后台定期检查健康情况，
+# 代理变慢或断开时自动把页面换到其他代理；"auto" 表示使用 test_proxy.py 探测出的可用代理
+# PROXY_POOL = ["http://127.0.0.1:7890", "socks5://127.0.0.1:1080"]
+PROXY_POOL = None
+PROXY_CHECK_INTERVAL = 30  # 健康检查间隔（秒）
+
+# 响应指纹缓存（v2 / 高级版）：记录最近多少个响应体的哈希，完全相同的响应跳过解析，0 表示不使用
+RESPONSE_CACHE_SIZE = 1024
+
+# 热启动（v2 版本 --warm-start）：使用持久化的浏览器用户数据目录，保留 Cookie、Cloudflare 验证和 HTTP 缓存，
+# 启动后自动打开 WARM_START_URL；每次运行到第一次捕获的耗时记录在 startup_times.jsonl（python warm_start.py 查看汇总）
+WARM_START = False
+BROWSER_PROFILE_DIR = "browser_profile"
+WARM_START_URL = "https://gmgn.ai/"
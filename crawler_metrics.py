@@ -0,0 +1,177 @@
+"""
+GMGN 爬虫运行指标 - 各阶段耗时直方图 + 计数器，可选的本地 Prometheus 文本格式端点
+阶段: parse（response.json / 解析响应体）、merge（合并到内存）、batch_write（追加日志或写入数据库）、
+snapshot_sort（快照排序）、snapshot_write（写快照文件）
+计数器: 收到/匹配/解析成功的响应数、新增/更新的用户数、写盘字节数、错误数、重复响应的指纹缓存命中数
+存储层和爬虫共用模块级的 metrics 实例；记录一次只是几次加法，开销可以忽略
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 直方图桶上界（秒）
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGES = ('parse', 'merge', 'batch_write', 'snapshot_sort', 'snapshot_write')
+
+# 计数器名 -> 说明
+COUNTERS = {
+    'responses_seen': '收到的响应数',
+    'responses_matched': '匹配目标接口的响应数',
+    'responses_parsed': '成功解析出用户的响应数',
+    'users_new': '新增用户数',
+    'users_updated': '内容有变化的已有用户数',
+    'bytes_written': '写入日志和快照的字节数',
+    'errors': '处理响应时的错误数',
+    'cache_hits': '与最近响应完全相同、跳过解析和合并的响应数',
+    'cache_misses': '指纹缓存未命中的响应数',
+}
+
+# Prometheus 指标名前缀
+PREFIX = 'gmgn_'
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # 最后一个是 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def percentile(self, p):
+        """第 p 百分位所在桶的上界（秒），没有样本时返回 None"""
+        if self.count == 0:
+            return None
+        rank = max(1, p / 100 * self.count)
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class CrawlerMetrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.histograms = {stage: Histogram() for stage in STAGES}
+        self.gauges = {}  # 名称 -> (说明, 取值函数)，例如当前用户数
+        self.server = None
+        self._last = dict(self.counters)  # 上次打印摘要时的计数
+
+    def inc(self, name, value=1):
+        with self.lock:
+            self.counters[name] += value
+
+    def observe(self, stage, seconds):
+        with self.lock:
+            self.histograms[stage].observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        """with metrics.time('merge'): ... 记录代码块耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def gauge(self, name, help_text, func):
+        """注册一个在导出时才取值的指标"""
+        self.gauges[name] = (help_text, func)
+
+    def render(self):
+        """Prometheus 文本格式"""
+        lines = []
+        with self.lock:
+            for name, help_text in COUNTERS.items():
+                metric = f"{PREFIX}{name}_total"
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric} {self.counters[name]}")
+
+            metric = f"{PREFIX}stage_seconds"
+            lines.append(f"# HELP {metric} 各阶段耗时")
+            lines.append(f"# TYPE {metric} histogram")
+            for stage, histogram in self.histograms.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    lines.append(f'{metric}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'{metric}_count{{stage="{stage}"}} {histogram.count}')
+
+        for name, (help_text, func) in self.gauges.items():
+            metric = f"{PREFIX}{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric} {func()}")
+        return '\n'.join(lines) + '\n'
+
+    def serve(self, port, host='127.0.0.1'):
+        """在后台线程中提供 http://host:port/metrics"""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/metrics', '/'):
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name='gmgn-metrics', daemon=True).start()
+        return f"http://{host}:{self.server.server_address[1]}/metrics"
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    @staticmethod
+    def _ms(seconds):
+        if seconds is None:
+            return '-'
+        return '>10s' if seconds == float('inf') else f"≤{seconds * 1000:g}ms"
+
+    def summary_line(self, total_users=None):
+        """自上次调用以来的一行摘要；没有新的响应时返回 None"""
+        with self.lock:
+            counters = dict(self.counters)
+            parse = self.histograms['parse'].percentile(50)
+            merge = self.histograms['merge'].percentile(50)
+        delta = {name: counters[name] - self._last[name] for name in counters}
+        self._last = counters
+        if delta['responses_matched'] == 0 and delta['errors'] == 0:
+            return None
+
+        users = f"用户 {total_users}" if total_users is not None else "用户"
+        repeated = f" | 重复 +{delta['cache_hits']}" if delta['cache_hits'] else ''
+        return (f"[{datetime.now().strftime('%H:%M:%S')}] 📊 请求 {counters['responses_parsed']}"
+                f" (+{delta['responses_parsed']}) | {users} (+{delta['users_new']} 新, {delta['users_updated']} 更新)"
+                f" | 解析 p50 {self._ms(parse)} | 合并 p50 {self._ms(merge)}"
+                f"{repeated}"
+                f" | 写盘 {counters['bytes_written'] / (1024 * 1024):.1f}MB | 错误 {counters['errors']}")
+
+
+# 模块级实例，存储层和爬虫共用
+metrics = CrawlerMetrics()
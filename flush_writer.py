@@ -0,0 +1,83 @@
+"""
+GMGN 后台刷盘线程 - 把日志写入和快照压缩移出 Playwright 事件循环
+响应处理只做内存合并并标记脏数据，序列化和写盘在独立线程中按
+时间间隔或待写用户数阈值批量进行，停止时保证最后一次刷盘
+"""
+import atexit
+import threading
+from crawler_metrics import metrics
+
+# 两次刷盘的最大间隔（秒）
+FLUSH_INTERVAL = 2.0
+# 待写入用户数达到该值时立即刷盘
+FLUSH_MAX_PENDING_USERS = 500
+
+
+class FlushWriter:
+    def __init__(self, store, flush_interval=FLUSH_INTERVAL, max_pending_users=FLUSH_MAX_PENDING_USERS):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_pending_users = max_pending_users
+        self.pending = []  # 已合并到内存、尚未写入日志的用户
+        self.dirty = False
+        self.flush_count = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, name='gmgn-flush-writer', daemon=True)
+
+    def start(self):
+        """启动刷盘线程，并注册退出时的最终刷盘"""
+        self._thread.start()
+        atexit.register(self.close)
+
+    def merge(self, users):
+        """合并一批用户到内存并标记待写入，返回新增用户数（不做任何磁盘 IO）
+        内容没有变化的重复用户不会写入日志"""
+        with metrics.time('merge'):
+            new_users, changed = self.store.apply(users)
+        if changed:
+            with self._lock:
+                closed = self._stopped
+                if not closed:
+                    self.pending.extend(changed)
+                    self.dirty = True
+                    if len(self.pending) >= self.max_pending_users:
+                        self._wakeup.set()
+            if closed:
+                # close() 已经做过最后一次刷盘，之后合并的用户直接追加到日志
+                self.store.append(changed)
+        return new_users
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠ 后台保存失败: {e}")
+
+    def flush(self):
+        """把待写入的用户追加到日志，必要时触发后台压缩"""
+        with self._lock:
+            if not self.dirty:
+                return
+            batch, self.pending = self.pending, []
+            self.dirty = False
+
+        self.store.append(batch)
+        self.store.maybe_compact()
+        self.flush_count += 1
+
+    def close(self):
+        """停止刷盘线程，写入剩余数据并合并进快照（可重复调用）"""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+        self._wakeup.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.flush()
+        self.store.close()
@@ -0,0 +1,181 @@
+"""
+GMGN 粉丝数历史 - 只追加的增量编码时间序列
+合并时每出现一个新用户、或已有用户的粉丝数发生变化，就记录一个 (时间, 粉丝数) 点。
+文件格式（gmgn_users_dedup.json.history）:
+  文件头 MAGIC，之后是若干批次: varint 批次长度 | varint 批次时间(秒) | varint 点数 | 点...
+  每个点: user_id（数字 ID 存为 varint，其他存为长度 + UTF-8）| varint 相对批次时间的秒数 |
+          zigzag varint 粉丝数（低位为 1 表示相对该用户上一个点的差值，为 0 表示绝对值）
+同一进程内每个用户的第一个点写绝对值，之后写差值，通常每个点只占 10 字节左右；
+读取时顺序回放即可还原每个用户的完整序列，最后一个批次写了一半时会被忽略
+"""
+import time
+from pathlib import Path
+from user_table import _user_key
+
+MAGIC = b'GMGNHIS1'
+# 是否记录粉丝数历史
+FOLLOWER_HISTORY = True
+
+
+def history_path_for(snapshot_file):
+    """JSON 快照对应的历史文件: gmgn_users_dedup.json -> gmgn_users_dedup.json.history"""
+    snapshot_file = Path(snapshot_file)
+    return snapshot_file.with_name(snapshot_file.name + '.history')
+
+
+def _write_varint(buf, value):
+    while value > 0x7f:
+        buf.append((value & 0x7f) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+class FollowerHistory:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.last = {}  # 本进程写过的用户 -> 上一个点的粉丝数
+        self.points = []  # 待写入: (时间, user_id, 粉丝数)
+        self.written = 0  # 已写入的点数
+        self._checked = False
+
+    def record(self, user_id, followers, timestamp=None):
+        """记录一个点（只放入内存，flush() 时写盘）"""
+        if type(followers) is not int:
+            return
+        self.points.append((int(timestamp if timestamp is not None else time.time()), user_id, followers))
+
+    def _encode_batch(self, points):
+        base = min(point[0] for point in points)
+        body = bytearray()
+        _write_varint(body, base)
+        _write_varint(body, len(points))
+        for timestamp, user_id, followers in points:
+            key = _user_key(user_id)
+            if isinstance(key, int):
+                _write_varint(body, key << 1)
+            else:
+                data = str(key).encode('utf-8')
+                _write_varint(body, (len(data) << 1) | 1)
+                body += data
+            _write_varint(body, max(timestamp - base, 0))
+
+            previous = self.last.get(key)
+            if previous is None:
+                _write_varint(body, _zigzag(followers) << 1)
+            else:
+                _write_varint(body, (_zigzag(followers - previous) << 1) | 1)
+            self.last[key] = followers
+
+        batch = bytearray()
+        _write_varint(batch, len(body))
+        return bytes(batch + body)
+
+    def _truncate_partial(self):
+        """截掉上次写了一半的批次，否则之后追加的批次无法被读取"""
+        if not self.path.exists():
+            return
+        data = self.path.read_bytes()
+        if not data.startswith(MAGIC):
+            raise ValueError(f"不是粉丝数历史文件: {self.path}")
+        end = _valid_end(data)
+        if end < len(data):
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+
+    def flush(self):
+        """把待写入的点作为一个批次追加到文件，返回写入的字节数"""
+        if not self.points:
+            return 0
+        if not self._checked:
+            self._truncate_partial()
+            self._checked = True
+
+        points, self.points = self.points, []
+        data = self._encode_batch(points)
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            data = MAGIC + data
+        with open(self.path, 'ab') as f:
+            f.write(data)
+        self.written += len(points)
+        return len(data)
+
+
+def _valid_end(data):
+    """最后一个完整批次的结束位置"""
+    pos = len(MAGIC)
+    while pos < len(data):
+        try:
+            length, start = _read_varint(data, pos)
+        except IndexError:
+            break
+        if start + length > len(data):
+            break
+        pos = start + length
+    return pos
+
+
+def iter_points(path):
+    """顺序返回历史文件中的 (时间, user_id, 粉丝数)，粉丝数已还原为绝对值"""
+    path = Path(path)
+    if not path.exists():
+        return
+    data = path.read_bytes()
+    if not data.startswith(MAGIC):
+        raise ValueError(f"不是粉丝数历史文件: {path}")
+
+    last = {}
+    pos = len(MAGIC)
+    valid_end = _valid_end(data)  # 最后一个批次可能在写入时被中断
+    while pos < valid_end:
+        length, start = _read_varint(data, pos)
+        end = start + length
+
+        base, pos = _read_varint(data, start)
+        count, pos = _read_varint(data, pos)
+        for _ in range(count):
+            tagged, pos = _read_varint(data, pos)
+            if tagged & 1:
+                size = tagged >> 1
+                user_id = data[pos:pos + size].decode('utf-8')
+                pos += size
+            else:
+                user_id = str(tagged >> 1)
+            offset, pos = _read_varint(data, pos)
+            value, pos = _read_varint(data, pos)
+            if value & 1:
+                followers = last.get(user_id, 0) + _unzigzag(value >> 1)
+            else:
+                followers = _unzigzag(value >> 1)
+            last[user_id] = followers
+            yield base + offset, user_id, followers
+        pos = end
+
+
+def load_series(path, user_ids=None):
+    """读取历史文件，返回 {user_id: [(时间, 粉丝数), ...]}；可只保留指定用户"""
+    wanted = None if user_ids is None else {str(user_id) for user_id in user_ids}
+    series = {}
+    for timestamp, user_id, followers in iter_points(path):
+        if wanted is None or user_id in wanted:
+            series.setdefault(user_id, []).append((timestamp, followers))
+    return series
@@ -3,10 +3,25 @@ GMGN API 爬虫 - 监控浏览器网络请求并提取 users 数据
 使用 Playwright 来拦截和记录 API 响应
 """
 import asyncio
-import json
+import sys
+import time
 from pathlib import Path
 from playwright.async_api import async_playwright, Route
 from datetime import datetime
+from route_policy import ResourceBlocker, TARGET_ROUTE_PATTERN
+from crawler_metrics import metrics
+from json_codec import dumps_indent, loads_async
+
+try:
+    from config import BLOCK_RESOURCES
+except ImportError:
+    BLOCK_RESOURCES = False
+
+try:
+    from config import SUMMARY_INTERVAL, METRICS_PORT
+except ImportError:
+    SUMMARY_INTERVAL = 10  # 每隔多少秒打印一行运行摘要
+    METRICS_PORT = None  # 本地指标端点端口，None 表示不启动
 
 class GmgnCrawler:
     def __init__(self, output_file='gmgn_users.json'):
@@ -19,26 +34,30 @@ class GmgnCrawler:
         """处理网络请求并提取数据"""
         request = route.request
 
-        # 检查是否是目标 API
+        # 检查是否是目标 API（收到的响应总数由 page.on('response') 计数）
         if request.url.startswith(self.target_url_prefix):
+            metrics.inc('responses_matched')
             try:
                 # 只对目标 API 进行拦截处理
                 response = await route.fetch()
 
                 # 获取响应数据
                 body = await response.body()
-                data = json.loads(body.decode('utf-8'))
+                with metrics.time('parse'):
+                    data = await loads_async(body)
 
                 # 提取 users 数据
                 if data.get('code') == 0 and 'data' in data and 'users' in data['data']:
                     users = data['data']['users']
-                    self.all_users.extend(users)
+                    metrics.inc('responses_parsed')
+                    with metrics.time('merge'):
+                        self.all_users.extend(users)
+                    metrics.inc('users_new', len(users))  # 本版本不去重，所有用户都计为新增
                     self.request_count += 1
 
-                    print(f"\n[{datetime.now().strftime('%H:%M:%S')}] 捕获到第 {self.request_count} 个请求")
-                    print(f"URL: {request.url}")
-                    print(f"本次获取 {len(users)} 个用户")
-                    print(f"累计用户数: {len(self.all_users)}")
+                    # 之后每隔 SUMMARY_INTERVAL 秒打印一行摘要，不再逐个请求打印
+                    if self.request_count == 1:
+                        print(f"[{datetime.now().strftime('%H:%M:%S')}] 捕获到第一个请求: {len(users)} 个用户")
 
                     # 实时保存到文件
                     self.save_data()
@@ -47,6 +66,7 @@ class GmgnCrawler:
                 await route.fulfill(response=response)
 
             except Exception as e:
+                metrics.inc('errors')
                 print(f"解析响应时出错: {e}")
                 # 如果处理失败，继续传递原始请求
                 await route.continue_()
@@ -62,12 +82,12 @@ class GmgnCrawler:
             'users': self.all_users
         }
 
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
-
-        print(f"数据已保存到: {self.output_file.absolute()}")
+        with metrics.time('snapshot_write'):
+            with open(self.output_file, 'w', encoding='utf-8') as f:
+                f.write(dumps_indent(output_data))
+        metrics.inc('bytes_written', self.output_file.stat().st_size)
 
-    async def start_browser(self, headless=False, proxy=None):
+    async def start_browser(self, headless=False, proxy=None, block_resources=False, metrics_port=METRICS_PORT):
         """启动浏览器并开始监控"""
         async with async_playwright() as p:
             # 浏览器启动参数
@@ -95,8 +115,20 @@ class GmgnCrawler:
 
             page = await context.new_page()
 
-            # 拦截所有请求
-            await page.route('**/*', self.handle_route)
+            # 只拦截目标 API，其他请求不经过 Python；所有响应只在监听中计数
+            await page.route(TARGET_ROUTE_PATTERN, self.handle_route)
+            page.on('response', lambda response: metrics.inc('responses_seen'))
+
+            # 可选：屏蔽图片、媒体、字体和第三方统计脚本
+            blocker = None
+            if block_resources:
+                blocker = ResourceBlocker()
+                await blocker.install(page)
+
+            # 可选：本地 Prometheus 指标端点
+            metrics.gauge('users', '累计用户数', lambda: len(self.all_users))
+            if metrics_port:
+                metrics_url = metrics.serve(metrics_port)
 
             print("=" * 60)
             print("GMGN API 爬虫已启动")
@@ -105,6 +137,10 @@ class GmgnCrawler:
             print(f"输出文件: {self.output_file.absolute()}")
             if proxy:
                 print(f"代理设置: {proxy}")
+            if blocker:
+                print("资源屏蔽: 图片 / 媒体 / 字体 / 第三方统计")
+            if metrics_port:
+                print(f"指标端点: {metrics_url}")
             print("\n" + "!" * 60)
             print("重要提示：")
             print("1. 浏览器窗口已打开，请手动访问 https://gmgn.ai/")
@@ -123,22 +159,50 @@ class GmgnCrawler:
                 print("→ 请继续在浏览器中手动访问: https://gmgn.ai/\n")
 
             try:
-                # 保持浏览器打开，直到用户按 Ctrl+C
+                # 保持浏览器打开，直到用户按 Ctrl+C；每隔 SUMMARY_INTERVAL 秒打印一行摘要
+                last_summary = time.monotonic()
                 while True:
                     await asyncio.sleep(1)
+                    if time.monotonic() - last_summary >= SUMMARY_INTERVAL:
+                        last_summary = time.monotonic()
+                        line = metrics.summary_line(len(self.all_users))
+                        if line:
+                            print(line)
             except KeyboardInterrupt:
                 print("\n\n停止爬虫...")
                 print(f"总共捕获 {self.request_count} 个请求")
                 print(f"总共收集 {len(self.all_users)} 个用户")
+                if blocker:
+                    print(f"总共屏蔽 {blocker.describe()}")
                 if len(self.all_users) > 0:
                     self.save_data()
+                    print(f"数据已保存到: {self.output_file.absolute()}")
             finally:
+                metrics.stop()
                 await browser.close()
 
 async def main():
+    block_resources = BLOCK_RESOURCES
+    if '--block-resources' in sys.argv:
+        block_resources = True
+
+    metrics_port = METRICS_PORT
+    if '--metrics-port' in sys.argv:
+        idx = sys.argv.index('--metrics-port')
+        if idx + 1 < len(sys.argv):
+            metrics_port = int(sys.argv[idx + 1])
+
+    if '--help' in sys.argv or '-h' in sys.argv:
+        print("用法:")
+        print("  python gmgn_crawler.py [--block-resources] [--metrics-port <端口>]")
+        print("\n选项:")
+        print("  --block-resources    屏蔽图片、媒体、字体和第三方统计脚本（也可在 config.py 中设置 BLOCK_RESOURCES）")
+        print("  --metrics-port <端口> 在 http://127.0.0.1:<端口>/metrics 提供 Prometheus 指标")
+        return
+
     crawler = GmgnCrawler(output_file='gmgn_users.json')
     # headless=False 表示显示浏览器窗口，方便你操作
-    await crawler.start_browser(headless=False)
+    await crawler.start_browser(headless=False, block_resources=block_resources, metrics_port=metrics_port)
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
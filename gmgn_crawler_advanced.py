@@ -4,11 +4,18 @@ GMGN API 爬虫（高级版本）- 支持配置文件
 支持代理、自定义配置等高级功能
 """
 import asyncio
-import json
 import sys
+import time
 from pathlib import Path
 from playwright.async_api import async_playwright, Route
 from datetime import datetime
+from storage import open_store, STORAGE_BACKEND
+from flush_writer import FlushWriter, FLUSH_INTERVAL, FLUSH_MAX_PENDING_USERS
+from route_policy import ResourceBlocker, TARGET_ROUTE_PATTERN
+from crawler_metrics import metrics
+from proxy_probe import resolve_proxy
+from response_cache import ResponseCache, RESPONSE_CACHE_SIZE
+from json_codec import loads_async
 
 # 尝试加载配置文件
 try:
@@ -19,70 +26,101 @@ except ImportError:
     HEADLESS = False
     OUTPUT_FILE = "gmgn_users_dedup.json"
 
+try:
+    from config import FLUSH_INTERVAL, FLUSH_MAX_PENDING_USERS
+except ImportError:
+    pass  # 使用 flush_writer 中的默认值
+
+try:
+    from config import STORAGE_BACKEND
+except ImportError:
+    pass  # 使用 storage 中的默认值
+
+try:
+    from config import BLOCK_RESOURCES
+except ImportError:
+    BLOCK_RESOURCES = False
+
+try:
+    from config import SUMMARY_INTERVAL, METRICS_PORT
+except ImportError:
+    SUMMARY_INTERVAL = 10  # 每隔多少秒打印一行运行摘要
+    METRICS_PORT = None  # 本地指标端点端口，None 表示不启动
+
+try:
+    from config import RESPONSE_CACHE_SIZE
+except ImportError:
+    pass  # 使用 response_cache 中的默认值
+
 class GmgnCrawlerAdvanced:
-    def __init__(self, output_file=OUTPUT_FILE, proxy=PROXY):
+    def __init__(self, output_file=OUTPUT_FILE, proxy=PROXY, block_resources=BLOCK_RESOURCES,
+                 metrics_port=METRICS_PORT):
         self.output_file = Path(output_file)
-        self.users_dict = {}  # 使用字典存储，key 为 user_id，自动去重
+        self.store = open_store(self.output_file, STORAGE_BACKEND)  # 日志或 SQLite 存储后端
+        self.users_dict = self.store.users  # 使用字典存储，key 为 user_id，自动去重
+        self.writer = FlushWriter(self.store, FLUSH_INTERVAL, FLUSH_MAX_PENDING_USERS)  # 后台刷盘线程
         self.target_url_prefix = 'https://gmgn.ai/vas/api/v1/twitter/user/search'
         self.request_count = 0
         self.proxy = proxy
+        self.blocker = ResourceBlocker() if block_resources else None
+        # 与最近响应完全相同的响应体直接跳过
+        self.response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+        self.metrics_port = metrics_port
 
         # 如果文件已存在，加载已有数据
         self.load_existing_data()
 
     def load_existing_data(self):
-        """加载已存在的数据文件"""
-        if self.output_file.exists():
-            try:
-                with open(self.output_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if 'users' in data:
-                        for user in data['users']:
-                            self.users_dict[user['user_id']] = user
-                        print(f"✓ 加载已有数据: {len(self.users_dict)} 个用户")
-            except Exception as e:
-                print(f"⚠ 加载已有数据失败: {e}")
+        """加载已存在的快照和日志"""
+        try:
+            count = self.store.load()
+            self.users_dict = self.store.users  # 加载时可能换成映射的二进制快照
+            if count > 0:
+                print(f"✓ 加载已有数据: {len(self.users_dict)} 个用户")
+        except Exception as e:
+            print(f"⚠ 加载已有数据失败: {e}")
 
     async def handle_route(self, route: Route):
         """处理网络请求并提取数据"""
         request = route.request
 
-        # 检查是否是目标 API
+        # 检查是否是目标 API（收到的响应总数由 page.on('response') 计数）
         if request.url.startswith(self.target_url_prefix):
+            metrics.inc('responses_matched')
             try:
                 # 只对目标 API 进行拦截处理
                 response = await route.fetch()
 
-                # 获取响应数据
+                # 获取响应数据；与最近某个响应完全相同时跳过解析，使用缓存的用户列表
                 body = await response.body()
-                data = json.loads(body.decode('utf-8'))
-
-                # 提取 users 数据
-                if data.get('code') == 0 and 'data' in data and 'users' in data['data']:
-                    users = data['data']['users']
-
-                    # 统计新增用户
-                    new_users = 0
-                    for user in users:
-                        user_id = user['user_id']
-                        if user_id not in self.users_dict:
-                            new_users += 1
-                        self.users_dict[user_id] = user  # 更新或添加用户
+                fingerprint = self.response_cache.fingerprint(body)
+                users = self.response_cache.get(fingerprint, len(body))
+                if users is None:
+                    with metrics.time('parse'):
+                        data = await loads_async(body)
+
+                    # 提取 users 数据
+                    if data.get('code') == 0 and 'data' in data and 'users' in data['data']:
+                        users = data['data']['users']
+                        metrics.inc('responses_parsed')
+
+                if users is not None:
+                    # 只合并到内存，写盘交给后台线程，统计新增用户
+                    new_users = self.writer.merge(users)
+                    self.response_cache.add(fingerprint, users)
 
                     self.request_count += 1
 
-                    print(f"\n[{datetime.now().strftime('%H:%M:%S')}] ✅ 捕获到第 {self.request_count} 个请求")
-                    print(f"📊 本次获取: {len(users)} 个用户，新增: {new_users} 个")
-                    print(f"📈 累计用户数（去重后）: {len(self.users_dict)}")
-
-                    # 实时保存到文件
-                    if new_users > 0:
-                        self.save_data()
+                    # 之后每隔 SUMMARY_INTERVAL 秒打印一行摘要，不再逐个请求打印
+                    if self.request_count == 1:
+                        print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ 捕获到第一个请求: "
+                              f"{len(users)} 个用户，新增: {new_users} 个")
 
                 # 继续响应
                 await route.fulfill(response=response)
 
             except Exception as e:
+                metrics.inc('errors')
                 print(f"❌ 解析响应时出错: {e}")
                 # 如果处理失败，继续传递原始请求
                 await route.continue_()
@@ -91,24 +129,14 @@ class GmgnCrawlerAdvanced:
             await route.continue_()
 
     def save_data(self):
-        """保存数据到 JSON 文件"""
-        users_list = list(self.users_dict.values())
-        # 按照 followers 数量排序
-        users_list.sort(key=lambda x: x.get('followers', 0), reverse=True)
-
-        output_data = {
-            'total_users': len(users_list),
-            'last_updated': datetime.now().isoformat(),
-            'users': users_list
-        }
-
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
-
+        """写入待保存数据并合并进 JSON 快照文件"""
+        self.writer.flush()
+        self.store.compact()
         print(f"💾 数据已保存到: {self.output_file.absolute()}")
 
     async def start_browser(self, headless=HEADLESS):
         """启动浏览器并开始监控"""
+        self.writer.start()
         async with async_playwright() as p:
             # 浏览器启动参数
             launch_args = {
@@ -136,8 +164,18 @@ class GmgnCrawlerAdvanced:
 
             page = await context.new_page()
 
-            # 拦截所有请求
-            await page.route('**/*', self.handle_route)
+            # 只拦截目标 API，其他请求不经过 Python；所有响应只在监听中计数
+            await page.route(TARGET_ROUTE_PATTERN, self.handle_route)
+            page.on('response', lambda response: metrics.inc('responses_seen'))
+
+            # 可选：屏蔽图片、媒体、字体和第三方统计脚本
+            if self.blocker:
+                await self.blocker.install(page)
+
+            # 可选：本地 Prometheus 指标端点
+            metrics.gauge('users', '去重后的用户数', lambda: len(self.users_dict))
+            if self.metrics_port:
+                metrics_url = metrics.serve(self.metrics_port)
 
             print("\n" + "=" * 70)
             print("🎯 GMGN API 爬虫已启动（高级版本）")
@@ -149,6 +187,10 @@ class GmgnCrawlerAdvanced:
                 print(f"🔐 代理设置: {self.proxy}")
             else:
                 print(f"🌐 代理设置: 无（直连）")
+            if self.blocker:
+                print(f"🚫 资源屏蔽: 图片 / 媒体 / 字体 / 第三方统计")
+            if self.metrics_port:
+                print(f"📈 指标端点: {metrics_url}")
 
             print("\n" + "!" * 70)
             print("📋 使用说明：")
@@ -170,9 +212,15 @@ class GmgnCrawlerAdvanced:
                 print("👉 请继续在浏览器中手动访问: https://gmgn.ai/\n")
 
             try:
-                # 保持浏览器打开，直到用户按 Ctrl+C
+                # 保持浏览器打开，直到用户按 Ctrl+C；每隔 SUMMARY_INTERVAL 秒打印一行摘要
+                last_summary = time.monotonic()
                 while True:
                     await asyncio.sleep(1)
+                    if time.monotonic() - last_summary >= SUMMARY_INTERVAL:
+                        last_summary = time.monotonic()
+                        line = metrics.summary_line(len(self.users_dict))
+                        if line:
+                            print(line)
             except KeyboardInterrupt:
                 print("\n\n" + "=" * 70)
                 print("🛑 正在停止爬虫...")
@@ -180,18 +228,26 @@ class GmgnCrawlerAdvanced:
                 print(f"📊 统计信息：")
                 print(f"   - 捕获请求数: {self.request_count}")
                 print(f"   - 收集用户数: {len(self.users_dict)}")
+                self.response_cache.print_summary()
+                if self.blocker:
+                    self.blocker.print_summary()
                 if len(self.users_dict) > 0:
                     self.save_data()
                     print(f"\n✅ 爬虫已成功停止")
                 else:
                     print(f"\n⚠️  未捕获到任何数据")
             finally:
+                # 无论如何退出都保证最后一次刷盘
+                self.writer.close()
+                metrics.stop()
                 await browser.close()
 
 async def main():
     # 支持命令行参数
     proxy = PROXY
     output_file = OUTPUT_FILE
+    block_resources = BLOCK_RESOURCES
+    metrics_port = METRICS_PORT
 
     if len(sys.argv) > 1:
         if '--proxy' in sys.argv:
@@ -204,6 +260,14 @@ async def main():
             if idx + 1 < len(sys.argv):
                 output_file = sys.argv[idx + 1]
 
+        if '--block-resources' in sys.argv:
+            block_resources = True
+
+        if '--metrics-port' in sys.argv:
+            idx = sys.argv.index('--metrics-port')
+            if idx + 1 < len(sys.argv):
+                metrics_port = int(sys.argv[idx + 1])
+
         if '--help' in sys.argv or '-h' in sys.argv:
             print("GMGN API 爬虫 - 高级版本")
             print("\n用法:")
@@ -211,17 +275,29 @@ async def main():
             print("\n选项:")
             print("  --proxy <代理地址>    设置代理服务器")
             print("                       例如: --proxy http://127.0.0.1:7890")
+            print("                       auto 表示使用 test_proxy.py 探测出的最快代理")
             print("  --output <文件名>     设置输出文件名")
             print("                       例如: --output my_data.json")
+            print("  --block-resources    屏蔽图片、媒体、字体和第三方统计脚本")
+            print("  --metrics-port <端口> 在 http://127.0.0.1:<端口>/metrics 提供 Prometheus 指标")
             print("  --help, -h           显示此帮助信息")
             print("\n示例:")
             print("  python gmgn_crawler_advanced.py --proxy http://127.0.0.1:7890")
             print("  python gmgn_crawler_advanced.py --output my_users.json")
+            print("  python gmgn_crawler_advanced.py --block-resources")
             print("\n配置文件:")
             print("  可以编辑 config.py 文件来设置默认配置")
             return
 
-    crawler = GmgnCrawlerAdvanced(output_file=output_file, proxy=proxy)
+    try:
+        # auto: 使用 test_proxy.py 写出的 proxies_ranked.json 中排名第一的代理
+        proxy = resolve_proxy(proxy)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    crawler = GmgnCrawlerAdvanced(output_file=output_file, proxy=proxy, block_resources=block_resources,
+                                  metrics_port=metrics_port)
     await crawler.start_browser(headless=HEADLESS)
 
 if __name__ == '__main__':
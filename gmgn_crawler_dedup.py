@@ -3,15 +3,34 @@ GMGN API 爬虫（去重版本）- 监控浏览器网络请求并提取 users 
 使用 Playwright 来拦截和记录 API 响应，自动去重用户
 """
 import asyncio
-import json
+import sys
+import time
 from pathlib import Path
 from playwright.async_api import async_playwright, Route
 from datetime import datetime
+from route_policy import ResourceBlocker, TARGET_ROUTE_PATTERN
+from storage import open_store, STORAGE_BACKEND
+from flush_writer import FlushWriter
+from crawler_metrics import metrics
+from json_codec import loads_async
+
+try:
+    from config import BLOCK_RESOURCES
+except ImportError:
+    BLOCK_RESOURCES = False
+
+try:
+    from config import SUMMARY_INTERVAL, METRICS_PORT
+except ImportError:
+    SUMMARY_INTERVAL = 10  # 每隔多少秒打印一行运行摘要
+    METRICS_PORT = None  # 本地指标端点端口，None 表示不启动
 
 class GmgnCrawlerDedup:
     def __init__(self, output_file='gmgn_users_dedup.json'):
         self.output_file = Path(output_file)
-        self.users_dict = {}  # 使用字典存储，key 为 user_id，自动去重
+        self.store = open_store(self.output_file, STORAGE_BACKEND)  # 日志或 SQLite 存储后端
+        self.users_dict = self.store.users  # 使用字典存储，key 为 user_id，自动去重
+        self.writer = FlushWriter(self.store)  # 后台刷盘线程
         self.target_url_prefix = 'https://gmgn.ai/vas/api/v1/twitter/user/search'
         self.request_count = 0
 
@@ -19,59 +38,51 @@ class GmgnCrawlerDedup:
         self.load_existing_data()
 
     def load_existing_data(self):
-        """加载已存在的数据文件"""
-        if self.output_file.exists():
-            try:
-                with open(self.output_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if 'users' in data:
-                        for user in data['users']:
-                            self.users_dict[user['user_id']] = user
-                        print(f"加载已有数据: {len(self.users_dict)} 个用户")
-            except Exception as e:
-                print(f"加载已有数据失败: {e}")
+        """加载已存在的快照和日志"""
+        try:
+            count = self.store.load()
+            self.users_dict = self.store.users  # 加载时可能换成映射的二进制快照
+            if count > 0:
+                print(f"加载已有数据: {len(self.users_dict)} 个用户")
+        except Exception as e:
+            print(f"加载已有数据失败: {e}")
 
     async def handle_route(self, route: Route):
         """处理网络请求并提取数据"""
         request = route.request
 
-        # 检查是否是目标 API
+        # 检查是否是目标 API（收到的响应总数由 page.on('response') 计数）
         if request.url.startswith(self.target_url_prefix):
+            metrics.inc('responses_matched')
             try:
                 # 只对目标 API 进行拦截处理
                 response = await route.fetch()
 
                 # 获取响应数据
                 body = await response.body()
-                data = json.loads(body.decode('utf-8'))
+                with metrics.time('parse'):
+                    data = await loads_async(body)
 
                 # 提取 users 数据
                 if data.get('code') == 0 and 'data' in data and 'users' in data['data']:
                     users = data['data']['users']
+                    metrics.inc('responses_parsed')
 
-                    # 统计新增用户
-                    new_users = 0
-                    for user in users:
-                        user_id = user['user_id']
-                        if user_id not in self.users_dict:
-                            new_users += 1
-                        self.users_dict[user_id] = user  # 更新或添加用户
+                    # 只合并到内存，写盘交给后台线程，统计新增用户
+                    new_users = self.writer.merge(users)
 
                     self.request_count += 1
 
-                    print(f"\n[{datetime.now().strftime('%H:%M:%S')}] 捕获到第 {self.request_count} 个请求")
-                    print(f"URL: {request.url}")
-                    print(f"本次获取: {len(users)} 个用户，新增: {new_users} 个")
-                    print(f"累计用户数（去重后）: {len(self.users_dict)}")
-
-                    # 实时保存到文件
-                    if new_users > 0:
-                        self.save_data()
+                    # 之后每隔 SUMMARY_INTERVAL 秒打印一行摘要，不再逐个请求打印
+                    if self.request_count == 1:
+                        print(f"[{datetime.now().strftime('%H:%M:%S')}] 捕获到第一个请求: "
+                              f"{len(users)} 个用户，新增: {new_users} 个")
 
                 # 继续响应
                 await route.fulfill(response=response)
 
             except Exception as e:
+                metrics.inc('errors')
                 print(f"解析响应时出错: {e}")
                 # 如果处理失败，继续传递原始请求
                 await route.continue_()
@@ -80,24 +91,14 @@ class GmgnCrawlerDedup:
             await route.continue_()
 
     def save_data(self):
-        """保存数据到 JSON 文件"""
-        users_list = list(self.users_dict.values())
-        # 按照 followers 数量排序
-        users_list.sort(key=lambda x: x.get('followers', 0), reverse=True)
-
-        output_data = {
-            'total_users': len(users_list),
-            'last_updated': datetime.now().isoformat(),
-            'users': users_list
-        }
-
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
-
+        """写入待保存数据并合并进 JSON 快照文件"""
+        self.writer.flush()
+        self.store.compact()
         print(f"✅ 数据已保存到: {self.output_file.absolute()}")
 
-    async def start_browser(self, headless=False, proxy=None):
+    async def start_browser(self, headless=False, proxy=None, block_resources=False, metrics_port=METRICS_PORT):
         """启动浏览器并开始监控"""
+        self.writer.start()
         async with async_playwright() as p:
             # 浏览器启动参数
             launch_args = {
@@ -124,8 +125,20 @@ class GmgnCrawlerDedup:
 
             page = await context.new_page()
 
-            # 拦截所有请求
-            await page.route('**/*', self.handle_route)
+            # 只拦截目标 API，其他请求不经过 Python；所有响应只在监听中计数
+            await page.route(TARGET_ROUTE_PATTERN, self.handle_route)
+            page.on('response', lambda response: metrics.inc('responses_seen'))
+
+            # 可选：屏蔽图片、媒体、字体和第三方统计脚本
+            blocker = None
+            if block_resources:
+                blocker = ResourceBlocker()
+                await blocker.install(page)
+
+            # 可选：本地 Prometheus 指标端点
+            metrics.gauge('users', '去重后的用户数', lambda: len(self.users_dict))
+            if metrics_port:
+                metrics_url = metrics.serve(metrics_port)
 
             print("=" * 60)
             print("GMGN API 爬虫已启动（去重版本）")
@@ -135,6 +148,10 @@ class GmgnCrawlerDedup:
             print(f"已有用户: {len(self.users_dict)}")
             if proxy:
                 print(f"代理设置: {proxy}")
+            if blocker:
+                print("资源屏蔽: 图片 / 媒体 / 字体 / 第三方统计")
+            if metrics_port:
+                print(f"指标端点: {metrics_url}")
             print("\n" + "!" * 60)
             print("重要提示：")
             print("1. 浏览器窗口已打开，请手动访问 https://gmgn.ai/")
@@ -153,22 +170,51 @@ class GmgnCrawlerDedup:
                 print("→ 请继续在浏览器中手动访问: https://gmgn.ai/\n")
 
             try:
-                # 保持浏览器打开，直到用户按 Ctrl+C
+                # 保持浏览器打开，直到用户按 Ctrl+C；每隔 SUMMARY_INTERVAL 秒打印一行摘要
+                last_summary = time.monotonic()
                 while True:
                     await asyncio.sleep(1)
+                    if time.monotonic() - last_summary >= SUMMARY_INTERVAL:
+                        last_summary = time.monotonic()
+                        line = metrics.summary_line(len(self.users_dict))
+                        if line:
+                            print(line)
             except KeyboardInterrupt:
                 print("\n\n停止爬虫...")
                 print(f"总共捕获 {self.request_count} 个请求")
                 print(f"总共收集 {len(self.users_dict)} 个不同用户")
+                if blocker:
+                    print(f"总共屏蔽 {blocker.describe()}")
                 if len(self.users_dict) > 0:
                     self.save_data()
             finally:
+                # 无论如何退出都保证最后一次刷盘
+                self.writer.close()
+                metrics.stop()
                 await browser.close()
 
 async def main():
+    block_resources = BLOCK_RESOURCES
+    if '--block-resources' in sys.argv:
+        block_resources = True
+
+    metrics_port = METRICS_PORT
+    if '--metrics-port' in sys.argv:
+        idx = sys.argv.index('--metrics-port')
+        if idx + 1 < len(sys.argv):
+            metrics_port = int(sys.argv[idx + 1])
+
+    if '--help' in sys.argv or '-h' in sys.argv:
+        print("用法:")
+        print("  python gmgn_crawler_dedup.py [--block-resources] [--metrics-port <端口>]")
+        print("\n选项:")
+        print("  --block-resources    屏蔽图片、媒体、字体和第三方统计脚本（也可在 config.py 中设置 BLOCK_RESOURCES）")
+        print("  --metrics-port <端口> 在 http://127.0.0.1:<端口>/metrics 提供 Prometheus 指标")
+        return
+
     crawler = GmgnCrawlerDedup(output_file='gmgn_users_dedup.json')
     # headless=False 表示显示浏览器窗口，方便你操作
-    await crawler.start_browser(headless=False)
+    await crawler.start_browser(headless=False, block_resources=block_resources, metrics_port=metrics_port)
 
 if __name__ == '__main__':
     asyncio.run(main())
\ No newline at end of file
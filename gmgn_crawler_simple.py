@@ -3,15 +3,27 @@ GMGN API 爬虫（简化版）- 不使用代理
 直接监听浏览器响应，适合能直接访问 gmgn.ai 的用户
 """
 import asyncio
-import json
+import time
 from pathlib import Path
 from playwright.async_api import async_playwright, Response
 from datetime import datetime
+from storage import open_store, STORAGE_BACKEND
+from flush_writer import FlushWriter
+from crawler_metrics import metrics
+from json_codec import loads_async
+
+try:
+    from config import SUMMARY_INTERVAL, METRICS_PORT
+except ImportError:
+    SUMMARY_INTERVAL = 10  # 每隔多少秒打印一行运行摘要
+    METRICS_PORT = None  # 本地指标端点端口，None 表示不启动
 
 class GmgnCrawlerSimple:
     def __init__(self, output_file='gmgn_users_dedup.json'):
         self.output_file = Path(output_file)
-        self.users_dict = {}
+        self.store = open_store(self.output_file, STORAGE_BACKEND)  # 日志或 SQLite 存储后端
+        self.users_dict = self.store.users  # 使用字典存储，key 为 user_id，自动去重
+        self.writer = FlushWriter(self.store)  # 后台刷盘线程
         self.target_url_prefix = 'https://gmgn.ai/vas/api/v1/twitter/user/search'
         self.request_count = 0
 
@@ -19,63 +31,51 @@ class GmgnCrawlerSimple:
         self.load_existing_data()
 
     def load_existing_data(self):
-        """加载已存在的数据文件"""
-        if self.output_file.exists():
-            try:
-                with open(self.output_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if 'users' in data:
-                        for user in data['users']:
-                            self.users_dict[user['user_id']] = user
-                        print(f"✓ 加载已有数据: {len(self.users_dict)} 个用户")
-            except Exception as e:
-                print(f"⚠ 加载已有数据失败: {e}")
+        """加载已存在的快照和日志"""
+        try:
+            count = self.store.load()
+            self.users_dict = self.store.users  # 加载时可能换成映射的二进制快照
+            if count > 0:
+                print(f"✓ 加载已有数据: {len(self.users_dict)} 个用户")
+        except Exception as e:
+            print(f"⚠ 加载已有数据失败: {e}")
 
     async def handle_response(self, response: Response):
         """处理响应数据"""
         try:
+            metrics.inc('responses_seen')
             if response.url.startswith(self.target_url_prefix) and response.status == 200:
+                metrics.inc('responses_matched')
                 try:
-                    data = await response.json()
+                    body = await response.body()
+                    with metrics.time('parse'):
+                        data = await loads_async(body)
                     if data.get('code') == 0 and 'data' in data and 'users' in data['data']:
                         users = data['data']['users']
-                        new_users = 0
-                        for user in users:
-                            user_id = user['user_id']
-                            if user_id not in self.users_dict:
-                                new_users += 1
-                            self.users_dict[user_id] = user
+                        metrics.inc('responses_parsed')
+                        # 只合并到内存，写盘交给后台线程，统计新增用户
+                        new_users = self.writer.merge(users)
 
                         self.request_count += 1
-                        print(f"\n[{datetime.now().strftime('%H:%M:%S')}] ✅ 捕获到第 {self.request_count} 个请求")
-                        print(f"📊 本次获取: {len(users)} 个用户，新增: {new_users} 个")
-                        print(f"📈 累计用户数（去重后）: {len(self.users_dict)}")
-
-                        if new_users > 0:
-                            self.save_data()
+                        # 之后每隔 SUMMARY_INTERVAL 秒打印一行摘要，不再逐个请求打印
+                        if self.request_count == 1:
+                            print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ 捕获到第一个请求: "
+                                  f"{len(users)} 个用户，新增: {new_users} 个")
                 except Exception as e:
+                    metrics.inc('errors')
                     print(f"❌ 解析响应时出错: {e}")
         except Exception:
             pass
 
     def save_data(self):
-        """保存数据到 JSON 文件"""
-        users_list = list(self.users_dict.values())
-        users_list.sort(key=lambda x: x.get('followers', 0), reverse=True)
-
-        output_data = {
-            'total_users': len(users_list),
-            'last_updated': datetime.now().isoformat(),
-            'users': users_list
-        }
-
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
-
+        """写入待保存数据并合并进 JSON 快照文件"""
+        self.writer.flush()
+        self.store.compact()
         print(f"💾 数据已保存到: {self.output_file.absolute()}")
 
-    async def start_browser(self):
+    async def start_browser(self, metrics_port=METRICS_PORT):
         """启动浏览器并开始监控"""
+        self.writer.start()
         async with async_playwright() as p:
             print("\n🚀 正在启动浏览器...")
             browser = await p.chromium.launch(
@@ -91,6 +91,11 @@ class GmgnCrawlerSimple:
             page = await context.new_page()
             page.on('response', lambda response: asyncio.create_task(self.handle_response(response)))
 
+            # 可选：本地 Prometheus 指标端点（config.py 中的 METRICS_PORT）
+            metrics.gauge('users', '去重后的用户数', lambda: len(self.users_dict))
+            if metrics_port:
+                metrics_url = metrics.serve(metrics_port)
+
             print("\n" + "=" * 70)
             print("🎯 GMGN API 爬虫已启动（简化版 - 无代理）")
             print("=" * 70)
@@ -98,6 +103,8 @@ class GmgnCrawlerSimple:
             print(f"💾 输出文件: {self.output_file.absolute()}")
             print(f"📊 已有用户: {len(self.users_dict)}")
             print(f"🌐 连接方式: 直连（不使用代理）")
+            if metrics_port:
+                print(f"📈 指标端点: {metrics_url}")
 
             print("\n" + "!" * 70)
             print("📋 使用说明：")
@@ -118,8 +125,15 @@ class GmgnCrawlerSimple:
                 print("👉 请继续在浏览器中手动访问: https://gmgn.ai/\n")
 
             try:
+                # 每隔 SUMMARY_INTERVAL 秒打印一行摘要
+                last_summary = time.monotonic()
                 while True:
                     await asyncio.sleep(1)
+                    if time.monotonic() - last_summary >= SUMMARY_INTERVAL:
+                        last_summary = time.monotonic()
+                        line = metrics.summary_line(len(self.users_dict))
+                        if line:
+                            print(line)
             except KeyboardInterrupt:
                 print("\n\n" + "=" * 70)
                 print("🛑 正在停止爬虫...")
@@ -133,6 +147,9 @@ class GmgnCrawlerSimple:
                 else:
                     print(f"\n⚠️  未捕获到任何数据")
             finally:
+                # 无论如何退出都保证最后一次刷盘
+                self.writer.close()
+                metrics.stop()
                 await browser.close()
 
 async def main():
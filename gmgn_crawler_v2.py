@@ -4,11 +4,25 @@ GMGN API 爬虫（高级版本 v2）- 使用响应监听而非请求拦截
 支持代理、更稳定、不会卡顿
 """
 import asyncio
-import json
 import sys
+import threading
+import time
 from pathlib import Path
 from playwright.async_api import async_playwright, Response
 from datetime import datetime
+from storage import open_store, STORAGE_BACKEND
+from flush_writer import FlushWriter, FLUSH_INTERVAL, FLUSH_MAX_PENDING_USERS
+from response_queue import ResponseQueue, RESPONSE_QUEUE_SIZE, RESPONSE_WORKERS
+from api_replay import ApiTemplate, ApiReplayer, load_variations
+from page_pool import PagePool, MAX_PAGES
+from crawler_metrics import metrics
+from json_codec import loads_async
+from user_stats import LiveStats
+from analyze_data import print_report
+from proxy_probe import resolve_proxy, resolve_proxies
+from proxy_pool import ProxyPool, PROXY_CHECK_INTERVAL
+from response_cache import ResponseCache, RESPONSE_CACHE_SIZE
+from warm_start import BROWSER_PROFILE_DIR, WARM_START_URL, StartupTimer, mark_profile, prepare_profile
 
 # 尝试加载配置文件
 try:
@@ -19,29 +33,108 @@ except ImportError:
     HEADLESS = False
     OUTPUT_FILE = "gmgn_users_dedup.json"
 
+try:
+    from config import FLUSH_INTERVAL, FLUSH_MAX_PENDING_USERS
+except ImportError:
+    pass  # 使用 flush_writer 中的默认值
+
+try:
+    from config import STORAGE_BACKEND
+except ImportError:
+    pass  # 使用 storage 中的默认值
+
+try:
+    from config import RESPONSE_QUEUE_SIZE, RESPONSE_WORKERS
+except ImportError:
+    pass  # 使用 response_queue 中的默认值
+
+try:
+    from config import MAX_PAGES
+except ImportError:
+    pass  # 使用 page_pool 中的默认值
+
+try:
+    from config import LIVE_STATS_EVERY
+except ImportError:
+    LIVE_STATS_EVERY = 20  # 每捕获多少个请求打印一次实时统计
+
+try:
+    from config import SUMMARY_INTERVAL, METRICS_PORT
+except ImportError:
+    SUMMARY_INTERVAL = 10  # 每隔多少秒打印一行运行摘要
+    METRICS_PORT = None  # 本地指标端点端口，None 表示不启动
+
+try:
+    from config import RESPONSE_CACHE_SIZE
+except ImportError:
+    pass  # 使用 response_cache 中的默认值
+
+try:
+    from config import WARM_START, BROWSER_PROFILE_DIR, WARM_START_URL
+except ImportError:
+    WARM_START = False  # 使用持久化的浏览器用户数据目录并自动打开 gmgn.ai
+
+try:
+    from config import PROXY_POOL, PROXY_CHECK_INTERVAL
+except ImportError:
+    PROXY_POOL = None  # 代理池，None 表示不使用
+
 class GmgnCrawlerV2:
-    def __init__(self, output_file=OUTPUT_FILE, proxy=PROXY):
+    def __init__(self, output_file=OUTPUT_FILE, proxy=PROXY, replay=False, replay_variations=None,
+                 page_count=1, proxies=None, metrics_port=METRICS_PORT, proxy_pool=PROXY_POOL,
+                 warm_start=WARM_START, profile_dir=BROWSER_PROFILE_DIR):
         self.output_file = Path(output_file)
-        self.users_dict = {}  # 使用字典存储，key 为 user_id，自动去重
+        self.store = open_store(self.output_file, STORAGE_BACKEND)  # 日志或 SQLite 存储后端
+        self.users_dict = self.store.users  # 使用字典存储，key 为 user_id，自动去重
+        self.writer = FlushWriter(self.store, FLUSH_INTERVAL, FLUSH_MAX_PENDING_USERS)  # 后台刷盘线程
         self.target_url_prefix = 'https://gmgn.ai/vas/api/v1/twitter/user/search'
         self.request_count = 0
         self.proxy = proxy
+        # 有界响应队列 + 固定工作协程，避免为每个响应创建任务
+        self.response_queue = ResponseQueue(self.handle_response, self.target_url_prefix,
+                                            RESPONSE_QUEUE_SIZE, RESPONSE_WORKERS)
+        # 直连翻页模式：捕获到第一个搜索请求后脱离浏览器自动翻页
+        self.replay = replay
+        self.replay_variations = replay_variations
+        self.replay_started = False
+        self.replayer = None
+        self.replay_task = None
+        # 多页面并行捕获：page_count 个页面，或每个代理一个上下文
+        self.page_count = page_count
+        self.proxies = proxies
+        self.page_pool = None
+        # 代理池：后台健康检查，新上下文分配最健康的代理，代理不健康时换掉
+        self.proxy_pool = ProxyPool(proxy_pool, PROXY_CHECK_INTERVAL) if proxy_pool else None
+        self.live_stats = None
+        self.live_stats_thread = None  # 后台统计已有数据的线程，停止时等待它结束
+        # 与最近响应完全相同的响应体直接跳过
+        self.response_cache = ResponseCache(RESPONSE_CACHE_SIZE)
+        # 热启动：持久化的用户数据目录（Cookie、Cloudflare 验证、HTTP 缓存），启动后自动打开 gmgn.ai
+        self.warm_start = warm_start
+        self.profile_dir = profile_dir
+        self.startup = None  # StartupTimer，记录到第一次捕获的耗时
+        self.metrics_port = metrics_port
 
         # 如果文件已存在，加载已有数据
         self.load_existing_data()
 
     def load_existing_data(self):
-        """加载已存在的数据文件"""
-        if self.output_file.exists():
-            try:
-                with open(self.output_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if 'users' in data:
-                        for user in data['users']:
-                            self.users_dict[user['user_id']] = user
-                        print(f"✓ 加载已有数据: {len(self.users_dict)} 个用户")
-            except Exception as e:
-                print(f"⚠ 加载已有数据失败: {e}")
+        """加载已存在的快照和日志"""
+        try:
+            count = self.store.load()
+            self.users_dict = self.store.users  # 加载时可能换成映射的二进制快照
+            if count > 0:
+                print(f"✓ 加载已有数据: {len(self.users_dict)} 个用户")
+        except Exception as e:
+            print(f"⚠ 加载已有数据失败: {e}")
+
+        # 实时统计：在后台线程中统计一次已有数据（不拖慢启动），之后每次合并按差值更新
+        self.live_stats_thread = threading.Thread(target=self.start_live_stats, daemon=True)
+        self.live_stats_thread.start()
+
+    def start_live_stats(self):
+        """统计已有数据并挂到存储上（在用户表的拷贝上扫描，期间的合并不用等待）"""
+        self.live_stats = LiveStats.attach(self.store)
 
     async def handle_response(self, response: Response):
         """处理响应数据"""
@@ -51,57 +144,83 @@ class GmgnCrawlerV2:
                 # 只处理成功的响应
                 if response.status == 200:
                     try:
-                        # 获取响应数据
-                        data = await response.json()
-
-                        # 提取 users 数据
-                        if data.get('code') == 0 and 'data' in data and 'users' in data['data']:
-                            users = data['data']['users']
-
-                            # 统计新增用户
-                            new_users = 0
-                            for user in users:
-                                user_id = user['user_id']
-                                if user_id not in self.users_dict:
-                                    new_users += 1
-                                self.users_dict[user_id] = user  # 更新或添加用户
+                        # 获取响应数据；与最近某个响应完全相同时跳过解析，使用缓存的用户列表
+                        body = await response.body()
+                        fingerprint = self.response_cache.fingerprint(body)
+                        users = self.response_cache.get(fingerprint, len(body))
+                        if users is None:
+                            with metrics.time('parse'):
+                                data = await loads_async(body)  # 大响应在线程池中解码
+
+                            # 提取 users 数据
+                            if data.get('code') == 0 and 'data' in data and 'users' in data['data']:
+                                users = data['data']['users']
+                                metrics.inc('responses_parsed')
+
+                        if users is not None:
+                            # 只合并到内存，写盘交给后台线程，统计新增用户
+                            new_users = self.writer.merge(users)
+                            self.response_cache.add(fingerprint, users)
 
                             self.request_count += 1
-
-                            print(f"\n[{datetime.now().strftime('%H:%M:%S')}] ✅ 捕获到第 {self.request_count} 个请求")
-                            print(f"📊 本次获取: {len(users)} 个用户，新增: {new_users} 个")
-                            print(f"📈 累计用户数（去重后）: {len(self.users_dict)}")
-
-                            # 实时保存到文件
-                            if new_users > 0:
-                                self.save_data()
+                            page = response.frame.page
+                            self.page_pool.record(page, len(users), new_users)
+                            if self.proxy_pool:
+                                timing = response.request.timing
+                                latency = timing.get('responseStart', -1)
+                                self.proxy_pool.record(self.page_pool.proxy_of(page), True,
+                                                       latency if latency > 0 else None)
+
+                            # 之后每隔 SUMMARY_INTERVAL 秒打印一行摘要，不再逐个请求打印
+                            if self.request_count == 1:
+                                elapsed = self.startup.first_capture() if self.startup else None
+                                took = f"（启动后 {elapsed:.1f}s）" if elapsed is not None else ''
+                                print(f"[{datetime.now().strftime('%H:%M:%S')}] ✅ 捕获到第一个请求{took}: "
+                                      f"{len(users)} 个用户，新增: {new_users} 个")
+                            if self.live_stats and LIVE_STATS_EVERY and self.request_count % LIVE_STATS_EVERY == 0:
+                                print(self.live_stats.summary_line())
+
+                            if self.replay and not self.replay_started:
+                                await self.start_replay(response)
 
                     except Exception as e:
+                        metrics.inc('errors')
                         print(f"❌ 解析响应时出错: {e}")
 
         except Exception as e:
             # 忽略错误，继续监听
             pass
 
-    def save_data(self):
-        """保存数据到 JSON 文件"""
-        users_list = list(self.users_dict.values())
-        # 按照 followers 数量排序
-        users_list.sort(key=lambda x: x.get('followers', 0), reverse=True)
+    def attach_page(self, page):
+        """给新页面挂上监听（换代理后重建的页面也会调用）"""
+        page.on('response', self.response_queue.submit)
+        if self.proxy_pool:
+            page.on('requestfailed', lambda request: self.handle_request_failed(page, request))
+
+    def handle_request_failed(self, page, request):
+        """gmgn.ai 的请求失败（超时、代理断开等）计入该页面代理的错误率"""
+        if request.url.startswith('https://gmgn.ai/'):
+            self.proxy_pool.record(self.page_pool.proxy_of(page), False, error=request.failure)
 
-        output_data = {
-            'total_users': len(users_list),
-            'last_updated': datetime.now().isoformat(),
-            'users': users_list
-        }
+    async def start_replay(self, response):
+        """用捕获到的请求模板启动直连翻页"""
+        self.replay_started = True  # 防止多个工作协程重复启动
+        template = await ApiTemplate.from_response(response, response.frame.page.context)
+        template.save()
+        print(f"🔁 已捕获请求模板，开始直连翻页（模板已保存到 api_template.json）")
 
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, ensure_ascii=False, indent=2)
+        self.replayer = ApiReplayer(template, self.writer.merge)
+        self.replay_task = asyncio.create_task(self.replayer.run(self.replay_variations))
 
+    def save_data(self):
+        """写入待保存数据并合并进 JSON 快照文件"""
+        self.writer.flush()
+        self.store.compact()
         print(f"💾 数据已保存到: {self.output_file.absolute()}")
 
     async def start_browser(self, headless=HEADLESS):
         """启动浏览器并开始监控"""
+        self.writer.start()
         async with async_playwright() as p:
             # 浏览器启动参数
             launch_args = {
@@ -122,16 +241,43 @@ class GmgnCrawlerV2:
             if self.proxy:
                 context_args['proxy'] = {'server': self.proxy}
 
+            if self.warm_start and (self.proxies or self.proxy_pool):
+                print("⚠️  多代理 / 代理池需要为每个页面新建上下文，不能与持久化用户数据目录同时使用，改为普通启动")
+                self.warm_start = False
+
             # 启动浏览器
             print("\n🚀 正在启动浏览器...")
-            browser = await p.chromium.launch(**launch_args)
+            browser = None
+            persistent = None
+            if self.warm_start:
+                profile_dir, warm = prepare_profile(self.profile_dir)
+                self.startup = StartupTimer('warm' if warm else 'profile-cold')
+                # 持久化上下文：Cookie、Cloudflare 验证结果和 HTTP 缓存都保存在用户数据目录中
+                persistent = await p.chromium.launch_persistent_context(
+                    str(profile_dir), **launch_args, **context_args)
+                mark_profile(profile_dir)
+            else:
+                self.startup = StartupTimer('cold')
+                browser = await p.chromium.launch(**launch_args)
+            self.startup.mark('launch')
+
+            if self.proxy_pool:
+                print(f"🩺 检查代理池中的 {len(self.proxy_pool.states)} 个代理...")
+                await asyncio.to_thread(self.proxy_pool.start)
 
-            # 创建浏览器上下文（带代理配置）
-            context = await browser.new_context(**context_args)
-            page = await context.new_page()
+            # 创建浏览器上下文（带代理配置）和页面，所有页面共用同一个存储
+            self.page_pool = PagePool(browser, context_args, MAX_PAGES, self.proxy_pool, self.attach_page,
+                                      context=persistent)
+            pages = await self.page_pool.open(self.page_count, self.proxies)
 
-            # 监听响应事件（不拦截请求）
-            page.on('response', lambda response: asyncio.create_task(self.handle_response(response)))
+            # 可选：本地 Prometheus 指标端点
+            metrics.gauge('users', '去重后的用户数', lambda: len(self.users_dict))
+            metrics.gauge('response_queue_depth', '响应队列当前深度', lambda: self.response_queue.queue.qsize())
+            if self.metrics_port:
+                metrics_url = metrics.serve(self.metrics_port)
+
+            # 监听响应事件（不拦截请求），过滤后放入有界队列；监听在打开页面时由 attach_page 挂上
+            self.response_queue.start()
 
             print("\n" + "=" * 70)
             print("🎯 GMGN API 爬虫已启动（高级版本 v2 - 响应监听模式）")
@@ -139,54 +285,123 @@ class GmgnCrawlerV2:
             print(f"📡 目标 API: {self.target_url_prefix}")
             print(f"💾 输出文件: {self.output_file.absolute()}")
             print(f"📊 已有用户: {len(self.users_dict)}")
-            if self.proxy:
+            if self.proxy_pool:
+                print(f"🔐 代理池: {len(self.proxy_pool.states)} 个代理，健康 {self.proxy_pool.healthy_count()} 个"
+                      f"（每 {self.proxy_pool.check_interval} 秒检查一次）")
+                for page in pages:
+                    print(f"   {self.page_pool.label(page)}")
+            elif self.proxy:
                 print(f"🔐 代理设置: {self.proxy}")
             else:
                 print(f"🌐 代理设置: 无（直连）")
+            if len(pages) > 1:
+                print(f"🗂️  页面数: {len(pages)}")
+                if self.proxies:
+                    print(f"🔐 多代理: {', '.join(self.proxies)}")
+            if self.metrics_port:
+                print(f"📈 指标端点: {metrics_url}")
 
             print("\n" + "!" * 70)
             print("📋 使用说明：")
             print("  1️⃣  浏览器窗口已打开")
-            print("  2️⃣  请手动在浏览器地址栏输入: https://gmgn.ai/")
+            if self.warm_start:
+                print(f"  2️⃣  已自动打开: {WARM_START_URL}（热启动，用户数据目录: {self.profile_dir}）")
+            else:
+                print("  2️⃣  请手动在浏览器地址栏输入: https://gmgn.ai/")
             print("  3️⃣  在页面中搜索、浏览用户")
             print("  4️⃣  爬虫会自动捕获 API 响应并保存数据")
             print("  5️⃣  按 Ctrl+C 停止爬虫")
             print("\n💡 提示：使用响应监听模式，页面加载更流畅！")
             print("!" * 70 + "\n")
 
-            # 打开空白页，让用户手动访问 gmgn.ai
+            # 热启动时直接打开 gmgn.ai；否则打开空白页，让用户手动访问
             try:
-                await page.goto('about:blank', timeout=5000)
-                print("✅ 浏览器已就绪")
-                print("👉 请在浏览器中手动访问: https://gmgn.ai/\n")
+                if self.warm_start:
+                    await asyncio.gather(*(page.goto(WARM_START_URL, timeout=60000, wait_until='domcontentloaded')
+                                           for page in pages))
+                    self.startup.mark('ready')
+                    print(f"✅ 浏览器已就绪，{self.startup.describe()}")
+                else:
+                    for page in pages:
+                        await page.goto('about:blank', timeout=5000)
+                    self.startup.mark('ready')
+                    print("✅ 浏览器已就绪")
+                    print("👉 请在浏览器中手动访问: https://gmgn.ai/\n")
                 print("⏳ 等待捕获数据...\n")
             except Exception as e:
                 print(f"⚠️  页面加载警告: {e}")
                 print("👉 请继续在浏览器中手动访问: https://gmgn.ai/\n")
 
             try:
-                # 保持浏览器打开，直到用户按 Ctrl+C
+                # 保持浏览器打开，直到用户按 Ctrl+C；每隔 SUMMARY_INTERVAL 秒打印一行摘要
+                last_summary = time.monotonic()
                 while True:
                     await asyncio.sleep(1)
-            except KeyboardInterrupt:
+                    if self.proxy_pool:
+                        await self.page_pool.recycle_unhealthy()
+                    if time.monotonic() - last_summary >= SUMMARY_INTERVAL:
+                        last_summary = time.monotonic()
+                        line = metrics.summary_line(len(self.users_dict))
+                        if line:
+                            print(line)
+            except (KeyboardInterrupt, asyncio.CancelledError):
+                # asyncio.run 把 Ctrl+C 转成主任务的取消，协程中收到的是 CancelledError
                 print("\n\n" + "=" * 70)
                 print("🛑 正在停止爬虫...")
                 print("=" * 70)
                 print(f"📊 统计信息：")
                 print(f"   - 捕获请求数: {self.request_count}")
                 print(f"   - 收集用户数: {len(self.users_dict)}")
+                self.response_queue.print_summary()
+                self.response_cache.print_summary()
+                self.page_pool.print_summary()
+                if self.proxy_pool:
+                    self.proxy_pool.print_summary()
+                if self.replayer:
+                    self.replayer.print_summary()
+                if self.startup and self.startup.recorded:
+                    print(f"   - 启动耗时: {self.startup.describe()}")
+                if self.store.field_changes:
+                    changes = ', '.join(f"{field} {count}" for field, count in self.store.field_changes.most_common())
+                    print(f"   - 字段变化: {changes}")
                 if len(self.users_dict) > 0:
+                    # 等后台统计挂好，不再另起一次 attach（两次 attach 会互相覆盖 store.stats）
+                    await asyncio.to_thread(self.live_stats_thread.join)
+                    if self.live_stats is not None:
+                        with self.store.lock:
+                            print()
+                            print_report(self.live_stats.report(), '实时统计（近似分位数）')
                     self.save_data()
                     print(f"\n✅ 爬虫已成功停止")
                 else:
                     print(f"\n⚠️  未捕获到任何数据")
             finally:
-                await browser.close()
+                try:
+                    # 停止直连翻页并处理完队列中的响应
+                    if self.replayer and not self.replay_task.done():
+                        self.replay_task.cancel()
+                        await asyncio.gather(self.replay_task, return_exceptions=True)
+                    await self.response_queue.drain()
+                finally:
+                    # 排空队列时出错或再次被中断也保证最后一次刷盘
+                    self.writer.close()
+                    metrics.stop()
+                    if self.proxy_pool:
+                        self.proxy_pool.stop()
+                    await (browser or persistent).close()
 
 async def main():
     # 支持命令行参数
     proxy = PROXY
     output_file = OUTPUT_FILE
+    replay = False
+    replay_variations = None
+    page_count = 1
+    proxies = None
+    metrics_port = METRICS_PORT
+    proxy_pool = PROXY_POOL
+    warm_start = WARM_START
+    profile_dir = BROWSER_PROFILE_DIR
 
     if len(sys.argv) > 1:
         if '--proxy' in sys.argv:
@@ -199,6 +414,43 @@ async def main():
             if idx + 1 < len(sys.argv):
                 output_file = sys.argv[idx + 1]
 
+        if '--pages' in sys.argv:
+            idx = sys.argv.index('--pages')
+            if idx + 1 < len(sys.argv):
+                page_count = int(sys.argv[idx + 1])
+
+        if '--proxies' in sys.argv:
+            idx = sys.argv.index('--proxies')
+            if idx + 1 < len(sys.argv):
+                proxies = [p.strip() for p in sys.argv[idx + 1].split(',') if p.strip()]
+
+        if '--proxy-pool' in sys.argv:
+            idx = sys.argv.index('--proxy-pool')
+            if idx + 1 < len(sys.argv):
+                proxy_pool = [p.strip() for p in sys.argv[idx + 1].split(',') if p.strip()]
+
+        if '--warm-start' in sys.argv:
+            warm_start = True
+
+        if '--profile' in sys.argv:
+            idx = sys.argv.index('--profile')
+            if idx + 1 < len(sys.argv):
+                profile_dir = sys.argv[idx + 1]
+                warm_start = True
+
+        if '--metrics-port' in sys.argv:
+            idx = sys.argv.index('--metrics-port')
+            if idx + 1 < len(sys.argv):
+                metrics_port = int(sys.argv[idx + 1])
+
+        if '--replay' in sys.argv:
+            replay = True
+
+        if '--queries' in sys.argv:
+            idx = sys.argv.index('--queries')
+            if idx + 1 < len(sys.argv):
+                replay_variations = load_variations(sys.argv[idx + 1])
+
         if '--help' in sys.argv or '-h' in sys.argv:
             print("GMGN API 爬虫 - 高级版本 v2")
             print("\n用法:")
@@ -206,12 +458,28 @@ async def main():
             print("\n选项:")
             print("  --proxy <代理地址>    设置代理服务器")
             print("                       例如: --proxy http://127.0.0.1:7890")
+            print("                       auto 表示使用 test_proxy.py 探测出的最快代理")
             print("  --output <文件名>     设置输出文件名")
             print("                       例如: --output my_data.json")
+            print(f"  --pages <数量>        同时打开的页面数（上限 {MAX_PAGES}）")
+            print("  --proxies <代理列表>  每个代理一个独立的浏览器上下文，用逗号分隔")
+            print("                       例如: --proxies http://127.0.0.1:7890,http://127.0.0.1:7891")
+            print("                       auto 表示使用 test_proxy.py 探测出的所有可用代理")
+            print("  --proxy-pool <代理列表> 代理池：后台健康检查，每个页面分配最健康的代理，")
+            print("                       代理变慢或断开时自动换到其他代理（auto 同上）")
+            print("  --replay             捕获到第一个搜索请求后，脱离浏览器直接翻页")
+            print("  --queries <文件>      直连翻页的查询组合（JSON 数组）")
+            print("                       例如: --queries queries.json")
+            print("  --warm-start         热启动：使用持久化的浏览器用户数据目录（保留 Cookie、验证和缓存），")
+            print("                       并自动打开 gmgn.ai；启动耗时记录在 startup_times.jsonl")
+            print(f"  --profile <目录>      用户数据目录（默认 {BROWSER_PROFILE_DIR}），隐含 --warm-start")
+            print("  --metrics-port <端口> 在 http://127.0.0.1:<端口>/metrics 提供 Prometheus 指标")
             print("  --help, -h           显示此帮助信息")
             print("\n示例:")
             print("  python gmgn_crawler_v2.py --proxy http://127.0.0.1:7890")
             print("  python gmgn_crawler_v2.py --output my_users.json")
+            print("  python gmgn_crawler_v2.py --replay --queries queries.json")
+            print("  python gmgn_crawler_v2.py --pages 4")
             print("\n配置文件:")
             print("  可以编辑 config.py 文件来设置默认配置")
             print("\n新特性:")
@@ -220,7 +488,21 @@ async def main():
             print("  ✅ 代理配置更可靠")
             return
 
-    crawler = GmgnCrawlerV2(output_file=output_file, proxy=proxy)
+    try:
+        # auto: 使用 test_proxy.py 写出的 proxies_ranked.json 中的排名
+        proxy = resolve_proxy(proxy)
+        if proxies:
+            proxies = resolve_proxies(proxies, MAX_PAGES)
+        if proxy_pool:
+            proxy_pool = resolve_proxies([proxy_pool] if isinstance(proxy_pool, str) else list(proxy_pool))
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    crawler = GmgnCrawlerV2(output_file=output_file, proxy=proxy,
+                            replay=replay, replay_variations=replay_variations,
+                            page_count=page_count, proxies=proxies, metrics_port=metrics_port,
+                            proxy_pool=proxy_pool, warm_start=warm_start, profile_dir=profile_dir)
     await crawler.start_browser(headless=HEADLESS)
 
 if __name__ == '__main__':
@@ -0,0 +1,340 @@
+"""
+GMGN handle 模糊搜索 - 持久化的三元组（trigram）倒排索引，按相似度 / 编辑距离排序
+爬虫合并时把新用户和改了 handle 的用户以 "user_id<TAB>handle" 一行追加到 gmgn_users_dedup.json.handles；
+搜索时映射由该日志生成的 gmgn_users_dedup.json.trigram（记录了覆盖到的日志位置），
+之后追加的日志尾部在内存中建一个小索引，尾部过长或日志被重写时才重新生成。
+handle 先转小写并去掉 _ . - 等符号（heyi_binance 与 heyibinance 视为相同）再切成三元组，
+三元组用 crc32 编号；相似度为共有三元组数 / 两者三元组并集大小。
+相似度至少为 s 的 handle 至少包含查询的 ceil(s·m) 个三元组（m 为查询的三元组数），
+所以只需合并最短的 m - ceil(s·m) + 1 个倒排表得到候选，其余倒排表用二分查找补齐计数，
+不需要逐个比较字符串
+"""
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from pathlib import Path
+
+MAGIC = b'GMGNTRI1'
+VERSION = 1
+
+# magic, version, 覆盖到的日志字节数, handle 数, 三元组数,
+# 条目表偏移, 三元组编号偏移, 倒排表起点偏移, 倒排表偏移, 字符串堆偏移
+HEADER = struct.Struct('<8sIQQQQQQQQ')
+# user_id 偏移/长度, handle 偏移/长度, 三元组数
+ENTRY = struct.Struct('<IIIII')
+
+# 爬虫合并时是否记录 handle 日志
+HANDLE_INDEX = True
+# 默认返回条数
+SEARCH_LIMIT = 10
+# 最低相似度
+MIN_SIMILARITY = 0.3
+# 逐步放宽的搜索阈值（最后一轮为调用方给的最低相似度）
+SEARCH_THRESHOLDS = (0.8, 0.6, 0.45)
+# 日志尾部超过该条数（或超过已索引条数的 1/10）时重新生成索引
+REBUILD_TAIL = 10000
+
+
+def handles_path_for(snapshot_file):
+    """JSON 快照对应的 handle 日志: gmgn_users_dedup.json -> gmgn_users_dedup.json.handles"""
+    snapshot_file = Path(snapshot_file)
+    return snapshot_file.with_name(snapshot_file.name + '.handles')
+
+
+def trigram_path_for(snapshot_file):
+    """JSON 快照对应的三元组索引: gmgn_users_dedup.json -> gmgn_users_dedup.json.trigram"""
+    snapshot_file = Path(snapshot_file)
+    return snapshot_file.with_name(snapshot_file.name + '.trigram')
+
+
+def normalize(handle):
+    """小写并去掉符号；只有符号时保留小写原文"""
+    lowered = str(handle).lower().lstrip('@')
+    return ''.join(ch for ch in lowered if ch.isalnum()) or lowered
+
+
+def trigram_keys(handle):
+    """handle 的三元组编号集合（前面补两个空格、后面补一个空格，开头和结尾的字符权重更高）"""
+    padded = f"  {normalize(handle)} "
+    return {zlib.crc32(padded[i:i + 3].encode('utf-8')) for i in range(len(padded) - 2)}
+
+
+def edit_distance(a, b):
+    """Levenshtein 编辑距离"""
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return previous[-1]
+
+
+def _format_line(user_id, handle):
+    return f"{user_id}\t{handle}\n".encode('utf-8')
+
+
+def read_log(path, offset=0):
+    """从 offset 开始读取完整的日志行，返回 ([(user_id, handle)], 读到的位置)；写了一半的最后一行不计入"""
+    entries = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            offset += len(line)
+            user_id, sep, handle = line[:-1].decode('utf-8', errors='replace').partition('\t')
+            if sep and handle:
+                entries.append((user_id, handle))
+    return entries, offset
+
+
+class HandleLog:
+    """爬虫侧: 记录新用户和改名用户的 handle，flush() 时追加到日志"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.pending = []  # 待写入: (user_id, handle)
+        self.write_lock = threading.Lock()  # 保证 take() 取出的各批记录按顺序写入
+        self._checked = False
+
+    def record(self, user_id, handle):
+        if handle:
+            self.pending.append((user_id, handle))
+
+    def take(self, all_users=None):
+        """取出待写的记录，返回 (全部用户或 None, 待写记录)；在存储锁内调用，只做拷贝
+
+        日志还不存在时调用 all_users() 取得全部用户（调用方应返回当时用户表的拷贝），
+        逐个序列化留给 write() 在锁外进行
+        """
+        seed = None
+        if not self._checked:
+            self._checked = True
+            if not self.path.exists() and all_users is not None:
+                seed = all_users()
+                self.pending = []  # 已包含在全部用户中
+        pending, self.pending = self.pending, []
+        return seed, pending
+
+    def write(self, seed, pending):
+        """把 take() 取出的记录追加到日志，返回写入的字节数"""
+        data = bytearray()
+        if seed is not None:
+            for user in seed:
+                if user.get('handle'):
+                    data += _format_line(user['user_id'], user['handle'])
+        for user_id, handle in pending:
+            data += _format_line(user_id, handle)
+        if data:
+            with open(self.path, 'ab') as f:
+                f.write(data)
+        return len(data)
+
+    def flush(self, all_users=None):
+        """写入待写的记录，返回写入的字节数；日志还不存在时先写入 all_users() 中的全部用户"""
+        with self.write_lock:
+            return self.write(*self.take(all_users))
+
+
+def build_index(log_file, path):
+    """从完整的 handle 日志生成三元组索引（每个 user_id 取最后一次记录的 handle）"""
+    latest, covered = read_log(log_file)
+    latest = dict(latest)
+
+    entries = bytearray()
+    heap = bytearray()
+    postings = {}
+    for entry_id, (user_id, handle) in enumerate(latest.items()):
+        uid, name = str(user_id).encode('utf-8'), handle.encode('utf-8')
+        keys = trigram_keys(handle)
+        entries += ENTRY.pack(len(heap), len(uid), len(heap) + len(uid), len(name), len(keys))
+        heap += uid + name
+        for key in keys:
+            postings.setdefault(key, array('I')).append(entry_id)
+
+    keys = array('I', sorted(postings))
+    starts = array('I', [0])
+    posting_bytes = bytearray()
+    for key in keys:
+        posting_bytes += postings[key].tobytes()
+        starts.append(len(posting_bytes) // 4)
+
+    blocks = [bytes(entries), keys.tobytes(), starts.tobytes(), bytes(posting_bytes), bytes(heap)]
+    offsets = []
+    offset = HEADER.size
+    for block in blocks:
+        offsets.append(offset)
+        offset += len(block)
+
+    path = Path(path)
+    tmp_file = path.with_name(path.name + '.tmp')
+    with open(tmp_file, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, covered, len(latest), len(keys), *offsets))
+        for block in blocks:
+            f.write(block)
+    try:
+        os.replace(tmp_file, path)
+    except OSError:
+        # Windows 上正在被映射的旧索引不能替换，本次直接使用临时文件
+        return tmp_file
+    return path
+
+
+class HandleIndex:
+    """映射后的三元组索引 + 日志尾部的内存索引"""
+
+    def __init__(self, mm, header, log_file):
+        (_, _, self.covered, self.count, trigram_count, entries_offset,
+         keys_offset, starts_offset, postings_offset, self.heap_offset) = header
+        self.mm = mm
+        view = memoryview(mm)
+        self.entries_offset = entries_offset
+        self.keys = view[keys_offset:keys_offset + 4 * trigram_count].cast('I')
+        self.starts = view[starts_offset:starts_offset + 4 * (trigram_count + 1)].cast('I')
+        self.postings = view[postings_offset:self.heap_offset].cast('I')
+
+        # 日志尾部: 之后追加（新用户或改名）的记录，同一 user_id 以尾部为准
+        tail, _ = read_log(log_file, self.covered)
+        self.tail = list(dict(tail).items())
+        self.tail_keys = [trigram_keys(handle) for _, handle in self.tail]
+        self.tail_ids = {user_id for user_id, _ in self.tail}
+        self.tail_postings = {}
+        for i, keys in enumerate(self.tail_keys):
+            for key in keys:
+                self.tail_postings.setdefault(key, []).append(i)
+
+    @classmethod
+    def open(cls, snapshot_file, seed_users=None, rebuild=False):
+        """打开 handle 索引；日志不存在时用 seed_users() 生成，索引不存在、过期或尾部过长时重建"""
+        log_file = handles_path_for(snapshot_file)
+        path = trigram_path_for(snapshot_file)
+        if not log_file.exists():
+            if seed_users is None:
+                raise FileNotFoundError(f"handle 日志 {log_file} 不存在")
+            HandleLog(log_file).flush(seed_users)
+            rebuild = True
+
+        index = None if rebuild else cls._map(path, log_file)
+        if index is not None and len(index.tail) > max(REBUILD_TAIL, index.count // 10):
+            index = None
+        if index is None:
+            index = cls._map(build_index(log_file, path), log_file)
+            if index is None:
+                raise OSError(f"无法生成 handle 索引: {path}")
+        return index
+
+    @classmethod
+    def _map(cls, path, log_file):
+        try:
+            with open(path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mm) < HEADER.size:
+            mm.close()
+            return None
+        header = HEADER.unpack_from(mm, 0)
+        magic, version, covered = header[:3]
+        # 日志比索引覆盖的还短，说明被删除或重写过
+        if magic != MAGIC or version != VERSION or covered > log_file.stat().st_size or sys.byteorder != 'little':
+            mm.close()
+            return None
+        return cls(mm, header, log_file)
+
+    def __len__(self):
+        return self.count + len(self.tail)
+
+    def _posting(self, key):
+        i = bisect_left(self.keys, key)
+        if i == len(self.keys) or self.keys[i] != key:
+            return self.postings[0:0]
+        return self.postings[self.starts[i]:self.starts[i + 1]]
+
+    def _entry(self, entry_id):
+        uid_off, uid_len, handle_off, handle_len, trigram_count = ENTRY.unpack_from(
+            self.mm, self.entries_offset + entry_id * ENTRY.size)
+        start = self.heap_offset
+        return (self.mm[start + uid_off:start + uid_off + uid_len].decode('utf-8'),
+                self.mm[start + handle_off:start + handle_off + handle_len].decode('utf-8'),
+                trigram_count)
+
+    def _match(self, query_keys, min_similarity):
+        """相似度不低于 min_similarity 的全部 handle: [(相似度, user_id, handle)]"""
+        m = len(query_keys)
+        need = max(1, math.ceil(min_similarity * m))
+        lists = sorted(((key, self._posting(key)) for key in query_keys), key=lambda item: len(item[1]))
+        probe, rest = lists[:m - need + 1], lists[m - need + 1:]
+
+        # 已索引部分: 最短的倒排表合并出候选，其余倒排表二分查找补齐共有三元组数
+        shared = Counter()
+        for _, rows in probe:
+            shared.update(rows)
+        found = []
+        for entry_id, count in shared.items():
+            # 还允许缺少的三元组数，用完即可排除（多数候选在第一两次查找时就被排除）
+            slack = count + len(rest) - need
+            if slack < 0:
+                continue
+            for _, rows in rest:
+                i = bisect_left(rows, entry_id)
+                if i < len(rows) and rows[i] == entry_id:
+                    count += 1
+                else:
+                    slack -= 1
+                    if slack < 0:
+                        break
+            if slack < 0:
+                continue
+            user_id, handle, trigram_count = self._entry(entry_id)
+            similarity = count / (m + trigram_count - count)
+            if similarity >= min_similarity and user_id not in self.tail_ids:
+                found.append((similarity, user_id, handle))
+
+        # 日志尾部
+        tail_candidates = set()
+        for key, _ in probe:
+            tail_candidates.update(self.tail_postings.get(key, ()))
+        for i in tail_candidates:
+            keys = self.tail_keys[i]
+            count = len(query_keys & keys)
+            similarity = count / (m + len(keys) - count)
+            if similarity >= min_similarity:
+                found.append((similarity, *self.tail[i]))
+        return found
+
+    def search(self, query, limit=SEARCH_LIMIT, min_similarity=MIN_SIMILARITY):
+        """模糊搜索 handle，返回 [{'user_id', 'handle', 'similarity', 'distance'}]，按相似度降序、编辑距离升序"""
+        query_keys = trigram_keys(query)
+        # 先用较高的阈值搜索（需要合并的倒排表少，常见三元组的长倒排表只做二分查找），
+        # 结果够 limit 个时，阈值以下的 handle 不可能排进前 limit 名；不够时逐步降到 min_similarity
+        for threshold in [t for t in SEARCH_THRESHOLDS if t > min_similarity] + [min_similarity]:
+            found = self._match(query_keys, threshold)
+            if len(found) >= limit:
+                break
+
+        # 只对可能进入前 limit 名的候选（相似度不低于第 limit 名）计算编辑距离
+        found.sort(key=lambda item: -item[0])
+        if len(found) > limit:
+            cutoff = found[limit - 1][0] if limit > 0 else 2
+            found = [item for item in found if item[0] >= cutoff]
+        target = str(query).lower().lstrip('@')
+        results = [{'user_id': user_id, 'handle': handle, 'similarity': round(similarity, 3),
+                    'distance': edit_distance(target, handle.lower())}
+                   for similarity, user_id, handle in found]
+        results.sort(key=lambda item: (-item['similarity'], item['distance'], item['handle'].lower()))
+        return results[:limit]
+
+
+def search_handles(snapshot_file, query, limit=SEARCH_LIMIT, min_similarity=MIN_SIMILARITY, seed_users=None):
+    """按 handle 模糊搜索用户（索引不存在时自动生成）"""
+    return HandleIndex.open(snapshot_file, seed_users).search(query, limit, min_similarity)
@@ -0,0 +1,229 @@
+"""
+GMGN 用户数据存储（日志版本）- 追加写日志 + 后台压缩快照
+每批捕获的用户以一行 NDJSON 追加到日志文件，写入开销只与本批大小有关；
+后台压缩把日志合并进按粉丝数排序的 JSON 快照（格式与原 save_data 输出一致），
+同时写出可直接 mmap 的二进制快照；启动时优先映射二进制快照（与 JSON 不一致时改为读取 JSON），
+再回放日志尾部；内存中的用户保存在紧凑的 UserTable 中。
+合并只把新增或内容有变化的用户写入日志，粉丝数变化另记在 .history 文件中（见 follower_history.py）
+"""
+import os
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from binary_snapshot import BinarySnapshotWriter, MappedSnapshot, MappedUserTable, binary_path_for
+from change_merge import ChangeAwareMerge
+from crawler_metrics import metrics
+from follower_history import FOLLOWER_HISTORY, FollowerHistory, history_path_for
+from handle_search import HANDLE_INDEX, HandleLog, handles_path_for
+from json_codec import dumps, loads
+from json_stream import iter_users, write_snapshot
+from user_stats import UpdateRecorder
+from user_table import UserTable
+
+# 日志累计多少批次后触发一次后台压缩
+COMPACT_EVERY = 50
+# 是否同时写出并在启动时映射二进制快照
+BINARY_SNAPSHOT = True
+
+
+def read_journal(path, offset=0):
+    """从 offset 开始读取日志中完整的行，返回 (日志条目列表, 读到的位置)
+
+    没有换行结尾的最后一行可能还在写入，不计入，下次从它的开头继续读
+    """
+    entries = []
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        for line in f:
+            if not line.endswith(b'\n'):
+                break
+            if line.strip():
+                try:
+                    entries.append(loads(line))
+                except ValueError:
+                    # 与 JournalStore 回放一致：损坏的行之后的内容不可信
+                    break
+            offset += len(line)
+    return entries, offset
+
+
+class JournalStore(ChangeAwareMerge):
+    def __init__(self, snapshot_file, compact_every=COMPACT_EVERY, binary_snapshot=BINARY_SNAPSHOT,
+                 history=FOLLOWER_HISTORY, handle_index=HANDLE_INDEX):
+        self.snapshot_file = Path(snapshot_file)
+        # 当前写入的日志: gmgn_users_dedup.json.journal
+        # 压缩时轮转出的日志段: gmgn_users_dedup.json.journal.<序号>
+        self.journal_file = self.snapshot_file.with_name(self.snapshot_file.name + '.journal')
+        self.compact_every = compact_every
+        # 二进制快照: gmgn_users_dedup.json.bin
+        self.binary_file = binary_path_for(self.snapshot_file) if binary_snapshot else None
+        self.users = UserTable()  # key 为 user_id，自动去重
+        self.stats = None  # 可选的 LiveStats，合并时按差值更新
+        # 粉丝数历史: gmgn_users_dedup.json.history
+        self.history = FollowerHistory(history_path_for(self.snapshot_file)) if history else None
+        # handle 日志: gmgn_users_dedup.json.handles
+        self.handles = HandleLog(handles_path_for(self.snapshot_file)) if handle_index else None
+        self.field_changes = Counter()  # 字段名 -> 合并时发生变化的次数
+        self.lock = threading.RLock()
+        self.pending_batches = 0  # 上次压缩后追加的批次数
+        self.segment_seq = 0
+        self._compact_thread = None
+
+    def _segment_files(self):
+        """返回已轮转的日志段，按序号排序"""
+        prefix = self.journal_file.name + '.'
+        segments = []
+        for path in self.snapshot_file.parent.glob(prefix + '*'):
+            suffix = path.name[len(prefix):]
+            if suffix.isdigit():
+                segments.append((int(suffix), path))
+        segments.sort()
+        return segments
+
+    def journal_files(self):
+        """按回放顺序返回现有的日志文件（各日志段，最后是当前日志）"""
+        files = [path for _, path in self._segment_files()]
+        if self.journal_file.exists():
+            files.append(self.journal_file)
+        return files
+
+    def _replay(self, path):
+        """回放一个日志文件，返回回放的批次数"""
+        batches = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    entry = loads(line)
+                except ValueError:
+                    # 最后一行可能在写入时被中断（JSON 不完整或 UTF-8 被截断），之后的内容不可信
+                    break
+                for user in entry.get('users', []):
+                    self.users[user['user_id']] = user
+                batches += 1
+        return batches
+
+    def load(self):
+        """加载快照并回放日志，返回加载后的用户数"""
+        with self.lock:
+            base = None
+            if self.binary_file is not None and len(self.users) == 0:
+                base = MappedSnapshot.open(self.binary_file, self.snapshot_file)
+
+            if base is not None:
+                # 直接映射二进制快照，用户在访问时才解码，启动耗时与用户数无关
+                self.users = MappedUserTable(base)
+            elif self.snapshot_file.exists():
+                # 流式读取快照，不需要先把整个文件解析成对象树
+                for user in iter_users(self.snapshot_file):
+                    self.users[user['user_id']] = user
+
+            for seq, path in self._segment_files():
+                self.pending_batches += self._replay(path)
+                self.segment_seq = max(self.segment_seq, seq)
+
+            if self.journal_file.exists():
+                self.pending_batches += self._replay(self.journal_file)
+
+            return len(self.users)
+
+    def append(self, users):
+        """把一批用户追加到日志（O(本批大小)）"""
+        line = dumps({
+            'ts': datetime.now().isoformat(),
+            'users': users
+        })
+        data = (line + '\n').encode('utf-8')
+
+        with self.lock:
+            with metrics.time('batch_write'):
+                with open(self.journal_file, 'ab') as f:
+                    f.write(data)
+            self.pending_batches += 1
+        metrics.inc('bytes_written', len(data))
+        self.flush_history()
+
+    def merge(self, users):
+        """合并一批用户到内存并写入日志（只写新增或内容有变化的用户），返回新增用户数"""
+        new_users, changed = self.apply(users)
+        if changed:
+            self.append(changed)
+
+        self.maybe_compact()
+        return new_users
+
+    def maybe_compact(self):
+        """日志批次数达到阈值时，在后台线程中压缩"""
+        if self.pending_batches >= self.compact_every:
+            self.compact(background=True)
+
+    def compact(self, background=False):
+        """把日志合并进排序后的快照文件"""
+        if self._compact_thread is not None and self._compact_thread.is_alive():
+            if background:
+                return
+            self._compact_thread.join()
+
+        with self.lock:
+            # 在锁内拷贝当前各列并轮转日志，保证快照与被删除的日志段一致
+            table = self.users.snapshot()
+            if self.journal_file.exists():
+                self.segment_seq += 1
+                os.replace(self.journal_file, self.journal_file.with_name(
+                    f"{self.journal_file.name}.{self.segment_seq}"))
+            segments = [path for _, path in self._segment_files()]
+            self.pending_batches = 0
+
+        if background:
+            self._compact_thread = threading.Thread(
+                target=self._write_snapshot, args=(table, segments), daemon=True)
+            self._compact_thread.start()
+        else:
+            self._write_snapshot(table, segments)
+
+    def _write_snapshot(self, table, segments):
+        """按照 followers 数量排序并写入快照，成功后删除已合并的日志段"""
+        # 逐个还原用户并写入临时文件再替换，读取方不会看到写了一半的快照
+        with metrics.time('snapshot_sort'):
+            users = table.sorted_users()
+        binary = BinarySnapshotWriter(self.binary_file) if self.binary_file is not None else None
+        if binary is not None:
+            users = binary.passthrough(users)
+        with metrics.time('snapshot_write'):
+            write_snapshot(self.snapshot_file, users, len(table))
+            # 二进制快照的行顺序与 JSON 一致，记录 JSON 的大小和修改时间用于启动时校验
+            if binary is not None and binary.close(self.snapshot_file):
+                self._rebase()
+        metrics.inc('bytes_written', self.snapshot_file.stat().st_size)
+        if binary is not None and self.binary_file.exists():
+            metrics.inc('bytes_written', self.binary_file.stat().st_size)
+
+        for path in segments:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _rebase(self):
+        """把映射的用户表换到刚写出的二进制快照上，丢弃已经写进快照的覆盖层用户，覆盖层不会一直增长"""
+        if not isinstance(self.users, MappedUserTable):
+            return
+        base = MappedSnapshot.open(self.binary_file, self.snapshot_file)
+        if base is None:
+            return
+        with self.lock:
+            if isinstance(self.stats, UpdateRecorder):
+                return  # 实时统计正在按旧行号扫描拷贝，下次压缩时再换
+            self.users.rebase(base)
+            if self.stats is not None:
+                self.stats.renumber()
+
+    def close(self):
+        """等待后台压缩结束，并把剩余日志合并进快照"""
+        self.flush_history()
+        if self._compact_thread is not None:
+            self._compact_thread.join()
+        if self.pending_batches > 0 or self._segment_files():
+            self.compact()
@@ -0,0 +1,88 @@
+"""
+GMGN JSON 编解码 - 安装了 orjson（pip install orjson）时使用 orjson，否则使用标准库 json
+解码直接接受 bytes，不需要先 .decode('utf-8')；超过 OFFLOOP_DECODE_BYTES 的响应体
+在线程池中解码，Playwright 事件循环不会被大响应卡住。
+编码时直接调用 orjson，orjson 不支持的值（超出 64 位的整数、非字符串键等）抛出 TypeError 后改用标准库；
+输出与标准库 json.dumps(..., ensure_ascii=False) 只有两点不同：浮点数的指数写法（1e16 / 1e+16，数值相同），
+以及 NaN / Infinity 被 orjson 写成 null。
+解码时 orjson 拒绝 NaN / Infinity，这些内容改用标准库解码；超出 64 位的整数 orjson 不报错而是解码成浮点数，
+所以含 19 位以上数字的内容直接用标准库解码，两种后端解码结果相同，已有文件都能读取
+"""
+import asyncio
+import json
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 超过该字节数的响应体在线程池中解码
+OFFLOOP_DECODE_BYTES = 256 * 1024
+# 解码线程数
+DECODE_WORKERS = 2
+
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+# 19 位以上的数字可能超出 64 位整数范围（orjson 会解码成浮点数）；字符串中的长数字也会命中，只是多用一次标准库
+_LONG_NUMBER = re.compile(rb'[:,\[]\s*-?[0-9]{19}')
+_LONG_NUMBER_STR = re.compile(_LONG_NUMBER.pattern.decode('ascii'))
+
+
+def _has_long_number(data):
+    """内容中是否可能有超出 64 位的整数（顶层就是数字时按可能处理）"""
+    if isinstance(data, str):
+        return data[:1] in '-0123456789 ' or _LONG_NUMBER_STR.search(data) is not None
+    return data[:1] in b'-0123456789 ' or _LONG_NUMBER.search(data) is not None
+
+
+# orjson.JSONDecodeError 是 json.JSONDecodeError 的子类，两种后端抛出的错误都能用它捕获
+JSONDecodeError = json.JSONDecodeError
+
+_executor = None
+
+
+def loads(data):
+    """解码 bytes / str"""
+    if orjson is not None and not _has_long_number(data):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # NaN、Infinity 等标准库能解码的内容；确实不是合法 JSON 时由标准库抛出错误
+    return json.loads(data)
+
+
+async def loads_async(data, threshold=OFFLOOP_DECODE_BYTES):
+    """在事件循环中解码：小响应直接解码，大响应交给线程池"""
+    global _executor
+    if len(data) < threshold:
+        return loads(data)
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DECODE_WORKERS, thread_name_prefix='gmgn-decode')
+    return await asyncio.get_running_loop().run_in_executor(_executor, loads, data)
+
+
+def dumps_bytes(obj):
+    """紧凑格式的 UTF-8 bytes，与 json.dumps(obj, ensure_ascii=False, separators=(',', ':')) 一致（浮点数见模块说明）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass  # orjson.JSONEncodeError 是 TypeError 的子类
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def dumps(obj):
+    """紧凑格式的字符串"""
+    return dumps_bytes(obj).decode('utf-8')
+
+
+def dumps_indent(obj):
+    """两个空格缩进的字符串，与 json.dumps(obj, ensure_ascii=False, indent=2) 一致（浮点数见模块说明）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode('utf-8')
+        except TypeError:
+            pass
+    return json.dumps(obj, ensure_ascii=False, indent=2)
@@ -0,0 +1,195 @@
+"""
+GMGN JSON 快照流式读写 - 逐条读取/写入 {"total_users", "last_updated", "users": [...]} 中的用户
+按块读取文件并用 raw_decode 逐个解析数组元素，内存占用只与块大小和单条记录有关，
+不需要把整个文件读入内存，也不会同时保留原始文本和完整的对象树；
+写入时逐个序列化用户，输出与 json.dump(..., indent=2) 一致（使用 orjson 时的差别见 json_codec.py）。
+安装了 orjson 时（见 json_codec.py）用 orjson 序列化用户。默认总是流式读取；
+调用方可以显式传入 whole_file_bytes，让不超过该大小的文件整体读入后用 orjson 一次解码，
+速度更快，但会同时保留原始字节和完整的对象树（内存占用约为文件大小的数倍）
+"""
+import json
+import os
+import re
+from datetime import datetime
+from pathlib import Path
+import json_codec
+
+# 每次从文件读取的字符数
+CHUNK_SIZE = 1 << 16
+# 写文件的缓冲区大小（字节）
+WRITE_BUFFER_SIZE = 1 << 16
+# 使用 orjson 时，不超过该大小的文件整体解码（内存换速度），0 表示总是流式读取；
+# 默认 0，需要整体解码时通过 SnapshotReader(..., whole_file_bytes=...) 显式开启
+WHOLE_FILE_DECODE_BYTES = 0
+
+_WHITESPACE = re.compile(r'\s*')
+
+
+class SnapshotReader:
+    def __init__(self, path, key='users', chunk_size=CHUNK_SIZE, whole_file_bytes=WHOLE_FILE_DECODE_BYTES):
+        self.path = path
+        self.key = key  # 要逐条读取的数组字段，例如 users 或 data
+        self.chunk_size = chunk_size
+        self.whole_file_bytes = whole_file_bytes
+        self.meta = {}  # 顶层对象中除数组外的其他字段（读到哪里填到哪里）
+        self.found = False  # 是否读到了 key 对应的数组
+        self._decoder = json.JSONDecoder()
+        self._file = None
+        self._buf = ''
+        self._pos = 0
+
+    def _fill(self):
+        """再读入一块，返回是否还有数据"""
+        more = self._file.read(self.chunk_size)
+        if not more:
+            return False
+        self._buf = self._buf[self._pos:] + more
+        self._pos = 0
+        return True
+
+    def _peek(self):
+        """跳过空白，返回下一个字符（文件结束时返回空串）"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buf, self._pos).end()
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, chars):
+        ch = self._peek()
+        if ch not in chars:
+            raise ValueError(f"JSON 格式错误: 期望 {chars!r}，实际 {ch!r}（{self.path}）")
+        self._pos += 1
+        return ch
+
+    def _decode(self):
+        """解析下一个完整的 JSON 值"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # 数字等值可能恰好在块边界被截断，需要读到后续字符才能确定结束
+                if end < len(self._buf) or not self._fill():
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+
+    def _iter_whole(self):
+        """整个文件一次解码（只在显式开启 whole_file_bytes 时使用）"""
+        with open(self.path, 'rb') as f:
+            data = json_codec.loads(f.read())
+        if not isinstance(data, dict):
+            raise ValueError(f"JSON 格式错误: 期望 '{{'（{self.path}）")
+        items = data.get(self.key)
+        self.meta = {name: value for name, value in data.items()
+                     if name != self.key or not isinstance(items, list)}
+        if isinstance(items, list):
+            self.found = True
+            yield from items
+
+    def __iter__(self):
+        if (json_codec.orjson is not None and self.whole_file_bytes
+                and os.path.getsize(self.path) <= self.whole_file_bytes):
+            yield from self._iter_whole()
+            return
+
+        with open(self.path, 'r', encoding='utf-8') as self._file:
+            self._buf, self._pos = '', 0
+            self._expect('{')
+            if self._peek() == '}':
+                return
+
+            while True:
+                name = self._decode()
+                self._expect(':')
+
+                if name == self.key and self._peek() == '[':
+                    self.found = True
+                    self._pos += 1
+                    if self._peek() == ']':
+                        self._pos += 1
+                    else:
+                        while True:
+                            yield self._decode()
+                            if self._expect(',]') == ']':
+                                break
+                else:
+                    self.meta[name] = self._decode()
+
+                if self._expect(',}') == '}':
+                    return
+
+    def first_array(self, keys):
+        """返回顶层对象中第一个值为数组且在 keys 中的字段名，没有时返回 None
+
+        只解析该字段之前的其他字段，不读取数组内容
+        """
+        with open(self.path, 'r', encoding='utf-8') as self._file:
+            self._buf, self._pos = '', 0
+            self._expect('{')
+            if self._peek() == '}':
+                return None
+            while True:
+                name = self._decode()
+                self._expect(':')
+                if name in keys and self._peek() == '[':
+                    return name
+                self.meta[name] = self._decode()
+                if self._expect(',}') == '}':
+                    return None
+
+
+def iter_users(path, key='users', whole_file_bytes=WHOLE_FILE_DECODE_BYTES):
+    """逐条返回快照文件中的用户"""
+    return iter(SnapshotReader(path, key, whole_file_bytes=whole_file_bytes))
+
+
+class SnapshotWriter:
+    """逐条写入 {header..., "users": [...]} 格式的文件，输出与 json.dump(..., indent=2) 一致
+
+    先写临时文件，close() 时再替换目标文件
+    """
+
+    def __init__(self, path, header, key='users', buffer_size=WRITE_BUFFER_SIZE):
+        self.path = Path(path)
+        self.tmp_file = self.path.with_name(self.path.name + '.tmp')
+        self.count = 0
+        self._file = open(self.tmp_file, 'w', encoding='utf-8', buffering=buffer_size)
+        self._file.write('{\n')
+        for name, value in header.items():
+            self._file.write(f'  {json.dumps(name, ensure_ascii=False)}: {json.dumps(value, ensure_ascii=False)},\n')
+        self._file.write(f'  {json.dumps(key, ensure_ascii=False)}: [')
+
+    def write(self, user):
+        self._file.write('\n    ' if self.count == 0 else ',\n    ')
+        # JSON 字符串中不会出现原始换行，可以直接整体缩进
+        self._file.write(json_codec.dumps_indent(user).replace('\n', '\n    '))
+        self.count += 1
+
+    def close(self):
+        self._file.write(']\n}' if self.count == 0 else '\n  ]\n}')
+        self._file.close()
+        os.replace(self.tmp_file, self.path)
+
+    def abort(self):
+        """放弃写入，删除临时文件"""
+        self._file.close()
+        self.tmp_file.unlink(missing_ok=True)
+
+
+def write_snapshot(path, users, total_users):
+    """逐个写入用户生成快照文件（先写临时文件再替换），users 可以是任意可迭代对象"""
+    writer = SnapshotWriter(path, {
+        'total_users': total_users,
+        'last_updated': datetime.now().isoformat(),
+    })
+    try:
+        for user in users:
+            writer.write(user)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
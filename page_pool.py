@@ -0,0 +1,166 @@
+"""
+GMGN 多页面并行捕获 - 一个浏览器开多个页面（或多个使用不同代理的上下文）
+所有页面的响应进入同一个去重存储和同一个后台写盘线程，并按页面统计捕获情况；
+使用代理池时每个页面一个上下文，代理不健康时 recycle() 把页面换到新代理的上下文上
+"""
+import time
+from collections import Counter
+from proxy_pool import RECYCLE_COOLDOWN
+
+# 同时打开的页面数上限
+MAX_PAGES = 8
+
+
+class PagePool:
+    def __init__(self, browser, context_args, max_pages=MAX_PAGES, proxy_pool=None, on_page=None, context=None):
+        self.browser = browser
+        self.context = context  # 可选的共用上下文（launch_persistent_context 返回的持久化上下文）
+        self.context_args = context_args
+        self.max_pages = max_pages
+        self.proxy_pool = proxy_pool  # 可选的 ProxyPool，每个页面一个上下文，由代理池分配代理
+        self.on_page = on_page  # 新页面（包括换代理后重建的页面）的回调，用于挂监听
+        self.contexts = []
+        self.pages = []
+        self.page_labels = {}  # page -> 显示名称
+        self.page_proxies = {}  # page -> 代理池分配的代理
+        self.recycled_at = {}  # 显示名称 -> 上次换代理的时间
+        self.recycle_count = 0
+        self.stats = {}  # 显示名称 -> Counter(captures, users, new_users)
+
+    async def open(self, page_count=1, proxies=None):
+        """打开页面：使用代理池或给定代理列表时每个页面 / 代理一个上下文，否则在同一个上下文中开多个页面"""
+        if proxies:
+            page_count = max(page_count, len(proxies))
+        if page_count > self.max_pages:
+            print(f"⚠️  页面数 {page_count} 超过上限 {self.max_pages}，只打开 {self.max_pages} 个")
+            page_count = self.max_pages
+
+        context = None
+        for i in range(page_count):
+            if self.proxy_pool is not None:
+                await self._open_pooled(f"页面{i + 1}")
+                continue
+            if proxies:
+                proxy = proxies[i % len(proxies)]
+                context = await self.browser.new_context(**{**self.context_args, 'proxy': {'server': proxy}})
+                self.contexts.append(context)
+                label = f"页面{i + 1} ({proxy})"
+            else:
+                if context is None:
+                    if self.context is not None:
+                        context = self.context
+                    else:
+                        context = await self.browser.new_context(**self.context_args)
+                        self.contexts.append(context)
+                label = f"页面{i + 1}"
+
+            # 持久化上下文启动时自带一个空白页，直接使用
+            if context is self.context and i == 0 and context.pages:
+                page = context.pages[0]
+            else:
+                page = await context.new_page()
+            self.pages.append(page)
+            self.page_labels[page] = label
+            self.stats[label] = Counter()
+            if self.on_page:
+                self.on_page(page)
+
+        return self.pages
+
+    async def _open_pooled(self, label, exclude=()):
+        """用代理池分配的代理新建上下文和页面"""
+        proxy = self.proxy_pool.acquire(exclude)
+        try:
+            context = await self.browser.new_context(**{**self.context_args, 'proxy': {'server': proxy}})
+            page = await context.new_page()
+        except Exception:
+            self.proxy_pool.release(proxy)
+            raise
+        self.contexts.append(context)
+        self.pages.append(page)
+        self.page_labels[page] = label
+        self.page_proxies[page] = proxy
+        self.stats.setdefault(label, Counter())
+        if self.on_page:
+            self.on_page(page)
+        return page
+
+    def proxy_of(self, page):
+        return self.page_proxies.get(page)
+
+    async def recycle_unhealthy(self):
+        """把代理不健康的页面换到其他代理上，返回换掉的页面数；换失败的页面保持原样，下一轮再试"""
+        if self.proxy_pool is None:
+            return 0
+        recycled = 0
+        for page, proxy in list(self.page_proxies.items()):
+            label = self.page_labels[page]
+            if time.monotonic() - self.recycled_at.get(label, 0) < RECYCLE_COOLDOWN:
+                continue
+            if self.proxy_pool.should_replace(proxy):
+                try:
+                    await self.recycle(page)
+                except Exception as e:
+                    print(f"⚠️  {label}: 更换代理 {proxy} 失败，继续使用原页面: {e}")
+                    continue
+                recycled += 1
+        return recycled
+
+    async def recycle(self, page):
+        """用另一个代理新建上下文并打开原来的地址，成功后再关闭旧页面所在的上下文；
+        新建失败时抛出异常，旧页面不受影响。已捕获的用户都在存储中，不受影响"""
+        label = self.page_labels[page]
+        proxy = self.page_proxies[page]
+        url = page.url
+        new_page = await self._open_pooled(label, exclude={proxy})
+
+        del self.page_labels[page]
+        del self.page_proxies[page]
+        context = page.context
+        self.pages.remove(page)
+        self.contexts.remove(context)
+        self.proxy_pool.release(proxy)
+        try:
+            await context.close()
+        except Exception:
+            pass  # 上下文可能已经断开
+
+        self.recycled_at[label] = time.monotonic()
+        self.recycle_count += 1
+        print(f"🔄 {label}: 代理 {proxy} 不健康，换到 {self.page_proxies[new_page]}")
+        if url.startswith('http'):
+            try:
+                await new_page.goto(url, timeout=30000)
+            except Exception as e:
+                print(f"⚠️  {label} 重新打开 {url} 失败: {e}")
+        return new_page
+
+    def record(self, page, users, new_users):
+        """记录某个页面的一次捕获"""
+        label = self.page_labels.get(page)
+        if label is None:
+            return
+        stats = self.stats[label]
+        stats['captures'] += 1
+        stats['users'] += users
+        stats['new_users'] += new_users
+
+    def label(self, page):
+        label = self.page_labels.get(page, '')
+        proxy = self.page_proxies.get(page)
+        return f"{label} ({proxy})" if proxy else label
+
+    def print_summary(self):
+        """打印每个页面的捕获统计"""
+        if len(self.pages) <= 1:
+            return
+        print(f"   - 各页面捕获情况:")
+        for label, stats in self.stats.items():
+            print(f"       {label}: {stats['captures']} 个请求，"
+                  f"{stats['users']} 个用户，新增 {stats['new_users']} 个")
+        if self.recycle_count:
+            print(f"   - 更换代理: {self.recycle_count} 次")
+
+    async def close(self):
+        for context in self.contexts:
+            await context.close()
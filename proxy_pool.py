@@ -0,0 +1,134 @@
+"""
+GMGN 代理池 - 多个代理端点 + 后台健康检查 + 延迟 / 错误率 EWMA
+后台线程定期通过每个代理请求一次 gmgn.ai（见 proxy_probe.probe_url），浏览器中
+目标接口的响应和失败请求也会计入；新建浏览器上下文时分配得分最好的代理，
+代理变得不健康时由 PagePool.recycle() 把页面换到另一个代理上（用户数据在存储中，不受影响）
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from proxy_probe import PROBE_TIMEOUT, TARGET_URL, probe_url
+
+# 健康检查间隔（秒）
+PROXY_CHECK_INTERVAL = 30
+# EWMA 平滑系数，越大越看重最近的结果
+EWMA_ALPHA = 0.3
+# 错误率 EWMA 达到该值视为不健康
+UNHEALTHY_ERROR_RATE = 0.5
+# 还没有测到延迟的代理按该值排序（毫秒）
+UNKNOWN_LATENCY_MS = 5000.0
+# 同一个页面两次换代理的最小间隔（秒）
+RECYCLE_COOLDOWN = 60
+
+
+class ProxyState:
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.latency_ms = None  # 延迟 EWMA
+        self.error_rate = 0.0  # 错误率 EWMA
+        self.in_use = 0  # 使用该代理的上下文数
+        self.checks = 0
+        self.failures = 0
+        self.last_error = None
+
+    @property
+    def healthy(self):
+        return self.error_rate < UNHEALTHY_ERROR_RATE
+
+    def score(self):
+        """越小越好：延迟按错误率加权，同一代理上的上下文越多越靠后"""
+        latency = self.latency_ms if self.latency_ms is not None else UNKNOWN_LATENCY_MS
+        return latency * (1 + 4 * self.error_rate) * (1 + self.in_use)
+
+
+class ProxyPool:
+    def __init__(self, proxies, check_interval=PROXY_CHECK_INTERVAL, target=TARGET_URL,
+                 timeout=PROBE_TIMEOUT, alpha=EWMA_ALPHA):
+        if not proxies:
+            raise ValueError("代理池至少需要一个代理")
+        self.states = {proxy: ProxyState(proxy) for proxy in dict.fromkeys(proxies)}
+        self.check_interval = check_interval
+        self.target = target
+        self.timeout = timeout
+        self.alpha = alpha
+        self.lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def record(self, proxy, ok, latency_ms=None, error=None):
+        """计入一次结果（健康检查或浏览器中的请求）"""
+        with self.lock:
+            state = self.states.get(proxy)
+            if state is None:
+                return
+            state.checks += 1
+            state.error_rate = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * state.error_rate
+            if ok and latency_ms is not None:
+                if state.latency_ms is None:
+                    state.latency_ms = latency_ms
+                else:
+                    state.latency_ms = self.alpha * latency_ms + (1 - self.alpha) * state.latency_ms
+            if not ok:
+                state.failures += 1
+                state.last_error = error
+
+    def check(self):
+        """并发检查所有代理一次"""
+        proxies = list(self.states)
+        with ThreadPoolExecutor(max_workers=len(proxies), thread_name_prefix='gmgn-proxy-check') as executor:
+            results = list(executor.map(lambda proxy: probe_url(proxy, self.target, self.timeout), proxies))
+        for proxy, result in zip(proxies, results):
+            ok = result['error'] is None and result['status'] < 500
+            self.record(proxy, ok, result['total_ms'], result['error'] or result['status'])
+
+    def _run(self):
+        while not self._stopped.wait(self.check_interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"⚠ 代理健康检查失败: {e}")
+
+    def start(self):
+        """先同步检查一次，再启动后台健康检查线程"""
+        self.check()
+        self._thread = threading.Thread(target=self._run, name='gmgn-proxy-health', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def acquire(self, exclude=()):
+        """分配当前最健康的代理；只剩被排除的代理时也照常分配"""
+        with self.lock:
+            candidates = [state for state in self.states.values() if state.proxy not in exclude] \
+                or list(self.states.values())
+            best = min(candidates, key=lambda state: (not state.healthy, state.score()))
+            best.in_use += 1
+            return best.proxy
+
+    def release(self, proxy):
+        with self.lock:
+            state = self.states.get(proxy)
+            if state is not None and state.in_use > 0:
+                state.in_use -= 1
+
+    def should_replace(self, proxy):
+        """代理不健康且池中还有健康的代理时返回 True"""
+        with self.lock:
+            state = self.states.get(proxy)
+            if state is None or state.healthy:
+                return False
+            return any(other.healthy for other in self.states.values() if other is not state)
+
+    def healthy_count(self):
+        with self.lock:
+            return sum(state.healthy for state in self.states.values())
+
+    def print_summary(self):
+        """打印每个代理的健康情况"""
+        print(f"   - 代理池:")
+        with self.lock:
+            for state in sorted(self.states.values(), key=lambda state: (not state.healthy, state.score())):
+                latency = '-' if state.latency_ms is None else f"{state.latency_ms:.0f}ms"
+                mark = '✅' if state.healthy else '❌'
+                print(f"       {mark} {state.proxy}: 延迟 {latency}，错误率 {state.error_rate:.0%}，"
+                      f"检查 {state.checks} 次，失败 {state.failures} 次")
@@ -0,0 +1,289 @@
+"""
+GMGN 代理探测 - 并发测量每个候选代理的连接、隧道、TLS 握手和首字节耗时
+对目标站点（gmgn.ai）和对照站点各请求一次，按目标站点的总耗时排序，
+结果写入 proxies_ranked.json，爬虫可以用 --proxy auto / --proxies auto 直接读取。
+只用标准库的 socket + ssl 实现 HTTP CONNECT 和 SOCKS5（远程解析域名），
+每个阶段单独计时
+"""
+import base64
+import json
+import socket
+import ssl
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+TARGET_URL = 'https://gmgn.ai/'
+CONTROL_URL = 'https://www.google.com/'
+
+# 单个阶段的超时（秒）
+PROBE_TIMEOUT = 5.0
+# 同时探测的候选数
+PROBE_WORKERS = 32
+
+# 探测结果文件
+RANKED_PROXY_FILE = 'proxies_ranked.json'
+
+# 常见代理软件的默认端口
+COMMON_PROXIES = [
+    'http://127.0.0.1:7890',  # Clash 默认
+    'http://127.0.0.1:7891',
+    'socks5://127.0.0.1:1080',  # v2ray 默认
+    'http://127.0.0.1:1087',
+    'http://127.0.0.1:10809',
+]
+
+# 直连（不使用代理）在结果中的名称
+DIRECT = 'direct'
+
+# 代理地址没有写端口时使用的默认端口
+DEFAULT_PROXY_PORTS = {'http': 80, 'socks5': 1080, 'socks5h': 1080}
+
+
+def parse_ports(spec):
+    """'7890-7899,1080' -> [7890, ..., 7899, 1080]"""
+    ports = []
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = part.split('-', 1)
+            ports.extend(range(int(start), int(end) + 1))
+        else:
+            ports.append(int(part))
+    return ports
+
+
+def normalize_proxy(proxy):
+    """没有写协议的地址按 HTTP 代理处理"""
+    proxy = proxy.strip()
+    if proxy != DIRECT and '://' not in proxy:
+        proxy = f'http://{proxy}'
+    return proxy
+
+
+def _ms(start):
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+def _recv_exact(sock, size):
+    data = b''
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('连接被关闭')
+        data += chunk
+    return data
+
+
+def _read_head(sock, first=b''):
+    """读取到响应头结束，返回状态码"""
+    data = first
+    while b'\r\n\r\n' not in data:
+        chunk = sock.recv(4096)
+        if not chunk:
+            break
+        data += chunk
+        if len(data) > 65536:
+            break
+    status_line = data.split(b'\r\n', 1)[0].decode('latin-1')
+    parts = status_line.split()
+    if len(parts) < 2 or not parts[0].startswith('HTTP/') or not parts[1].isdigit():
+        raise ConnectionError(f'无效的响应: {status_line[:60]!r}')
+    return int(parts[1])
+
+
+def _http_connect(sock, host, port, proxy):
+    request = f'CONNECT {host}:{port} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+    if proxy.username:
+        token = base64.b64encode(f'{proxy.username}:{proxy.password or ""}'.encode()).decode()
+        request += f'Proxy-Authorization: Basic {token}\r\n'
+    sock.sendall((request + '\r\n').encode('latin-1'))
+    status = _read_head(sock)
+    if status != 200:
+        raise ConnectionError(f'CONNECT 返回 {status}')
+
+
+def _socks5_connect(sock, host, port):
+    sock.sendall(b'\x05\x01\x00')  # 只支持无认证
+    version, method = _recv_exact(sock, 2)
+    if version != 5 or method != 0:
+        raise ConnectionError('SOCKS5 握手失败')
+    address = host.encode('idna')
+    sock.sendall(b'\x05\x01\x00\x03' + bytes([len(address)]) + address + port.to_bytes(2, 'big'))
+    reply = _recv_exact(sock, 4)
+    if reply[1] != 0:
+        raise ConnectionError(f'SOCKS5 连接失败（错误码 {reply[1]}）')
+    # 跳过绑定地址
+    atyp = reply[3]
+    if atyp == 1:
+        _recv_exact(sock, 4 + 2)
+    elif atyp == 4:
+        _recv_exact(sock, 16 + 2)
+    else:
+        _recv_exact(sock, _recv_exact(sock, 1)[0] + 2)
+
+
+def probe_url(proxy, url, timeout=PROBE_TIMEOUT):
+    """通过代理（或 DIRECT 直连）请求一次 url，返回各阶段耗时（毫秒）和状态码"""
+    result = {'connect_ms': None, 'tunnel_ms': None, 'tls_ms': None, 'ttfb_ms': None,
+              'total_ms': None, 'status': None, 'error': None}
+    target = urlsplit(url)
+    host = target.hostname
+    https = target.scheme == 'https'
+    port = target.port or (443 if https else 80)
+    path = target.path or '/'
+    if target.query:
+        path += '?' + target.query
+
+    proxy_parts = None if proxy == DIRECT else urlsplit(proxy)
+    if proxy_parts is not None and proxy_parts.scheme not in ('http', 'socks5', 'socks5h'):
+        result['error'] = f'不支持的代理协议: {proxy_parts.scheme}'
+        return result
+
+    started = time.perf_counter()
+    sock = None
+    try:
+        start = time.perf_counter()
+        if proxy_parts is None:
+            sock = socket.create_connection((host, port), timeout=timeout)
+        else:
+            sock = socket.create_connection(
+                (proxy_parts.hostname, proxy_parts.port or DEFAULT_PROXY_PORTS[proxy_parts.scheme]), timeout=timeout)
+        result['connect_ms'] = _ms(start)
+
+        # HTTP 代理访问 http 站点时直接发送绝对地址的请求，不需要隧道
+        absolute = proxy_parts is not None and proxy_parts.scheme == 'http' and not https
+        if proxy_parts is not None and not absolute:
+            start = time.perf_counter()
+            if proxy_parts.scheme == 'http':
+                _http_connect(sock, host, port, proxy_parts)
+            else:
+                _socks5_connect(sock, host, port)
+            result['tunnel_ms'] = _ms(start)
+
+        if https:
+            start = time.perf_counter()
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=host)
+            result['tls_ms'] = _ms(start)
+
+        request_target = url if absolute else path
+        request = (f'GET {request_target} HTTP/1.1\r\nHost: {target.netloc}\r\n'
+                   'User-Agent: Mozilla/5.0\r\nAccept: */*\r\nConnection: close\r\n\r\n')
+        start = time.perf_counter()
+        sock.sendall(request.encode('latin-1'))
+        first = sock.recv(1)
+        if not first:
+            raise ConnectionError('没有收到响应')
+        result['ttfb_ms'] = _ms(start)
+        result['status'] = _read_head(sock, first)
+        result['total_ms'] = _ms(started)
+    except (OSError, ValueError) as e:
+        result['error'] = str(e) or type(e).__name__
+    finally:
+        if sock is not None:
+            sock.close()
+    return result
+
+
+def probe_proxy(proxy, target=TARGET_URL, control=CONTROL_URL, timeout=PROBE_TIMEOUT):
+    """分别测量目标站点和对照站点"""
+    return {
+        'proxy': proxy,
+        'target': probe_url(proxy, target, timeout),
+        'control': probe_url(proxy, control, timeout) if control else None,
+    }
+
+
+def _ok(measurement):
+    """请求到达了站点：没有错误，且不是 5xx 或代理要求认证（407）
+
+    其他 4xx 仍算可达：gmgn.ai 前面的 Cloudflare 对这种不带 Cookie 的探测请求常返回 403，
+    HTTPS 站点经 HTTP 代理时代理自身的拒绝在 CONNECT 阶段就会报错
+    """
+    return (measurement is not None and measurement['error'] is None
+            and measurement['status'] < 500 and measurement['status'] != 407)
+
+
+def _rank_key(result):
+    """能访问目标站点的按总耗时排在前面，只能访问对照站点的其次，其余最后"""
+    if result['target_ok']:
+        return (0, result['target']['total_ms'])
+    if result['control_ok']:
+        return (1, result['control']['total_ms'])
+    return (2, 0)
+
+
+def scan(candidates, target=TARGET_URL, control=CONTROL_URL, timeout=PROBE_TIMEOUT,
+         workers=PROBE_WORKERS, include_direct=True):
+    """并发探测所有候选，返回排好序的结果列表"""
+    candidates = list(dict.fromkeys(normalize_proxy(proxy) for proxy in candidates))
+    if include_direct and DIRECT not in candidates:
+        candidates.insert(0, DIRECT)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(candidates))),
+                            thread_name_prefix='gmgn-probe') as executor:
+        results = list(executor.map(lambda proxy: probe_proxy(proxy, target, control, timeout), candidates))
+
+    for result in results:
+        result['target_ok'] = _ok(result['target'])
+        result['control_ok'] = _ok(result['control'])
+    results.sort(key=_rank_key)
+    for rank, result in enumerate(results, 1):
+        result['rank'] = rank
+    return results
+
+
+def save_ranking(results, path=RANKED_PROXY_FILE, target=TARGET_URL, control=CONTROL_URL):
+    """写入探测结果（先写临时文件再替换）"""
+    path = Path(path)
+    tmp_file = path.with_name(path.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump({
+            'generated_at': datetime.now().isoformat(),
+            'target': target,
+            'control': control,
+            'proxies': results,
+        }, f, ensure_ascii=False, indent=2)
+    tmp_file.replace(path)
+    return path
+
+
+def load_ranked_proxies(path=RANKED_PROXY_FILE, limit=None, include_direct=False):
+    """读取探测结果中能访问目标站点的代理，按排名返回；文件不存在时返回空列表"""
+    path = Path(path)
+    if not path.exists():
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        ranking = json.load(f)
+    proxies = [result['proxy'] for result in ranking.get('proxies', [])
+               if result.get('target_ok') and (include_direct or result['proxy'] != DIRECT)]
+    return proxies[:limit] if limit else proxies
+
+
+def best_proxy(path=RANKED_PROXY_FILE):
+    """排名第一的访问方式：代理地址；直连最快时返回 None；没有可用结果时抛出 ValueError"""
+    proxies = load_ranked_proxies(path, limit=1, include_direct=True)
+    if not proxies:
+        raise ValueError(f"{path} 中没有可用的代理，请先运行 python test_proxy.py")
+    return None if proxies[0] == DIRECT else proxies[0]
+
+
+def resolve_proxy(proxy, path=RANKED_PROXY_FILE):
+    """'auto' 换成探测结果中排名第一的访问方式，其他值原样返回"""
+    if proxy != 'auto':
+        return proxy
+    return best_proxy(path)
+
+
+def resolve_proxies(proxies, limit=None, path=RANKED_PROXY_FILE):
+    """['auto'] 换成探测结果中所有能访问目标站点的代理（最多 limit 个）"""
+    if proxies != ['auto']:
+        return proxies
+    ranked = load_ranked_proxies(path, limit)
+    if not ranked:
+        raise ValueError(f"{path} 中没有可用的代理，请先运行 python test_proxy.py")
+    return ranked
@@ -0,0 +1,412 @@
+"""
+GMGN 查询索引 - 在二进制快照（.json.bin）之上预先建好的索引，按标签 / 粉丝数区间 / 平台 / handle 前缀组合查询
+索引文件 gmgn_users_dedup.json.idx（小端）:
+  文件头 | 按行号的粉丝数 | 按粉丝数降序的行号 | 对应的粉丝数取负（升序，用于二分查找区间）| 按 handle（小写）排序的行号
+  | 各标签、各平台的行号倒排表（升序）| 目录（JSON: {"tags": 标签 -> [偏移, 长度], "platforms": 平台 -> [偏移, 长度]}）
+与二进制快照一样记录 JSON 快照的大小和修改时间，不一致时重建（二进制快照过期时一并重建）。
+还没有压缩进快照的日志（.journal / .journal.N）在打开时回放到内存中，与 JournalStore.load 一致：
+日志中的用户覆盖快照中的同一用户，查询时逐个检查后与快照部分的结果按同样的顺序合并。
+回放结果（去重后的日志用户和各日志读到的位置）保存在 .json.idx.journal 中，快照和日志段没变时
+只从上次的位置继续读当前日志。
+二进制快照（.json.bin）不存在或已过期时，打开索引会从 JSON 快照生成它（先写到本进程专用的临时文件，
+再原子替换，不会与爬虫压缩时写的文件冲突）；--rebuild-index 强制重建索引和二进制快照。
+查询时先用各条件的索引算出候选行数，从预计检查行数最少的索引出发逐行检查其余条件；
+排序方式与驱动索引的顺序一致时边检查边输出，凑够 limit 条就停止
+"""
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from pathlib import Path
+from binary_snapshot import BinarySnapshotWriter, MappedSnapshot, binary_path_for
+from journal_store import JournalStore, read_journal
+from json_codec import dumps_bytes, loads
+from json_stream import SnapshotReader
+
+MAGIC = b'GMGNIDX1'
+VERSION = 3
+# 日志回放缓存的格式版本
+OVERLAY_VERSION = 1
+
+# magic, version, 用户数, JSON 大小, JSON 修改时间(ns), 按行号的粉丝数偏移, 粉丝数行号偏移, 粉丝数偏移,
+# handle 行号偏移, 倒排表偏移, 目录偏移, 目录长度
+HEADER = struct.Struct('<8sIQQqQQQQQQQ')
+
+# 默认返回条数
+QUERY_LIMIT = 20
+# 排序方式
+SORTS = ('followers', 'followers-asc', 'handle')
+
+
+def index_path_for(snapshot_file):
+    """JSON 快照对应的查询索引: gmgn_users_dedup.json -> gmgn_users_dedup.json.idx"""
+    snapshot_file = Path(snapshot_file)
+    return snapshot_file.with_name(snapshot_file.name + '.idx')
+
+
+def overlay_path_for(snapshot_file):
+    """日志回放缓存: gmgn_users_dedup.json -> gmgn_users_dedup.json.idx.journal"""
+    snapshot_file = Path(snapshot_file)
+    return snapshot_file.with_name(snapshot_file.name + '.idx.journal')
+
+
+def _followers(user):
+    followers = user.get('followers')
+    return followers if type(followers) is int else 0
+
+
+def _handle(user):
+    return str(user.get('handle') or '').lower()
+
+
+def _platform_key(user):
+    """平台倒排表的键；不是整数的平台值与任何 --platform N 都不相等，不建倒排表"""
+    platform = user.get('platform', 0)
+    if isinstance(platform, float) and platform.is_integer():
+        platform = int(platform)
+    return str(int(platform)) if isinstance(platform, int) else None
+
+
+def open_binary(snapshot_file, rebuild=False):
+    """映射二进制快照；不存在、已过期或 rebuild 时先从 JSON 快照生成（会写入 .json.bin）
+
+    先写到带进程号的临时文件，再原子替换 .json.bin：读取方不会看到写了一半的文件，
+    也不会与爬虫压缩时写的 .json.bin.tmp 互相覆盖
+    """
+    snapshot_file = Path(snapshot_file)
+    binary_file = binary_path_for(snapshot_file)
+    base = None if rebuild else MappedSnapshot.open(binary_file, snapshot_file)
+    if base is None:
+        own_file = binary_file.with_name(f"{binary_file.name}.{os.getpid()}")
+        writer = BinarySnapshotWriter(own_file)
+        for user in SnapshotReader(snapshot_file):
+            writer.write(user)
+        if writer.close(snapshot_file):
+            try:
+                os.replace(own_file, binary_file)
+            except OSError:
+                # Windows 上正在被映射的旧文件不能替换，本次直接映射自己写的文件
+                base = MappedSnapshot.open(own_file, snapshot_file)
+        if base is None:
+            base = MappedSnapshot.open(binary_file, snapshot_file)
+        if base is None:
+            raise OSError(f"无法生成二进制快照: {binary_file}")
+    return base
+
+
+def build_index(base, snapshot_file, path):
+    """遍历一次映射快照，写出索引文件"""
+    stat = Path(snapshot_file).stat()
+    count = len(base)
+    # 字段不标准的用户在二进制快照中整条存为 JSON，粉丝数要从解码后的字典中取
+    followers = array('q')
+    handles = []
+    postings = {}
+    platforms = {}
+    for row in range(count):
+        user = base.row_user(row)
+        followers.append(_followers(user))
+        handles.append(_handle(user))
+        for tag in user.get('user_tags', []):
+            postings.setdefault(tag, array('I')).append(row)
+        platform = _platform_key(user)
+        if platform is not None:
+            platforms.setdefault(platform, array('I')).append(row)
+
+    by_followers = array('I', sorted(range(count), key=lambda row: (-followers[row], row)))
+    neg_followers = array('q', (-followers[row] for row in by_followers))
+    by_handle = array('I', sorted(range(count), key=lambda row: (handles[row], row)))
+
+    blocks = [followers.tobytes(), by_followers.tobytes(), neg_followers.tobytes(), by_handle.tobytes()]
+    directory = {'tags': {}, 'platforms': {}}
+    posting_bytes = bytearray()
+    for section, lists in (('tags', postings), ('platforms', platforms)):
+        for key, rows in lists.items():
+            directory[section][key] = [len(posting_bytes) // 4, len(rows)]
+            posting_bytes += rows.tobytes()
+    blocks.append(bytes(posting_bytes))
+    blocks.append(json.dumps(directory, ensure_ascii=False).encode('utf-8'))
+
+    offsets = []
+    offset = HEADER.size
+    for block in blocks:
+        offsets.append(offset)
+        offset += len(block)
+
+    path = Path(path)
+    tmp_file = path.with_name(path.name + '.tmp')
+    with open(tmp_file, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, count, stat.st_size, stat.st_mtime_ns, *offsets, len(blocks[-1])))
+        for block in blocks:
+            f.write(block)
+    try:
+        os.replace(tmp_file, path)
+    except OSError:
+        # Windows 上正在被映射的旧索引不能替换，本次直接使用临时文件
+        return tmp_file
+    return path
+
+
+class QueryIndex:
+    """映射后的查询索引 + 二进制快照"""
+
+    def __init__(self, base, mm, header, snapshot_file):
+        (_, _, self.count, _, _, row_followers_offset, followers_rows_offset, followers_offset,
+         handle_rows_offset, postings_offset, directory_offset, directory_length) = header
+        self.base = base
+        self.mm = mm
+        view = memoryview(mm)
+        self.followers = view[row_followers_offset:row_followers_offset + 8 * self.count].cast('q')
+        self.by_followers = view[followers_rows_offset:followers_rows_offset + 4 * self.count].cast('I')
+        self.neg_followers = view[followers_offset:followers_offset + 8 * self.count].cast('q')
+        self.by_handle = view[handle_rows_offset:handle_rows_offset + 4 * self.count].cast('I')
+        self.postings = view[postings_offset:directory_offset].cast('I')
+        self.directory = json.loads(mm[directory_offset:directory_offset + directory_length].decode('utf-8'))
+
+        # 日志中尚未压缩的用户: user_id -> (行号, 用户)；更新的用户沿用快照中的行号，新用户排在快照之后
+        self.journal_users = {}
+        self._load_journal(Path(snapshot_file))
+        self.replaced = {row for row, _ in self.journal_users.values() if row < self.count}
+
+    def _load_journal(self, snapshot_file):
+        """回放日志；.idx.journal 缓存与快照、日志段一致时只读取当前日志新追加的部分"""
+        overlay_file = overlay_path_for(snapshot_file)
+        journal_files = JournalStore(snapshot_file, history=False, handle_index=False).journal_files()
+        stat = snapshot_file.stat()
+        snapshot_key = [stat.st_size, stat.st_mtime_ns]
+
+        offsets = {}
+        new_users = 0
+        cache = None
+        try:
+            with open(overlay_file, 'rb') as f:
+                cache = loads(f.read())
+        except (OSError, ValueError):
+            pass
+        if (isinstance(cache, dict) and cache.get('version') == OVERLAY_VERSION
+                and cache.get('snapshot') == snapshot_key):
+            cached = dict(cache['journals'])
+            names = [path.name for path in journal_files]
+            sizes = {path.name: path.stat().st_size for path in journal_files}
+            # 日志段不可变、只会整体出现或消失：上次的名单必须是现在名单的前缀，之后最多多出当前日志；
+            # 日志不能比上次读到的位置短（被轮转或截断）
+            if names[:len(cached)] == list(cached) \
+                    and set(names[len(cached):]) <= {snapshot_file.name + '.journal'} \
+                    and all(sizes[name] >= offset for name, offset in cached.items()):
+                offsets = cached
+                new_users = cache['new_users']
+                self.journal_users = {user_id: (row, user) for user_id, row, user in cache['users']}
+        if not journal_files:
+            overlay_file.unlink(missing_ok=True)
+            return
+
+        changed = not offsets
+        journals = []
+        for path in journal_files:
+            start = offsets.get(path.name, 0)
+            entries, offset = read_journal(path, start)
+            journals.append((path.name, offset))
+            changed = changed or offset != start
+            for entry in entries:
+                for user in entry.get('users', []):
+                    user_id = str(user['user_id'])
+                    row = self.journal_users[user_id][0] if user_id in self.journal_users else self.base.find(user_id)
+                    if row is None:
+                        row = self.count + new_users
+                        new_users += 1
+                    self.journal_users[user_id] = (row, user)
+
+        if changed:
+            tmp_file = overlay_file.with_name(f"{overlay_file.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'wb') as f:
+                f.write(dumps_bytes({
+                    'version': OVERLAY_VERSION,
+                    'snapshot': snapshot_key,
+                    'journals': journals,
+                    'new_users': new_users,
+                    'users': [[user_id, row, user] for user_id, (row, user) in self.journal_users.items()],
+                }))
+            os.replace(tmp_file, overlay_file)
+
+    @classmethod
+    def open(cls, snapshot_file, rebuild=False):
+        """打开快照的查询索引，不存在或已过期时重建；rebuild 时连同二进制快照一起重建"""
+        snapshot_file = Path(snapshot_file)
+        base = open_binary(snapshot_file, rebuild)
+        path = index_path_for(snapshot_file)
+        stat = snapshot_file.stat()
+        if not rebuild:
+            index = cls._map(base, path, stat, snapshot_file)
+            if index is not None:
+                return index
+        index = cls._map(base, build_index(base, snapshot_file, path), stat, snapshot_file)
+        if index is None:
+            raise OSError(f"无法生成查询索引: {path}")
+        return index
+
+    @classmethod
+    def _map(cls, base, path, stat, snapshot_file):
+        try:
+            with open(path, 'rb') as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        if len(mm) < HEADER.size:
+            mm.close()
+            return None
+        header = HEADER.unpack_from(mm, 0)
+        magic, version, count, json_size, json_mtime_ns = header[:5]
+        if (magic != MAGIC or version != VERSION or count != len(base)
+                or json_size != stat.st_size or json_mtime_ns != stat.st_mtime_ns or sys.byteorder != 'little'):
+            mm.close()
+            return None
+        return cls(base, mm, header, snapshot_file)
+
+    def _posting(self, section, key):
+        """目录中某一节的倒排表，没有时返回空序列"""
+        entry = self.directory[section].get(key)
+        if entry is None:
+            return self.postings[0:0]
+        offset, length = entry
+        return self.postings[offset:offset + length]
+
+    def tag_rows(self, tag):
+        """标签的倒排表（升序行号）"""
+        return self._posting('tags', tag)
+
+    def platform_rows(self, platform):
+        """平台的倒排表（升序行号）"""
+        key = _platform_key({'platform': platform})
+        return self._posting('platforms', key) if key is not None else self.postings[0:0]
+
+    def follower_range(self, min_followers=None, max_followers=None):
+        """粉丝数在 [min, max] 内的用户在 by_followers 中的区间"""
+        lo = 0 if max_followers is None else bisect_left(self.neg_followers, -max_followers)
+        hi = self.count if min_followers is None else bisect_right(self.neg_followers, -min_followers)
+        return lo, max(lo, hi)
+
+    def handle_of(self, row):
+        return _handle(self.base.row_user(row))
+
+    def handle_range(self, prefix):
+        """handle（不区分大小写）以 prefix 开头的用户在 by_handle 中的区间"""
+        prefix = prefix.lower()
+        rows = self.by_handle
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.handle_of(rows[mid]) < prefix:
+                lo = mid + 1
+            else:
+                hi = mid
+        start = lo
+        hi = self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.handle_of(rows[mid]).startswith(prefix):
+                lo = mid + 1
+            else:
+                hi = mid
+        return start, lo
+
+    def query(self, tags=(), min_followers=None, max_followers=None, platform=None, handle_prefix=None,
+              sort='followers', limit=QUERY_LIMIT):
+        """组合查询，返回 (用户列表, 说明)；多个标签之间是“且”的关系"""
+        if sort not in SORTS:
+            raise ValueError(f"未知的排序方式: {sort}（可选 {', '.join(SORTS)}）")
+
+        # 各条件对应的候选集: (名称, 候选行数, 行号序列)
+        candidates = []
+        lo, hi = self.follower_range(min_followers, max_followers)
+        candidates.append(('followers', hi - lo, self.by_followers[lo:hi]))
+        posting_lists = [self.tag_rows(tag) for tag in tags]
+        for tag, rows in zip(tags, posting_lists):
+            candidates.append((f"tag:{tag}", len(rows), rows))
+        if platform is not None:
+            # 标签和平台的倒排表都按行号升序，检查时一样用二分查找
+            posting_lists.append(self.platform_rows(platform))
+            candidates.append((f"platform:{platform}", len(posting_lists[-1]), posting_lists[-1]))
+        if handle_prefix:
+            start, end = self.handle_range(handle_prefix)
+            candidates.append(('handle', end - start, self.by_handle[start:end]))
+
+        # 按排序方式对应的索引顺序扫描时凑够 limit 条就能停止：最小候选集占比为 p 时约需检查 limit / p 行，
+        # 比直接检查最小候选集的全部行还少时改用它驱动
+        ordered = {'followers': 'followers', 'followers-asc': 'followers', 'handle': 'handle'}[sort]
+        if ordered == 'handle' and not handle_prefix:
+            candidates.append(('handle', self.count, self.by_handle))
+        name, size, rows = min(candidates, key=lambda item: (item[1], item[0] != ordered))
+        if name != ordered:
+            ordered_name, ordered_size, ordered_rows = next(item for item in candidates if item[0] == ordered)
+            if min(ordered_size, limit * ordered_size / max(size, 1)) < size:
+                name, size, rows = ordered_name, ordered_size, ordered_rows
+        if name == ordered and sort == 'followers-asc':
+            rows = rows[::-1]
+
+        def matches(row):
+            if row in self.replaced:
+                return None  # 以日志中的版本为准
+            if name != 'followers' and (lo, hi) != (0, self.count):
+                followers = self.followers[row]
+                if (min_followers is not None and followers < min_followers) or \
+                        (max_followers is not None and followers > max_followers):
+                    return None
+            for posting in posting_lists:
+                if posting is not rows:
+                    i = bisect_left(posting, row)
+                    if i == len(posting) or posting[i] != row:
+                        return None
+            user = self.base.row_user(row)
+            if handle_prefix and name != 'handle' and \
+                    not _handle(user).startswith(handle_prefix.lower()):
+                return None
+            return user
+
+        if sort == 'handle':
+            sort_key = lambda item: (_handle(item[1]), item[0])
+        elif sort == 'followers':
+            sort_key = lambda item: (-_followers(item[1]), item[0])
+        else:
+            sort_key = lambda item: (_followers(item[1]), -item[0])
+
+        scanned = 0
+        found = []
+        if name == ordered:
+            for row in rows:
+                scanned += 1
+                user = matches(row)
+                if user is not None:
+                    found.append((row, user))
+                    if len(found) >= limit:
+                        break
+        else:
+            for row in rows:
+                scanned += 1
+                user = matches(row)
+                if user is not None:
+                    found.append((row, user))
+            found = heapq.nsmallest(limit, found, key=sort_key)
+
+        # 日志中的用户逐个检查，与快照部分的前 limit 名合并
+        plan = f"使用 {name} 索引，候选 {size} 行，检查 {scanned} 行"
+        if self.journal_users:
+            prefix = handle_prefix.lower() if handle_prefix else None
+            for row, user in self.journal_users.values():
+                followers = _followers(user)
+                if (min_followers is not None and followers < min_followers) or \
+                        (max_followers is not None and followers > max_followers):
+                    continue
+                if any(tag not in user.get('user_tags', []) for tag in tags):
+                    continue
+                if platform is not None and user.get('platform', 0) != platform:
+                    continue
+                if prefix and not _handle(user).startswith(prefix):
+                    continue
+                found.append((row, user))
+            found = heapq.nsmallest(limit, found, key=sort_key)
+            plan += f"，另检查日志中未压缩的 {len(self.journal_users)} 个用户"
+        return [user for _, user in found], plan
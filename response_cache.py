@@ -0,0 +1,62 @@
+"""
+GMGN 响应指纹缓存 - 跳过与最近某个响应完全相同的搜索结果
+反复浏览同一个列表时，接口经常返回一模一样的响应体；对原始响应体做 blake2b 哈希，
+在有界的 LRU 中记录最近成功合并过的指纹和解码出的用户列表，命中时跳过 JSON 解码，
+直接用缓存的用户列表照常合并和计数（请求数、各页面统计不因命中而变少）
+"""
+import hashlib
+import threading
+from collections import OrderedDict
+from crawler_metrics import metrics
+
+# 记录最近多少个响应的指纹，0 表示不使用缓存
+RESPONSE_CACHE_SIZE = 1024
+
+
+class ResponseCache:
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.fingerprints = OrderedDict()  # 指纹 -> 用户列表，按最近使用排序
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.bytes_skipped = 0  # 命中时省掉解码的字节数
+
+    @staticmethod
+    def fingerprint(body):
+        """原始响应体（bytes）的指纹"""
+        return hashlib.blake2b(body, digest_size=16).digest()
+
+    def get(self, fingerprint, size=0):
+        """最近合并过完全相同的响应时返回其用户列表（并计为命中），否则计为未命中并返回 None"""
+        if self.maxsize <= 0:
+            return None
+        with self.lock:
+            users = self.fingerprints.get(fingerprint)
+            if users is not None:
+                self.fingerprints.move_to_end(fingerprint)
+                self.hits += 1
+                self.bytes_skipped += size
+                metrics.inc('cache_hits')
+                return users
+            self.misses += 1
+        metrics.inc('cache_misses')
+        return None
+
+    def add(self, fingerprint, users):
+        """响应成功合并后记录指纹和用户列表；解析失败的响应不记录，下次照常处理"""
+        if self.maxsize <= 0:
+            return
+        with self.lock:
+            self.fingerprints[fingerprint] = users
+            self.fingerprints.move_to_end(fingerprint)
+            while len(self.fingerprints) > self.maxsize:
+                self.fingerprints.popitem(last=False)
+
+    def print_summary(self):
+        """打印命中情况"""
+        total = self.hits + self.misses
+        if total == 0:
+            return
+        print(f"   - 重复响应（跳过解析）: {self.hits}/{total} ({self.hits / total:.0%})，"
+              f"省去解码 {self.bytes_skipped / 1024:.0f}KB")
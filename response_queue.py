@@ -0,0 +1,82 @@
+"""
+GMGN 响应处理队列 - 有界队列 + 固定数量的工作协程
+page.on('response') 回调里只做 URL 前缀过滤和入队，不再为每个响应创建任务；
+队列满时丢弃并计数，停止时先处理完队列中的响应再做最终保存
+"""
+import asyncio
+from crawler_metrics import metrics
+
+# 队列最多缓存的响应数
+RESPONSE_QUEUE_SIZE = 100
+# 并发处理响应的工作协程数
+RESPONSE_WORKERS = 4
+
+
+class ResponseQueue:
+    def __init__(self, handler, url_prefix, maxsize=RESPONSE_QUEUE_SIZE, workers=RESPONSE_WORKERS):
+        self.handler = handler
+        self.url_prefix = url_prefix
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize)
+        self._tasks = []
+
+        # 统计信息
+        self.seen = 0  # 收到的响应总数
+        self.enqueued = 0  # 通过过滤并入队的响应数
+        self.processed = 0  # 已处理完成的响应数
+        self.dropped = 0  # 队列已满被丢弃的响应数
+        self.max_depth = 0  # 队列最大深度
+
+    def start(self):
+        """启动工作协程（需在事件循环中调用）"""
+        for i in range(self.workers):
+            self._tasks.append(asyncio.create_task(self._worker(), name=f'gmgn-response-worker-{i}'))
+
+    def submit(self, response):
+        """page.on('response') 回调：过滤后入队，队列满时丢弃"""
+        self.seen += 1
+        metrics.inc('responses_seen')
+        if not response.url.startswith(self.url_prefix):
+            return
+        metrics.inc('responses_matched')
+
+        try:
+            self.queue.put_nowait(response)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            print(f"⚠️  响应队列已满（{self.queue.maxsize}），丢弃: {response.url}")
+            return
+
+        self.enqueued += 1
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    async def _worker(self):
+        while True:
+            response = await self.queue.get()
+            try:
+                await self.handler(response)
+            except Exception as e:
+                print(f"❌ 处理响应时出错: {e}")
+            finally:
+                self.processed += 1
+                self.queue.task_done()
+
+    async def drain(self, timeout=30):
+        """等待队列中的响应处理完毕，然后停止工作协程"""
+        if self._tasks:
+            try:
+                await asyncio.wait_for(self.queue.join(), timeout)
+            except asyncio.TimeoutError:
+                print(f"⚠️  等待响应处理超时，剩余 {self.queue.qsize()} 个未处理")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def print_summary(self):
+        """打印队列统计"""
+        print(f"   - 监听响应数: {self.seen}")
+        print(f"   - 入队/处理: {self.enqueued}/{self.processed}")
+        print(f"   - 队列最大深度: {self.max_depth}/{self.queue.maxsize}")
+        print(f"   - 队列满丢弃: {self.dropped}")
@@ -0,0 +1,99 @@
+"""
+GMGN 请求拦截策略 - 只拦截目标 API，可选屏蔽图片/媒体/字体/统计脚本
+拦截规则以 glob/正则的形式交给浏览器匹配，不匹配的请求不会经过 Python，
+页面加载和代理流量都不再被每个静态资源拖慢。
+被中止的请求没有响应，无法得知实际大小：节省的流量按每类资源的典型大小估算
+"""
+import re
+from collections import Counter
+
+# 只拦截用户搜索 API，其他请求由浏览器直接处理
+TARGET_ROUTE_PATTERN = '**/vas/api/v1/twitter/user/search*'
+
+# 按扩展名屏蔽的静态资源
+STATIC_RESOURCE_PATTERN = re.compile(
+    r'^[^?#]+\.(png|jpe?g|gif|webp|avif|bmp|ico|svg|woff2?|ttf|otf|eot|mp4|webm|mp3|m4a|ogg|wav)([?#].*)?$',
+    re.IGNORECASE
+)
+
+# 第三方统计/广告域名
+ANALYTICS_HOSTS = (
+    'google-analytics.com',
+    'googletagmanager.com',
+    'doubleclick.net',
+    'googlesyndication.com',
+    'facebook.net',
+    'hotjar.com',
+    'mixpanel.com',
+    'segment.io',
+    'segment.com',
+    'amplitude.com',
+    'clarity.ms',
+    'sentry.io',
+)
+ANALYTICS_PATTERN = re.compile(
+    r'^https?://([^/?#]*\.)?(' + '|'.join(re.escape(host) for host in ANALYTICS_HOSTS) + r')([:/?#]|$)',
+    re.IGNORECASE
+)
+
+# 屏蔽的资源类型（Playwright request.resource_type）
+BLOCKED_RESOURCE_TYPES = ('image', 'media', 'font')
+
+# 每类被屏蔽请求的估算大小（字节），用于估算节省的流量
+ESTIMATED_BYTES = {
+    'image': 30 * 1024,
+    'media': 500 * 1024,
+    'font': 40 * 1024,
+    'analytics': 60 * 1024,
+}
+
+
+class ResourceBlocker:
+    def __init__(self):
+        self.blocked = Counter()  # 按类别统计被屏蔽的请求
+        self.blocked_bytes = Counter()  # 按类别估算的节省字节数
+        self.passed = 0  # 命中规则但类型不符、被放行的请求
+
+    async def install(self, page):
+        """在页面上注册屏蔽规则"""
+        await page.route(STATIC_RESOURCE_PATTERN, self.handle_route)
+        await page.route(ANALYTICS_PATTERN, self.handle_route)
+
+    async def handle_route(self, route):
+        """屏蔽命中的请求"""
+        request = route.request
+
+        if ANALYTICS_PATTERN.match(request.url):
+            category = 'analytics'
+        elif request.resource_type in BLOCKED_RESOURCE_TYPES:
+            category = request.resource_type
+        else:
+            # 例如以脚本方式加载的 .svg，放行
+            self.passed += 1
+            await route.continue_()
+            return
+
+        self.blocked[category] += 1
+        self.blocked_bytes[category] += ESTIMATED_BYTES[category]
+        await route.abort('blockedbyclient')
+
+    @property
+    def total_blocked(self):
+        return sum(self.blocked.values())
+
+    @property
+    def total_blocked_bytes(self):
+        """估算节省的字节数（按 ESTIMATED_BYTES，不是实测值）"""
+        return sum(self.blocked_bytes.values())
+
+    def describe(self):
+        """一行摘要：屏蔽请求数和估算节省的流量"""
+        return f"{self.total_blocked} 个请求，估算节省约 {self.total_blocked_bytes / (1 << 20):.1f} MB"
+
+    def print_summary(self):
+        """打印屏蔽统计"""
+        print(f"   - 屏蔽请求数: {self.total_blocked}（未发出的请求，不占用代理流量）")
+        print(f"   - 估算节省流量: {self.total_blocked_bytes / (1 << 20):.1f} MB"
+              f"（被中止的请求没有响应，按每类资源的典型大小估算）")
+        for category, count in self.blocked.most_common():
+            print(f"       {category:10s} {count:6d}  ~{self.blocked_bytes[category] / 1024:.0f} KB")
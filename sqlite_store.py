@@ -0,0 +1,256 @@
+"""
+GMGN 用户数据存储（SQLite 版本）- WAL 模式 + 索引
+users 表以 user_id 为主键、followers 建索引，标签拆到 user_tags 表；
+每批用户在一个事务中批量 upsert。接口与 JournalStore 相同，可直接替换；
+同时保留 JSON 快照的导入导出，旧文件和 analyze_data.py 照常可用
+"""
+import math
+import sqlite3
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from change_merge import ChangeAwareMerge
+from crawler_metrics import metrics
+from follower_history import FOLLOWER_HISTORY, FollowerHistory, history_path_for
+from handle_search import HANDLE_INDEX, HandleLog, handles_path_for
+from journal_store import JournalStore
+from json_codec import dumps, loads
+from json_stream import iter_users, write_snapshot
+from user_table import UserTable
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id   TEXT PRIMARY KEY,
+    handle    TEXT,
+    platform  INTEGER,
+    followers INTEGER,
+    followed  INTEGER,
+    data      TEXT  -- 原始 JSON，保留接口返回的全部字段
+);
+CREATE INDEX IF NOT EXISTS idx_users_followers ON users(followers DESC);
+CREATE TABLE IF NOT EXISTS user_tags (
+    tag     TEXT NOT NULL,
+    user_id TEXT NOT NULL REFERENCES users(user_id),
+    PRIMARY KEY (tag, user_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_user_tags_user ON user_tags(user_id);
+"""
+
+
+def db_path_for(output_file):
+    """JSON 输出文件对应的数据库文件: gmgn_users_dedup.json -> gmgn_users_dedup.db"""
+    return Path(output_file).with_suffix('.db')
+
+
+class SqliteStore(ChangeAwareMerge):
+    def __init__(self, snapshot_file, db_file=None, export_json=True, history=FOLLOWER_HISTORY,
+                 handle_index=HANDLE_INDEX):
+        self.snapshot_file = Path(snapshot_file)
+        self.db_file = Path(db_file) if db_file else db_path_for(snapshot_file)
+        self.export_json = export_json  # compact() 时同步导出 JSON 快照
+        self.users = UserTable()  # key 为 user_id，自动去重
+        self.stats = None  # 可选的 LiveStats，合并时按差值更新
+        # 粉丝数历史: gmgn_users_dedup.json.history
+        self.history = FollowerHistory(history_path_for(self.snapshot_file)) if history else None
+        # handle 日志: gmgn_users_dedup.json.handles
+        self.handles = HandleLog(handles_path_for(self.snapshot_file)) if handle_index else None
+        self.field_changes = Counter()  # 字段名 -> 合并时发生变化的次数
+        self.lock = threading.RLock()
+        self.pending_batches = 0
+
+        # 后台写盘线程和事件循环都会访问同一个连接，由 self.lock 串行化
+        self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def load(self):
+        """从数据库加载用户；数据库为空时先导入 JSON 快照和未压缩的日志，返回用户数"""
+        with self.lock:
+            count = self.conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+            if count == 0:
+                self.import_journal_store()
+
+            for row in self.conn.execute('SELECT data FROM users'):
+                user = loads(row['data'])
+                self.users[user['user_id']] = user
+            return len(self.users)
+
+    def append(self, users):
+        """在一个事务中批量 upsert 一批用户"""
+        with self.lock:
+            with metrics.time('batch_write'):
+                with self.conn:
+                    self._upsert(users)
+            self.pending_batches += 1
+        self.flush_history()
+
+    def _upsert(self, users):
+        self.conn.executemany("""
+            INSERT INTO users (user_id, handle, platform, followers, followed, data)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET
+                handle = excluded.handle,
+                platform = excluded.platform,
+                followers = excluded.followers,
+                followed = excluded.followed,
+                data = excluded.data
+        """, [(
+            user['user_id'],
+            user.get('handle'),
+            user.get('platform', 0),
+            user.get('followers', 0),
+            int(bool(user.get('followed'))),
+            dumps(user),
+        ) for user in users])
+
+        self.conn.executemany('DELETE FROM user_tags WHERE user_id = ?',
+                              [(user['user_id'],) for user in users])
+        self.conn.executemany('INSERT OR IGNORE INTO user_tags (tag, user_id) VALUES (?, ?)',
+                              [(tag, user['user_id']) for user in users for tag in user.get('user_tags', [])])
+
+    def merge(self, users):
+        """合并一批用户到内存并写入数据库（只写新增或内容有变化的用户），返回新增用户数"""
+        new_users, changed = self.apply(users)
+        if changed:
+            self.append(changed)
+        return new_users
+
+    def maybe_compact(self):
+        """数据库按批写入，不需要后台压缩"""
+
+    def compact(self, background=False):
+        """导出 JSON 快照（如果开启），保持与 JSON 版本的兼容"""
+        if self.export_json:
+            self.export(self.snapshot_file)
+        self.pending_batches = 0
+
+    def close(self):
+        self.flush_history()
+        if self.pending_batches > 0:
+            self.compact()
+        with self.lock:
+            self.conn.close()
+
+    def import_json(self, json_file, batch_size=1000):
+        """从 JSON 快照流式导入用户，每 batch_size 个一个事务，返回导入数量"""
+        return self._import(iter_users(json_file), batch_size)
+
+    def import_journal_store(self, batch_size=1000):
+        """导入日志版本的数据：JSON 快照加上 .journal / .journal.N 中尚未压缩的用户，返回导入数量
+
+        从日志后端切换过来时，最近一次压缩之后捕获的用户只在日志中，只导入快照会丢失它们
+        """
+        journal = JournalStore(self.snapshot_file, binary_snapshot=False, history=False, handle_index=False)
+        if not journal.journal_files():
+            # 没有日志时流式导入快照，不需要把所有用户读入内存
+            return self.import_json(self.snapshot_file) if self.snapshot_file.exists() else 0
+        journal.load()
+        return self._import(journal.users.values(), batch_size)
+
+    def _import(self, users, batch_size):
+        """每 batch_size 个用户一个事务批量写入，返回写入数量"""
+        count = 0
+        batch = []
+        with self.lock:
+            for user in users:
+                batch.append(user)
+                if len(batch) >= batch_size:
+                    with self.conn:
+                        self._upsert(batch)
+                    count += len(batch)
+                    batch = []
+            if batch:
+                with self.conn:
+                    self._upsert(batch)
+                count += len(batch)
+        return count
+
+    def export(self, json_file):
+        """按粉丝数排序导出 JSON 快照（格式与原 save_data 输出一致）"""
+        with self.lock:
+            total = self.count()
+            with metrics.time('snapshot_write'):
+                write_snapshot(json_file, self.iter_users(), total)
+        metrics.inc('bytes_written', Path(json_file).stat().st_size)
+        return total
+
+    # ---- 查询（analyze_data.py 使用） ----
+
+    def count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def tag_counts(self):
+        """各标签的用户数，按数量降序
+
+        数量相同的标签按在导出快照（粉丝数降序）中第一次出现的顺序排列，与 JSON 版本的统计结果一致：
+        先比较第一个带该标签的用户的位置，同一个用户的多个标签再按 user_tags 中的顺序
+        """
+        rows = self.conn.execute("""
+            WITH ranked AS (
+                SELECT user_id, data, ROW_NUMBER() OVER (ORDER BY followers DESC, rowid) AS pos FROM users
+            )
+            SELECT t.tag, COUNT(*) AS n, MIN(r.pos) AS first, r.data
+            FROM user_tags t JOIN ranked r ON r.user_id = t.user_id
+            GROUP BY t.tag
+        """).fetchall()
+        # SQLite 中与 MIN() 一起查询的 r.data 取自 pos 最小的那一行，即第一个带该标签的用户
+
+        def first_seen(row):
+            tags = loads(row['data']).get('user_tags') or []
+            return row['first'], tags.index(row['tag']) if row['tag'] in tags else len(tags)
+
+        rows.sort(key=lambda row: (-row['n'], first_seen(row)))
+        return [(row['tag'], row['n']) for row in rows]
+
+    def follower_stats(self):
+        """粉丝数的平均值、最大值、最小值"""
+        row = self.conn.execute(
+            'SELECT AVG(followers) AS avg, MAX(followers) AS max, MIN(followers) AS min FROM users').fetchone()
+        return {'avg': row['avg'] or 0, 'max': row['max'] or 0, 'min': row['min'] or 0}
+
+    def follower_percentile(self, p):
+        """粉丝数的第 p 百分位（最近秩法，走 followers 索引）"""
+        total = self.count()
+        if total == 0:
+            return 0
+        rank = max(1, math.ceil(p / 100 * total))
+        return self.conn.execute('SELECT followers FROM users ORDER BY followers LIMIT 1 OFFSET ?',
+                                 (rank - 1,)).fetchone()[0]
+
+    def platform_counts(self):
+        return [(row['platform'], row['n']) for row in self.conn.execute(
+            'SELECT platform, COUNT(*) AS n FROM users GROUP BY platform ORDER BY n DESC')]
+
+    def top_users(self, limit=10, tag=None):
+        """粉丝数最多的用户（走 followers 索引），可按标签过滤"""
+        if tag is None:
+            rows = self.conn.execute(
+                'SELECT data FROM users ORDER BY followers DESC, rowid LIMIT ?', (limit,))
+        else:
+            rows = self.conn.execute("""
+                SELECT u.data FROM users u
+                WHERE EXISTS (SELECT 1 FROM user_tags t WHERE t.tag = ? AND t.user_id = u.user_id)
+                ORDER BY u.followers DESC, u.rowid LIMIT ?
+            """, (tag, limit))
+        return [loads(row['data']) for row in rows]
+
+    def iter_users(self, tag=None):
+        """按粉丝数降序逐个返回用户，可按标签过滤"""
+        if tag is None:
+            rows = self.conn.execute('SELECT data FROM users ORDER BY followers DESC, rowid')
+        else:
+            rows = self.conn.execute("""
+                SELECT u.data FROM user_tags t JOIN users u ON u.user_id = t.user_id
+                WHERE t.tag = ? ORDER BY u.followers DESC, u.rowid
+            """, (tag,))
+        for row in rows:
+            yield loads(row['data'])
+
+    def last_updated(self):
+        """数据库文件的最后修改时间"""
+        wal_file = self.db_file.with_name(self.db_file.name + '-wal')
+        mtime = max(p.stat().st_mtime for p in (self.db_file, wal_file) if p.exists())
+        return datetime.fromtimestamp(mtime).isoformat()
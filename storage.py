@@ -0,0 +1,22 @@
+"""
+GMGN 用户数据存储后端选择
+journal: 追加写日志 + JSON 快照（默认）
+sqlite:  SQLite 数据库（WAL 模式，带索引），停止时同步导出 JSON 快照
+"""
+from journal_store import JournalStore
+from sqlite_store import SqliteStore
+
+# 默认存储后端
+STORAGE_BACKEND = 'journal'
+
+BACKENDS = {
+    'journal': JournalStore,
+    'sqlite': SqliteStore,
+}
+
+
+def open_store(output_file, backend=STORAGE_BACKEND):
+    """按名称创建存储后端"""
+    if backend not in BACKENDS:
+        raise ValueError(f"未知的存储后端: {backend}（可选: {', '.join(BACKENDS)}）")
+    return BACKENDS[backend](output_file)
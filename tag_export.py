@@ -0,0 +1,176 @@
+"""
+GMGN 按标签导出 - 流式、增量、可多进程
+第一遍流式读取数据源，为每个标签计算内容指纹（按数据源中的成员顺序，只有并列用户的顺序变化也会重新导出），
+与上次导出时保存的指纹（exports.fingerprints.json）比较，只重新导出有变化的标签；
+第二遍再次流式读取，每个标签一个带缓冲的 SnapshotWriter，逐个写入用户。
+数据源中已经没有的标签，上次导出的文件会被删除。
+标签较多时可以按标签分组交给进程池，每个进程各自读取数据源并写入自己负责的标签
+"""
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from json_stream import SnapshotReader, SnapshotWriter
+from sqlite_store import SqliteStore
+
+# 默认导出进程数（1 表示在当前进程中导出）
+EXPORT_WORKERS = 1
+
+
+def fingerprint_file_for(output_dir):
+    """导出目录对应的指纹文件: exports/ -> exports.fingerprints.json"""
+    output_dir = Path(output_dir)
+    return output_dir.with_name(output_dir.name + '.fingerprints.json')
+
+
+def _user_digest(user):
+    return hashlib.blake2b(json.dumps(user, ensure_ascii=False, sort_keys=True).encode('utf-8'),
+                           digest_size=16).digest()
+
+
+def tag_file(output_dir, tag):
+    return Path(output_dir) / f"{tag}_users.json"
+
+
+class TagExportSource:
+    """导出数据源：JSON 快照或 SQLite 数据库（.db）"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.is_db = self.path.suffix == '.db'
+
+    def _store(self):
+        return SqliteStore(self.path.with_suffix('.json'), db_file=self.path, export_json=False)
+
+    def iter_users(self):
+        if self.is_db:
+            return self._store().iter_users()
+        return iter(SnapshotReader(self.path))
+
+    def scan(self):
+        """第一遍：统计每个标签的用户数和内容指纹（依次哈希各成员），并检查数据源是否已按粉丝数降序排列"""
+        counts = {}
+        digests = {}
+        ordered = True
+        previous = None
+        for user in self.iter_users():
+            followers = user.get('followers', 0)
+            if previous is not None and followers > previous:
+                ordered = False
+            previous = followers
+
+            digest = None
+            for tag in user.get('user_tags', []):
+                if digest is None:
+                    digest = _user_digest(user)
+                counts[tag] = counts.get(tag, 0) + 1
+                if tag not in digests:
+                    digests[tag] = hashlib.blake2b(digest_size=16)
+                digests[tag].update(digest)
+
+        fingerprints = {tag: f"{counts[tag]}:{digests[tag].hexdigest()}" for tag in counts}
+        return counts, fingerprints, ordered
+
+    def export(self, tags, counts, output_dir, ordered=True):
+        """第二遍：把指定标签的用户写入各自的文件，返回 {标签: 用户数}"""
+        output_dir = Path(output_dir)
+        writers = {tag: SnapshotWriter(tag_file(output_dir, tag),
+                                       {'tag': tag, 'total_users': counts[tag]})
+                   for tag in tags}
+        try:
+            if self.is_db:
+                # 数据库按标签走索引查询，已按粉丝数排序
+                store = self._store()
+                for tag, writer in writers.items():
+                    for user in store.iter_users(tag):
+                        writer.write(user)
+            elif ordered:
+                # 快照已按粉丝数降序排列（爬虫写出的快照都是），逐条分发即可
+                for user in self.iter_users():
+                    for tag in user.get('user_tags', []):
+                        writer = writers.get(tag)
+                        if writer is not None:
+                            writer.write(user)
+            else:
+                # 数据源未排序时只能先收集这些标签的用户再排序
+                groups = {tag: [] for tag in tags}
+                for user in self.iter_users():
+                    for tag in user.get('user_tags', []):
+                        if tag in groups:
+                            groups[tag].append(user)
+                for tag, tag_users in groups.items():
+                    tag_users.sort(key=lambda x: x.get('followers', 0), reverse=True)
+                    for user in tag_users:
+                        writers[tag].write(user)
+        except BaseException:
+            for writer in writers.values():
+                writer.abort()
+            raise
+
+        for writer in writers.values():
+            writer.close()
+        return {tag: writer.count for tag, writer in writers.items()}
+
+
+def _export_worker(path, tags, counts, output_dir, ordered):
+    return TagExportSource(path).export(tags, counts, output_dir, ordered)
+
+
+def _load_fingerprints(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_fingerprints(path, fingerprints):
+    tmp_file = path.with_name(path.name + '.tmp')
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(fingerprints, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp_file, path)
+
+
+def export_tags(path, output_dir='exports', workers=EXPORT_WORKERS, force=False):
+    """按标签导出，跳过内容未变化的标签，删除已不存在的标签的文件
+
+    返回 (已导出 {标签: 用户数}, 跳过的标签列表, 删除的标签列表)
+    """
+    source = TagExportSource(path)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(exist_ok=True)
+
+    counts, fingerprints, ordered = source.scan()
+
+    fingerprint_file = fingerprint_file_for(output_dir)
+    saved = _load_fingerprints(fingerprint_file)
+    previous = {} if force else saved
+    changed = [tag for tag in counts
+               if previous.get(tag) != fingerprints[tag] or not tag_file(output_dir, tag).exists()]
+    skipped = [tag for tag in counts if tag not in changed]
+
+    exported = {}
+    workers = max(1, min(workers, len(changed)))
+    if workers == 1:
+        if changed:
+            exported = source.export(changed, counts, output_dir, ordered)
+    else:
+        # 按标签大小轮流分组，尽量让每个进程的写入量接近
+        groups = [[] for _ in range(workers)]
+        for i, tag in enumerate(sorted(changed, key=counts.get, reverse=True)):
+            groups[i % workers].append(tag)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_export_worker, str(source.path), group, counts, str(output_dir), ordered)
+                       for group in groups]
+            for future in futures:
+                exported.update(future.result())
+
+    # 只删除指纹文件中记录过（即由导出生成）的标签文件，目录中的其他文件不动
+    removed = [tag for tag in saved if tag not in counts]
+    for tag in removed:
+        tag_file(output_dir, tag).unlink(missing_ok=True)
+
+    _save_fingerprints(fingerprint_file, fingerprints)
+    # 保持与数据源中的标签顺序一致
+    return {tag: exported[tag] for tag in counts if tag in exported}, skipped, removed
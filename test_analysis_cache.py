@@ -0,0 +1,99 @@
+"""
+analysis_cache 测试：命中、只追加新用户时增量累加，已有用户被更新或日志被压缩 / 轮转 / 截断时完整重新计算；
+每种情况的结果都与不使用缓存（--no-cache）时一致
+运行: python -m pytest test_analysis_cache.py
+"""
+import os
+from benchmark import SyntheticUsers
+from analysis_cache import AnalysisCache
+from journal_store import JournalStore
+
+
+def _setup(tmp_path, pages=3):
+    """写好快照（含二进制快照）和一段未压缩的日志"""
+    snapshot = tmp_path / 'users.json'
+    synthetic = SyntheticUsers(page_size=30, overlap=0, seed=7)
+    store = JournalStore(snapshot, history=False, handle_index=False, compact_every=1000)
+    store.load()
+    for _ in range(pages):
+        store.merge(synthetic.page())
+    store.compact()
+    store.merge(synthetic.page())
+    return snapshot, synthetic, store
+
+
+def _check(snapshot, status):
+    cache = AnalysisCache(snapshot)
+    stats, last_updated = cache.stats()
+    assert cache.status == status
+    fresh = AnalysisCache(snapshot)
+    expected, expected_updated = fresh.stats(use_cache=False)
+    assert fresh.status == 'full'
+    assert stats.report() == expected.report()
+    assert last_updated == expected_updated
+    return cache
+
+
+def test_unchanged_data_hits_cache(tmp_path):
+    snapshot, _, _ = _setup(tmp_path)
+    assert AnalysisCache(snapshot).stats()[0].report()['total_users'] == 120
+    assert AnalysisCache(snapshot).cache_file.exists()
+    _check(snapshot, 'hit')
+
+
+def test_appended_new_users_are_added_incrementally(tmp_path):
+    snapshot, synthetic, store = _setup(tmp_path)
+    AnalysisCache(snapshot).stats()
+    store.merge(synthetic.page())
+    store.merge(synthetic.page())
+
+    cache = _check(snapshot, 'incremental')
+    assert cache.new_users == 60
+    assert cache.stats()[0].report()['total_users'] == 180
+    # 增量结果已写回缓存，再次读取直接命中
+    _check(snapshot, 'hit')
+
+
+def test_updated_existing_user_falls_back_to_full(tmp_path):
+    snapshot, synthetic, store = _setup(tmp_path)
+    AnalysisCache(snapshot).stats()
+    # 快照中的用户
+    user = dict(next(iter(store.users.values())))
+    user['followers'] += 12345
+    store.merge([user, *synthetic.page()])
+    _check(snapshot, 'full')
+
+    # 日志中（快照之后）的用户
+    AnalysisCache(snapshot).stats()
+    entry_user = dict(list(store.users.values())[-1])
+    entry_user['user_tags'] = ['kol', 'whale']
+    store.merge([entry_user])
+    _check(snapshot, 'full')
+
+
+def test_compaction_since_cache_falls_back_to_full(tmp_path):
+    snapshot, synthetic, store = _setup(tmp_path)
+    AnalysisCache(snapshot).stats()
+    store.merge(synthetic.page())
+    store.compact()
+    assert store.journal_files() == []
+    _check(snapshot, 'full')
+
+
+def test_rotated_journal_falls_back_to_full(tmp_path):
+    snapshot, synthetic, store = _setup(tmp_path)
+    AnalysisCache(snapshot).stats()
+    # 压缩轮转了日志，但快照还没写完（或写快照时被中断）
+    os.replace(store.journal_file, store.journal_file.with_name(store.journal_file.name + '.1'))
+    _check(snapshot, 'full')
+
+
+def test_truncated_journal_falls_back_to_full(tmp_path):
+    snapshot, synthetic, store = _setup(tmp_path)
+    store.merge(synthetic.page())
+    AnalysisCache(snapshot).stats()
+    with open(store.journal_file, 'rb') as f:
+        first_line = f.readline()
+    with open(store.journal_file, 'wb') as f:
+        f.write(first_line)
+    _check(snapshot, 'full')
@@ -0,0 +1,54 @@
+"""
+api_replay 测试：用 benchmark 的假 gmgn 服务器验证按游标翻页和合并结果
+运行: python -m pytest test_api_replay.py
+"""
+import asyncio
+
+import pytest
+
+from api_replay import ApiReplayer, ApiTemplate
+from benchmark import API_PATH, FakeGmgnServer
+from journal_store import JournalStore
+
+
+def test_replay_follows_cursor_until_last_page(tmp_path):
+    server = FakeGmgnServer(page_size=20, overlap=0.3, pages_per_query=5).start()
+    try:
+        store = JournalStore(tmp_path / 'users.json', history=False, handle_index=False)
+        store.load()
+        template = ApiTemplate(f"{server.url}{API_PATH}?q=bench")
+        replayer = ApiReplayer(template, store.merge, concurrency=2, max_pages=50, page_delay=0)
+        asyncio.run(replayer.run())
+    finally:
+        server.stop()
+
+    # has_more 为 false 时停止，不会一直翻到 max_pages
+    assert server.requests == 5
+    assert replayer.pages == 5
+    assert replayer.users == 100
+    assert replayer.errors == 0
+    # 重复出现的用户只保留一个
+    assert len(store.users) == len(server.synthetic.users)
+    assert replayer.new_users == len(server.synthetic.users)
+
+
+def test_replay_runs_each_variation(tmp_path):
+    server = FakeGmgnServer(page_size=10, overlap=0, pages_per_query=3).start()
+    try:
+        store = JournalStore(tmp_path / 'users.json', history=False, handle_index=False)
+        store.load()
+        template = ApiTemplate(f"http://gmgn.invalid{API_PATH}?q=bench")
+        replayer = ApiReplayer(template, store.merge, page_delay=0, base_url=server.url)
+        asyncio.run(replayer.run([{'q': 'binance'}, {'q': 'solana'}]))
+    finally:
+        server.stop()
+
+    assert server.requests == 6
+    assert len(store.users) == 60
+
+
+def test_template_rejects_repeated_query_params():
+    template = ApiTemplate(f"http://gmgn.invalid{API_PATH}?q=bench&chain=sol&chain=eth")
+    with pytest.raises(ValueError, match='chain'):
+        template.params
+    assert ApiTemplate(f"http://gmgn.invalid{API_PATH}?q=bench&cursor=").params == {'q': 'bench', 'cursor': ''}
@@ -0,0 +1,139 @@
+"""
+binary_snapshot 测试：写出后映射读取与 JSON 一致，与 JSON 快照不一致时判为过期，覆盖层合并顺序
+运行: python -m pytest test_binary_snapshot.py
+"""
+import os
+from binary_snapshot import BinarySnapshotWriter, MappedSnapshot, MappedUserTable, binary_path_for
+from json_stream import write_snapshot
+from user_table import UserTable
+
+
+def _user(user_id, followers, tags=('kol',), handle=None):
+    return {'handle': handle or f'h{user_id}', 'user_id': user_id, 'user_tags': list(tags),
+            'platform': 0, 'followers': followers, 'followed': False}
+
+
+USERS = [
+    _user('300', 90),
+    _user('20', 80, ('founder', 'kol')),  # 标签顺序与 ID 顺序不同
+    _user('abc', 70, (), handle='é名'),
+    _user('0012', 60),  # 不能当作整数 12
+    {'handle': None, 'user_id': '5', 'user_tags': [], 'followers': 1, 'extra': 'raw'},  # 整条存为 JSON
+]
+
+
+def _write(tmp_path, users=USERS):
+    snapshot = tmp_path / 'users.json'
+    write_snapshot(snapshot, users, len(users))
+    writer = BinarySnapshotWriter(binary_path_for(snapshot))
+    for user in users:
+        writer.write(user)
+    assert writer.close(snapshot)
+    return snapshot
+
+
+def test_mapped_rows_and_lookup_match_json(tmp_path):
+    snapshot = _write(tmp_path)
+    base = MappedSnapshot.open(binary_path_for(snapshot), snapshot)
+    assert base is not None
+    assert len(base) == len(USERS)
+    assert [base.row_user(row) for row in range(len(base))] == USERS
+    for row, user in enumerate(USERS):
+        assert base.find(user['user_id']) == row
+    assert base.find('12') is None
+    assert base.find('missing') is None
+    assert base.followers(0) == 90
+
+
+def test_stale_or_corrupt_snapshot_is_rejected(tmp_path):
+    snapshot = _write(tmp_path)
+    binary_file = binary_path_for(snapshot)
+
+    stat = snapshot.stat()
+    os.utime(snapshot, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert MappedSnapshot.open(binary_file, snapshot) is None
+
+    snapshot = _write(tmp_path)
+    with open(binary_file, 'r+b') as f:
+        f.write(b'NOTMAGIC')
+    assert MappedSnapshot.open(binary_file, snapshot) is None
+
+    binary_file.write_bytes(b'short')
+    assert MappedSnapshot.open(binary_file, snapshot) is None
+
+
+def test_overlay_matches_plain_table(tmp_path):
+    snapshot = _write(tmp_path)
+    mapped = MappedUserTable(MappedSnapshot.open(binary_path_for(snapshot), snapshot))
+    plain = UserTable()
+    for user in USERS:
+        plain[user['user_id']] = user
+
+    changes = [_user('20', 10, ('vc',)), _user('new', 100), _user('abc', 75), _user('new', 101)]
+    for user in changes:
+        mapped[user['user_id']] = user
+        plain[user['user_id']] = user
+
+    assert len(mapped) == len(plain) == len(USERS) + 1
+    assert list(mapped.items()) == list(plain.items())
+    assert [mapped.row_of(user_id) for user_id in plain] == [plain.row_of(user_id) for user_id in plain]
+    assert list(mapped.sorted_users()) == list(plain.sorted_users())
+    assert mapped['20'] == _user('20', 10, ('vc',))
+    assert '0012' in mapped and '12' not in mapped
+
+    # 拷贝后继续修改，拷贝不受影响
+    copy = mapped.snapshot()
+    mapped['300'] = _user('300', 0)
+    assert list(copy.values()) == list(plain.values())
+
+
+def _rewrite(snapshot, table):
+    """与 JournalStore 压缩一样按粉丝数排序写出 JSON 和二进制快照，返回新的映射"""
+    users = list(table.sorted_users())
+    write_snapshot(snapshot, users, len(users))
+    writer = BinarySnapshotWriter(binary_path_for(snapshot))
+    for user in users:
+        writer.write(user)
+    assert writer.close(snapshot)
+    return MappedSnapshot.open(binary_path_for(snapshot), snapshot)
+
+
+def test_rebase_drops_overlay_users_written_to_new_snapshot(tmp_path):
+    snapshot = _write(tmp_path)
+    mapped = MappedUserTable(MappedSnapshot.open(binary_path_for(snapshot), snapshot))
+    for user in (_user('20', 10, ('vc',)), _user('new', 100), _user('abc', 75)):
+        mapped[user['user_id']] = user
+
+    written = mapped.snapshot()  # 压缩时拷贝的表
+    mapped['300'] = _user('300', 5)  # 写快照期间的更新
+    mapped['later'] = _user('later', 1)  # 写快照期间的新用户
+    expected = dict(mapped.items())
+
+    mapped.rebase(_rewrite(snapshot, written))
+    assert len(mapped.overlay) == 2
+    assert set(mapped.replaced) == {mapped.base.find('300')}
+    assert len(mapped) == len(USERS) + 2
+    assert dict(mapped.items()) == expected
+    assert mapped['later'] == _user('later', 1) and mapped.row_of('later') == len(mapped) - 1
+
+    # 与重新启动后加载新快照、再回放写快照期间的变化得到的表一致
+    reloaded = MappedUserTable(MappedSnapshot.open(binary_path_for(snapshot), snapshot))
+    reloaded['300'] = _user('300', 5)
+    reloaded['later'] = _user('later', 1)
+    assert list(mapped.items()) == list(reloaded.items())
+    assert [mapped.row_of(user_id) for user_id in expected] == [reloaded.row_of(user_id) for user_id in expected]
+
+
+def test_oversized_heap_is_not_written(tmp_path, monkeypatch):
+    import binary_snapshot
+    snapshot = tmp_path / 'users.json'
+    write_snapshot(snapshot, USERS, len(USERS))
+    monkeypatch.setattr(binary_snapshot, 'HEAP_LIMIT', 40)
+
+    writer = BinarySnapshotWriter(binary_path_for(snapshot))
+    for user in USERS:
+        writer.write(user)  # 超出范围时不抛出，与 JSON 快照的写入互不影响
+    assert writer.overflow
+    assert not writer.close(snapshot)
+    assert not binary_path_for(snapshot).exists()
+    assert MappedSnapshot.open(binary_path_for(snapshot), snapshot) is None
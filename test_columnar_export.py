@@ -0,0 +1,122 @@
+"""
+columnar_export 测试：用户和 KOL 数据导出 CSV 后按列类型读回（类型转换、标签列拼接），
+没有安装 pyarrow 时导出 Parquet / Arrow 给出明确的错误
+运行: python -m pytest test_columnar_export.py
+"""
+import csv
+import json
+
+import pytest
+
+import columnar_export
+from benchmark import SyntheticUsers
+from columnar_export import CSV_TAG_SEPARATOR, KOL_COLUMNS, USER_COLUMNS, detect_dataset, export_columnar
+
+
+def _write(path, data):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
+
+def _read_csv(path):
+    with open(path, encoding='utf-8', newline='') as f:
+        return list(csv.DictReader(f))
+
+
+def _kols():
+    return [
+        {'wallet_address': 'So1aNa111', 'name': '链上大户', 'telegram': None, 'twitter': 'whale_1',
+         'profit': '1234.5', 'wins': '7', 'losses': 3, 'timeframe': 30, 'extra': 'ignored'},
+        {'wallet_address': 'So1aNa222', 'name': 'degen, "quoted"', 'telegram': 't.me/degen', 'twitter': None,
+         'profit': -2, 'wins': 0, 'losses': 12.0, 'timeframe': '7'},
+    ]
+
+
+def test_users_csv_round_trip(tmp_path):
+    source = tmp_path / 'users.json'
+    users = SyntheticUsers(page_size=25, overlap=0, seed=4).page()
+    users[0]['user_tags'] = ['kol', 'founder']
+    users[1]['user_tags'] = []
+    users[2]['user_tags'] = None
+    users[3]['followers'] = '42'
+    users[4]['handle'] = '币安_官方'
+    _write(source, {'total_users': len(users), 'last_updated': 'N/A', 'users': users})
+
+    assert detect_dataset(source) == 'users'
+    output, rows = export_columnar(source, file_format='csv')
+    assert output == tmp_path / 'users.csv'
+    assert rows == len(users)
+    assert not (tmp_path / 'users.csv.tmp').exists()
+
+    records = _read_csv(output)
+    assert list(records[0]) == [name for name, _ in USER_COLUMNS]
+    for user, record in zip(users, records):
+        assert record['user_id'] == str(user['user_id'])
+        assert record['handle'] == str(user['handle'])
+        assert record['followers'] == str(int(user['followers']))
+        assert record['platform'] == str(int(user['platform']))
+        tags = user['user_tags']
+        assert record['user_tags'] == ('' if tags is None else CSV_TAG_SEPARATOR.join(tags))
+    assert records[0]['user_tags'] == 'kol|founder'
+    assert records[3]['followers'] == '42'
+
+
+def test_kol_csv_round_trip(tmp_path):
+    source = tmp_path / 'kol.json'
+    _write(source, {'code': 0, 'data': _kols()})
+
+    assert detect_dataset(source) == 'kol'
+    output, rows = export_columnar(source, tmp_path / 'out.csv', 'csv')
+    assert rows == 2
+    records = _read_csv(output)
+    assert list(records[0]) == [name for name, _ in KOL_COLUMNS]
+    assert records[0] == {'wallet_address': 'So1aNa111', 'name': '链上大户', 'telegram': '', 'twitter': 'whale_1',
+                          'profit': '1234.5', 'wins': '7', 'losses': '3', 'timeframe': '30'}
+    assert records[1] == {'wallet_address': 'So1aNa222', 'name': 'degen, "quoted"', 'telegram': 't.me/degen',
+                          'twitter': '', 'profit': '-2.0', 'wins': '0', 'losses': '12', 'timeframe': '7'}
+
+
+def test_wrong_dataset_is_rejected(tmp_path):
+    source = tmp_path / 'kol.json'
+    _write(source, {'code': 0, 'data': _kols()})
+    with pytest.raises(ValueError, match='users'):
+        export_columnar(source, file_format='csv', dataset='users')
+    assert list(tmp_path.iterdir()) == [source]
+
+    other = tmp_path / 'other.json'
+    _write(other, {'items': []})
+    with pytest.raises(ValueError, match='无法识别'):
+        detect_dataset(other)
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'arrow'])
+def test_arrow_formats_need_pyarrow(tmp_path, monkeypatch, file_format):
+    source = tmp_path / 'users.json'
+    _write(source, {'total_users': 0, 'last_updated': 'N/A', 'users': []})
+    monkeypatch.setattr(columnar_export, 'pa', None)
+
+    with pytest.raises(RuntimeError, match='pip install pyarrow'):
+        export_columnar(source, file_format=file_format)
+    assert list(tmp_path.iterdir()) == [source]
+    # 不指定格式时退回 CSV
+    assert export_columnar(source)[0].suffix == '.csv'
+
+
+@pytest.mark.parametrize('file_format', ['parquet', 'arrow'])
+def test_arrow_formats_round_trip(tmp_path, file_format):
+    pa = pytest.importorskip('pyarrow')
+    source = tmp_path / 'users.json'
+    users = SyntheticUsers(page_size=30, overlap=0, seed=5).page()
+    _write(source, {'total_users': len(users), 'last_updated': 'N/A', 'users': users})
+
+    output, rows = export_columnar(source, file_format=file_format, chunk_rows=7)
+    assert rows == len(users)
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        table = pq.read_table(output)
+    else:
+        import pyarrow.ipc as pa_ipc
+        table = pa_ipc.open_file(output).read_all()
+    assert table.schema.field('followers').type == pa.int64()
+    assert table.column('user_id').to_pylist() == [user['user_id'] for user in users]
+    assert table.column('user_tags').to_pylist() == [user['user_tags'] for user in users]
@@ -0,0 +1,122 @@
+"""
+crawler_metrics 测试：计数器和阶段耗时的汇总、一行摘要的增量，以及 Prometheus 文本格式和 HTTP 端点
+运行: python -m pytest test_crawler_metrics.py
+"""
+import re
+import urllib.error
+import urllib.request
+
+import pytest
+
+from crawler_metrics import BUCKETS, COUNTERS, STAGES, CrawlerMetrics, Histogram
+
+
+def test_histogram_buckets_and_percentiles():
+    histogram = Histogram()
+    assert histogram.percentile(50) is None
+    for seconds in (0.0001, 0.0003, 0.002, 0.002, 20.0):
+        histogram.observe(seconds)
+    assert histogram.count == 5
+    assert histogram.sum == pytest.approx(20.0044)
+    assert histogram.counts[BUCKETS.index(0.0001)] == 1  # 等于上界的样本落在该桶
+    assert histogram.counts[-1] == 1
+    assert histogram.percentile(20) == 0.0001
+    assert histogram.percentile(50) == 0.0025
+    assert histogram.percentile(100) == float('inf')
+
+
+def test_counters_and_timers_aggregate():
+    metrics = CrawlerMetrics()
+    metrics.inc('responses_matched')
+    metrics.inc('responses_matched', 2)
+    metrics.inc('bytes_written', 1024)
+    with metrics.time('merge'):
+        pass
+    metrics.observe('merge', 0.01)
+    assert metrics.counters['responses_matched'] == 3
+    assert metrics.counters['bytes_written'] == 1024
+    assert metrics.histograms['merge'].count == 2
+    with pytest.raises(KeyError):
+        metrics.inc('no_such_counter')
+
+
+def test_summary_line_reports_deltas():
+    metrics = CrawlerMetrics()
+    assert metrics.summary_line(0) is None  # 没有新的响应
+
+    metrics.inc('responses_matched', 3)
+    metrics.inc('responses_parsed', 3)
+    metrics.inc('users_new', 40)
+    metrics.inc('cache_hits')
+    metrics.observe('parse', 0.002)
+    line = metrics.summary_line(40)
+    assert '请求 3 (+3)' in line
+    assert '用户 40 (+40 新, 0 更新)' in line
+    assert '解析 p50 ≤2.5ms' in line
+    assert '合并 p50 -' in line
+    assert '重复 +1' in line
+
+    metrics.inc('responses_matched')
+    metrics.inc('responses_parsed')
+    metrics.inc('users_updated', 2)
+    line = metrics.summary_line(40)
+    assert '请求 4 (+1)' in line
+    assert '(+0 新, 2 更新)' in line
+    assert '重复' not in line
+    assert metrics.summary_line(40) is None
+
+
+def _parse_prometheus(text):
+    """把文本格式解析成 {指标名{标签}: 数值}，并检查每个指标都有 HELP / TYPE"""
+    samples = {}
+    declared = set()
+    for line in text.splitlines():
+        if line.startswith('# HELP ') or line.startswith('# TYPE '):
+            declared.add(line.split()[2])
+            continue
+        name, value = line.rsplit(' ', 1)
+        base = re.match(r'[a-zA-Z_:][a-zA-Z0-9_:]*', name).group(0)
+        assert re.sub(r'_(bucket|sum|count)$', '', base) in declared
+        samples[name] = float(value)
+    return samples
+
+
+def test_render_prometheus_text():
+    metrics = CrawlerMetrics()
+    metrics.inc('errors', 2)
+    metrics.observe('parse', 0.003)
+    metrics.observe('parse', 30.0)
+    metrics.gauge('users', '去重后的用户数', lambda: 123)
+    text = metrics.render()
+    assert text.endswith('\n')
+    assert '# TYPE gmgn_errors_total counter' in text
+    assert '# TYPE gmgn_stage_seconds histogram' in text
+    assert '# TYPE gmgn_users gauge' in text
+
+    samples = _parse_prometheus(text)
+    assert samples['gmgn_errors_total'] == 2
+    assert all(f'gmgn_{name}_total' in samples for name in COUNTERS)
+    assert samples['gmgn_stage_seconds_bucket{stage="parse",le="0.0025"}'] == 0
+    assert samples['gmgn_stage_seconds_bucket{stage="parse",le="0.005"}'] == 1
+    assert samples['gmgn_stage_seconds_bucket{stage="parse",le="+Inf"}'] == 2
+    assert samples['gmgn_stage_seconds_count{stage="parse"}'] == 2
+    assert samples['gmgn_stage_seconds_sum{stage="parse"}'] == pytest.approx(30.003)
+    assert all(f'gmgn_stage_seconds_count{{stage="{stage}"}}' in samples for stage in STAGES)
+    assert samples['gmgn_users'] == 123
+
+
+def test_serve_metrics_endpoint():
+    metrics = CrawlerMetrics()
+    metrics.inc('responses_parsed', 5)
+    url = metrics.serve(0)
+    try:
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            body = response.read().decode('utf-8')
+        assert 'gmgn_responses_parsed_total 5' in body
+        with pytest.raises(urllib.error.HTTPError) as error:
+            urllib.request.urlopen(url.replace('/metrics', '/other'), timeout=5)
+        assert error.value.code == 404
+    finally:
+        metrics.stop()
+    assert metrics.server is None
@@ -0,0 +1,102 @@
+"""
+flush_writer 测试：按待写用户数或时间间隔刷盘、close() 写入剩余数据且可重复调用、与 close() 并发的合并不丢用户
+运行: python -m pytest test_flush_writer.py
+"""
+import threading
+import time
+from benchmark import SyntheticUsers
+from flush_writer import FlushWriter
+from journal_store import JournalStore, read_journal
+
+
+def _open(path):
+    store = JournalStore(path, history=False, handle_index=False, compact_every=1000)
+    store.load()
+    return store
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, '等待刷盘超时'
+        time.sleep(0.01)
+
+
+def _journaled_ids(store):
+    if not store.journal_file.exists():
+        return []
+    entries, _ = read_journal(store.journal_file)
+    return [user['user_id'] for entry in entries for user in entry['users']]
+
+
+def test_flushes_when_pending_users_reach_threshold(tmp_path):
+    store = _open(tmp_path / 'users.json')
+    writer = FlushWriter(store, flush_interval=60, max_pending_users=10)
+    writer.start()
+    synthetic = SyntheticUsers(page_size=5, overlap=0)
+
+    writer.merge(synthetic.page())
+    time.sleep(0.1)
+    assert writer.flush_count == 0  # 未到阈值，也未到时间间隔
+
+    writer.merge(synthetic.page())
+    _wait_for(lambda: writer.flush_count == 1)
+    assert len(_journaled_ids(store)) == 10
+    writer.close()
+
+
+def test_flushes_after_interval(tmp_path):
+    store = _open(tmp_path / 'users.json')
+    writer = FlushWriter(store, flush_interval=0.05, max_pending_users=1000)
+    writer.start()
+    page = SyntheticUsers(page_size=3, overlap=0).page()
+
+    assert writer.merge(page) == 3
+    _wait_for(lambda: writer.flush_count >= 1)
+    assert _journaled_ids(store) == [user['user_id'] for user in page]
+    writer.close()
+
+
+def test_close_writes_pending_users_once(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    store = _open(snapshot)
+    writer = FlushWriter(store, flush_interval=60, max_pending_users=1000)
+    writer.start()
+    page = SyntheticUsers(page_size=8, overlap=0).page()
+    writer.merge(page)
+
+    writer.close()
+    assert writer.flush_count == 1
+    assert writer.pending == []
+    assert store.journal_files() == []  # 已合并进快照
+    assert {user['user_id'] for user in _open(snapshot).users.values()} == {user['user_id'] for user in page}
+
+    writer.close()
+    assert writer.flush_count == 1
+
+
+def test_merge_racing_with_close_loses_nothing(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    store = _open(snapshot)
+    writer = FlushWriter(store, flush_interval=0.01, max_pending_users=20)
+    writer.start()
+    synthetic = SyntheticUsers(page_size=10, overlap=0)
+    pages = [synthetic.page() for _ in range(200)]
+    started = threading.Barrier(5)
+
+    def producer(chunk):
+        started.wait()
+        for page in chunk:
+            writer.merge(page)
+
+    threads = [threading.Thread(target=producer, args=(pages[i::4],)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    started.wait()
+    time.sleep(0.005)
+    writer.close()
+    for thread in threads:
+        thread.join()
+
+    expected = {user['user_id'] for page in pages for user in page}
+    assert {user['user_id'] for user in _open(snapshot).users.values()} == expected
@@ -0,0 +1,65 @@
+"""
+follower_history 测试：varint / 差值编码往返、跨进程追加、写了一半的批次被忽略和截掉
+运行: python -m pytest test_follower_history.py
+"""
+from follower_history import FollowerHistory, iter_points, load_series
+from journal_store import JournalStore
+
+
+def test_round_trip_with_deltas_and_string_ids(tmp_path):
+    path = tmp_path / 'users.json.history'
+    history = FollowerHistory(path)
+    points = [
+        (1_700_000_000, '123', 1000),
+        (1_700_000_005, 'abc', 7),
+        (1_700_000_010, '123', 990),  # 下降，写差值
+        (1_700_000_020, '0012', 2 ** 40),  # 不是规范的整数 ID
+        (1_700_000_030, '123', 5_000_000),
+    ]
+    for timestamp, user_id, followers in points[:2]:
+        history.record(user_id, followers, timestamp)
+    history.record('skip', None, 1_700_000_000)  # 粉丝数不是整数时不记录
+    history.flush()
+    for timestamp, user_id, followers in points[2:]:
+        history.record(user_id, followers, timestamp)
+    history.flush()
+
+    assert list(iter_points(path)) == points
+    assert history.written == len(points)
+
+    # 另一个进程继续追加：第一个点写绝对值，读取时仍能正确还原
+    later = FollowerHistory(path)
+    later.record('123', 4_000_000, 1_700_000_040)
+    later.flush()
+    assert load_series(path, ['123'])['123'] == [
+        (1_700_000_000, 1000), (1_700_000_010, 990), (1_700_000_030, 5_000_000), (1_700_000_040, 4_000_000)]
+
+
+def test_partial_batch_is_ignored_and_truncated(tmp_path):
+    path = tmp_path / 'users.json.history'
+    history = FollowerHistory(path)
+    history.record('1', 10, 100)
+    history.flush()
+    size = path.stat().st_size
+    with open(path, 'ab') as f:
+        f.write(b'\x40\x01\x02')  # 批次长度为 64，但只写了 2 字节
+
+    assert list(iter_points(path)) == [(100, '1', 10)]
+    later = FollowerHistory(path)
+    later.record('1', 12, 200)
+    later.flush()
+    assert list(iter_points(path)) == [(100, '1', 10), (200, '1', 12)]
+    assert path.stat().st_size > size
+
+
+def test_store_records_only_new_users_and_follower_changes(tmp_path):
+    store = JournalStore(tmp_path / 'users.json', handle_index=False)
+    store.load()
+    user = {'handle': 'a', 'user_id': '1', 'user_tags': [], 'platform': 0, 'followers': 10, 'followed': False}
+    store.merge([user])
+    store.merge([dict(user)])  # 没有变化
+    store.merge([{**user, 'handle': 'b'}])  # 粉丝数没变
+    store.merge([{**user, 'followers': 15}])
+    store.close()
+
+    assert [followers for _, followers in load_series(store.history.path)['1']] == [10, 15]
@@ -0,0 +1,87 @@
+"""
+handle_search 测试：三元组索引的搜索结果与逐个比较的暴力搜索一致，日志尾部和改名在重建前就能搜到
+运行: python -m pytest test_handle_search.py
+"""
+import random
+from handle_search import HandleIndex, HandleLog, edit_distance, handles_path_for, trigram_keys
+from journal_store import JournalStore
+
+
+def _brute_force(handles, query, limit, min_similarity):
+    query_keys = trigram_keys(query)
+    results = []
+    for user_id, handle in handles.items():
+        keys = trigram_keys(handle)
+        similarity = len(query_keys & keys) / len(query_keys | keys)
+        if similarity >= min_similarity:
+            results.append((-round(similarity, 3), edit_distance(query.lower(), handle.lower()), handle.lower(), user_id))
+    results.sort()
+    return [(user_id, -similarity) for similarity, _, _, user_id in results[:limit]]
+
+
+def _random_handles(count, seed=0):
+    rng = random.Random(seed)
+    words = ['binance', 'heyi', 'cz', 'sol', 'whale', 'alpha', 'degen', 'ape', 'moon', 'gm']
+    handles = {}
+    for i in range(count):
+        parts = rng.sample(words, rng.randint(1, 3))
+        handle = rng.choice(['_', '', '.']).join(parts) + (str(rng.randint(0, 99)) if rng.random() < 0.3 else '')
+        if handle not in handles.values():  # handle 不重复，结果顺序唯一
+            handles[str(1000 + i)] = handle
+    return handles
+
+
+def test_search_matches_brute_force(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    handles = _random_handles(400)
+    log = HandleLog(handles_path_for(snapshot))
+    for user_id, handle in handles.items():
+        log.record(user_id, handle)
+    log.flush()
+
+    index = HandleIndex.open(snapshot)
+    assert len(index) == len(handles) > 100
+    for query in ('heyibinance', 'cz_binanse', 'whale_alpha', 'degenape', 'gm'):
+        for min_similarity in (0.3, 0.5):
+            results = index.search(query, limit=10, min_similarity=min_similarity)
+            got = [(result['user_id'], result['similarity']) for result in results]
+            assert got == _brute_force(handles, query, 10, min_similarity), (query, min_similarity)
+
+
+def test_store_log_tail_and_renames_are_searchable(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    store = JournalStore(snapshot, history=False)
+    store.load()
+    store.merge([{'handle': 'heyi_binance', 'user_id': '1', 'user_tags': [], 'platform': 0, 'followers': 1,
+                  'followed': False}])
+    assert HandleIndex.open(snapshot).search('heyibinance')[0]['user_id'] == '1'
+
+    # 索引生成之后的新用户和改名记在日志尾部，不需要重建
+    store.merge([{'handle': 'cz_binance', 'user_id': '2', 'user_tags': [], 'platform': 0, 'followers': 1,
+                  'followed': False},
+                 {'handle': 'solana_whale', 'user_id': '1', 'user_tags': [], 'platform': 0, 'followers': 1,
+                  'followed': False}])
+    index = HandleIndex.open(snapshot)
+    assert [result['user_id'] for result in index.search('czbinance')][:1] == ['2']
+    assert all(result['user_id'] != '1' for result in index.search('heyibinance', min_similarity=0.5))
+    assert index.search('solanawhale')[0] == {'user_id': '1', 'handle': 'solana_whale', 'similarity': 1.0,
+                                              'distance': 1}
+
+
+def test_first_flush_seeds_existing_users(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    store = JournalStore(snapshot, history=False, handle_index=False)
+    store.load()
+    store.merge([{'handle': f'user_{i}', 'user_id': str(i), 'user_tags': [], 'platform': 0, 'followers': i,
+                  'followed': False} for i in range(50)])
+    store.close()
+
+    # 打开了 handle 日志的存储第一次写盘时写入全部已有用户，之后只写新增
+    store = JournalStore(snapshot, history=False)
+    store.load()
+    store.merge([{'handle': 'late', 'user_id': '99', 'user_tags': [], 'platform': 0, 'followers': 0,
+                  'followed': False}])
+    lines = handles_path_for(snapshot).read_text(encoding='utf-8').splitlines()
+    assert len(lines) == 51
+    assert lines[-1] == '99\tlate'
+    assert HandleIndex.open(snapshot).search('user_7', limit=1)[0]['user_id'] == '7'
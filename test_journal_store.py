@@ -0,0 +1,151 @@
+"""
+journal_store 测试：追加写日志、压缩成快照、重新加载时回放日志
+运行: python -m pytest test_journal_store.py
+"""
+import json
+from benchmark import SyntheticUsers
+from journal_store import JournalStore, read_journal
+
+
+def _open(path, **kwargs):
+    store = JournalStore(path, history=False, handle_index=False, **kwargs)
+    store.load()
+    return store
+
+
+def _expected(pages):
+    """按 user_id 去重，后出现的覆盖先出现的"""
+    users = {}
+    for page in pages:
+        for user in page:
+            users[user['user_id']] = user
+    return users
+
+
+def test_reload_replays_uncompacted_journal(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    synthetic = SyntheticUsers(page_size=20, overlap=0.5)
+    pages = [synthetic.page() for _ in range(5)]
+
+    store = _open(snapshot, compact_every=1000)
+    new_users = sum(store.merge(page) for page in pages)
+    assert not snapshot.exists()  # 还没有压缩，只写了日志
+    assert store.journal_files() == [store.journal_file]
+
+    reloaded = _open(snapshot)
+    expected = _expected(pages)
+    assert new_users == len(expected)
+    assert dict(reloaded.users.items()) == expected
+
+
+def test_compaction_writes_sorted_snapshot_and_removes_segments(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    synthetic = SyntheticUsers(page_size=20, overlap=0.3)
+    pages = [synthetic.page() for _ in range(6)]
+
+    store = _open(snapshot, compact_every=1000)
+    for page in pages[:4]:
+        store.merge(page)
+    store.compact()
+    for page in pages[4:]:
+        store.merge(page)
+    store.close()
+
+    assert store.journal_files() == []
+    with open(snapshot, encoding='utf-8') as f:
+        data = json.load(f)
+    expected = _expected(pages)
+    assert data['total_users'] == len(expected)
+    assert {user['user_id']: user for user in data['users']} == expected
+    followers = [user['followers'] for user in data['users']]
+    assert followers == sorted(followers, reverse=True)
+
+    # 重新打开时映射二进制快照，内容与 JSON 一致
+    reloaded = _open(snapshot)
+    assert type(reloaded.users).__name__ == 'MappedUserTable'
+    assert dict(reloaded.users.items()) == expected
+
+
+def test_unchanged_duplicates_are_not_journaled(tmp_path):
+    store = _open(tmp_path / 'users.json', compact_every=1000)
+    page = SyntheticUsers(page_size=10, overlap=0).page()
+    assert store.merge(page) == 10
+    assert store.merge([dict(user) for user in page]) == 0
+
+    entries, _ = read_journal(store.journal_file)
+    assert len(entries) == 1
+    assert [user['user_id'] for user in entries[0]['users']] == [user['user_id'] for user in page]
+
+
+def test_truncated_last_line_is_ignored(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    store = _open(snapshot, compact_every=1000)
+    page = SyntheticUsers(page_size=5, overlap=0).page()
+    store.merge(page)
+    with open(store.journal_file, 'ab') as f:
+        f.write(b'{"ts": "2026-01-01", "users": [{"user_id": "tr')  # 写到一半被中断
+
+    entries, offset = read_journal(store.journal_file)
+    assert len(entries) == 1
+    assert offset < store.journal_file.stat().st_size
+    assert dict(_open(snapshot).users.items()) == {user['user_id']: user for user in page}
+
+
+def test_compaction_rebases_mapped_table(tmp_path):
+    from binary_snapshot import MappedUserTable
+    from user_stats import LiveStats, UserStats
+
+    snapshot = tmp_path / 'users.json'
+    synthetic = SyntheticUsers(page_size=30, overlap=0.4, seed=8)
+    pages = [synthetic.page() for _ in range(6)]
+    store = _open(snapshot, compact_every=1000)
+    store.merge(pages[0])
+    store.close()
+
+    store = _open(snapshot, compact_every=1000)
+    assert isinstance(store.users, MappedUserTable)
+    users = store.users
+    live = LiveStats.attach(store)
+    for page in pages[1:4]:
+        store.merge(page)
+    assert len(users.overlay) > 0
+    store.compact()
+    # 写进新快照的用户不再留在覆盖层，仍是同一个表对象（爬虫和实时统计都引用它）
+    assert store.users is users
+    assert len(users.overlay) == 0
+    assert len(users.base) == len(users)
+    assert dict(users.items()) == _expected(pages[:4])
+    # 缓冲区中的排序键按新行号重算，粉丝数相同的用户仍按快照顺序排名
+    for buffer in (live.top, *live.tag_top.values()):
+        for user_id, key in buffer.entries.items():
+            assert key == (users[user_id]['followers'], -users.row_of(user_id))
+
+    for page in pages[4:]:
+        store.merge(page)
+    assert dict(users.items()) == _expected(pages)
+    report = live.report()
+    expected = UserStats().add_all(users.values()).report()
+    assert report['total_users'] == expected['total_users']
+    assert report['top_users'] == expected['top_users']
+    assert dict(report['tag_counts']) == dict(expected['tag_counts'])
+    ranked = sorted(users.values(), key=lambda user: user['followers'], reverse=True)
+    for tag, _, top in report['tag_top_users']:
+        assert top == [user for user in ranked if tag in user['user_tags']][:3]
+
+    store.close()
+    assert dict(_open(snapshot).users.items()) == _expected(pages)
+
+
+def test_oversized_binary_heap_keeps_json_snapshot(tmp_path, monkeypatch):
+    import binary_snapshot
+    snapshot = tmp_path / 'users.json'
+    page = SyntheticUsers(page_size=20, overlap=0).page()
+    monkeypatch.setattr(binary_snapshot, 'HEAP_LIMIT', 100)
+    store = _open(snapshot, compact_every=1000)
+    store.merge(page)
+    store.close()
+
+    assert snapshot.exists() and not store.binary_file.exists()
+    reloaded = _open(snapshot)
+    assert type(reloaded.users).__name__ == 'UserTable'
+    assert dict(reloaded.users.items()) == {user['user_id']: user for user in page}
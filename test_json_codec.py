@@ -0,0 +1,74 @@
+"""
+json_codec 测试：orjson 和标准库两种后端的输出一致，orjson 不支持的输入改用标准库，
+dumps_indent 的输出与原 save_data（json.dump(..., ensure_ascii=False, indent=2)）逐字节相同
+运行: python -m pytest test_json_codec.py
+"""
+import asyncio
+import json
+import math
+
+import pytest
+
+import json_codec
+from benchmark import SyntheticUsers
+
+BACKENDS = ['json'] + (['orjson'] if json_codec.orjson is not None else [])
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    if request.param == 'json':
+        monkeypatch.setattr(json_codec, 'orjson', None)
+    return request.param
+
+
+def _snapshot():
+    users = SyntheticUsers(page_size=20, overlap=0, seed=11).page()
+    users[0]['name'] = '币安 🚀 "quoted" \\ back\nslash'
+    users[1]['bio'] = None
+    users[2]['ratio'] = 0.125
+    return {'total_users': len(users), 'last_updated': '2026-01-01T00:00:00', 'users': users}
+
+
+def test_dumps_matches_stdlib(backend):
+    data = _snapshot()
+    assert json_codec.dumps(data) == json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    assert json_codec.dumps_bytes(data) == json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def test_dumps_indent_matches_old_save_data(backend, tmp_path):
+    data = _snapshot()
+    old_file = tmp_path / 'old.json'
+    with open(old_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)  # 原 save_data 的写法
+    assert json_codec.dumps_indent(data).encode('utf-8') == old_file.read_bytes()
+
+
+def test_loads_accepts_bytes_and_str(backend):
+    data = _snapshot()
+    text = json.dumps(data, ensure_ascii=False)
+    assert json_codec.loads(text) == data
+    assert json_codec.loads(text.encode('utf-8')) == data
+    assert asyncio.run(json_codec.loads_async(text.encode('utf-8'), threshold=0)) == data
+    assert asyncio.run(json_codec.loads_async(text.encode('utf-8'))) == data
+
+
+def test_fallback_for_inputs_orjson_rejects(backend):
+    big = 2 ** 70
+    assert json_codec.loads(b'{"n": 123456789012345678901234567890}') == {'n': 123456789012345678901234567890}
+    value = json_codec.loads(b'[NaN, Infinity, -Infinity]')
+    assert math.isnan(value[0]) and value[1:] == [math.inf, -math.inf]
+
+    assert json_codec.loads(f'[{big}, -{2 ** 63 + 1}]') == [big, -(2 ** 63 + 1)]
+    assert json_codec.loads(str(big)) == big
+
+    assert json_codec.dumps({'n': big}) == '{"n":%d}' % big
+    assert json_codec.dumps({1: 'a', 2: 'b'}) == '{"1":"a","2":"b"}'
+    assert json_codec.dumps_indent({1: [big]}) == json.dumps({1: [big]}, ensure_ascii=False, indent=2)
+
+
+def test_invalid_json_raises_decode_error(backend):
+    with pytest.raises(json_codec.JSONDecodeError):
+        json_codec.loads(b'{"users": [')
+    with pytest.raises(ValueError):
+        json_codec.loads('not json')
@@ -0,0 +1,62 @@
+"""
+json_stream 测试：很小的读取块（块边界落在多字节字符、转义序列和数字中间）时逐条读取的结果与 json.load 一致
+运行: python -m pytest test_json_stream.py
+"""
+import json
+
+import pytest
+
+from benchmark import SyntheticUsers
+from json_stream import SnapshotReader, iter_users, write_snapshot
+
+
+def _users():
+    users = SyntheticUsers(page_size=40, overlap=0, seed=9).page()
+    users[0]['handle'] = '币安中文_官方'
+    users[1]['handle'] = 'émoji_🚀🌕_ñ'
+    users[2]['name'] = 'quote " backslash \\ slash / tab \t newline \n'
+    users[3]['name'] = '\u0000\u001f  escaped controls'
+    users[4]['bio'] = None
+    users[5]['followers'] = 12345678901234567890
+    users[6]['score'] = -1.5e-7
+    users[7]['user_tags'] = []
+    return users
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 13])
+@pytest.mark.parametrize('ensure_ascii', [False, True])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_tiny_chunks_match_json_load(tmp_path, chunk_size, ensure_ascii, indent):
+    path = tmp_path / 'users.json'
+    data = {'total_users': 40, 'last_updated': '2026-01-01T00:00:00', 'users': _users(), 'note': '尾部字段'}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=ensure_ascii, indent=indent)
+    with open(path, encoding='utf-8') as f:
+        expected = json.load(f)
+
+    reader = SnapshotReader(path, chunk_size=chunk_size)
+    assert list(reader) == expected['users']
+    assert reader.found
+    assert reader.meta == {'total_users': 40, 'last_updated': '2026-01-01T00:00:00', 'note': '尾部字段'}
+
+
+def test_written_snapshot_reads_back(tmp_path):
+    path = tmp_path / 'users.json'
+    users = _users()
+    write_snapshot(path, users, len(users))
+    with open(path, encoding='utf-8') as f:
+        assert json.load(f)['users'] == users
+    assert list(iter_users(path)) == users
+    assert list(SnapshotReader(path, chunk_size=7)) == users
+
+
+def test_missing_and_empty_arrays(tmp_path):
+    path = tmp_path / 'users.json'
+    path.write_text('{"total_users": 0, "users": []}', encoding='utf-8')
+    reader = SnapshotReader(path, chunk_size=7)
+    assert list(reader) == [] and reader.found
+
+    path.write_text('{"data": [1, 2]}', encoding='utf-8')
+    reader = SnapshotReader(path, chunk_size=7)
+    assert list(reader) == [] and not reader.found
+    assert reader.meta == {'data': [1, 2]}
@@ -0,0 +1,138 @@
+"""
+page_pool 测试：用假浏览器验证按页面统计捕获、换代理时先开新页面、新建失败时保留原页面
+运行: python -m pytest test_page_pool.py
+"""
+import asyncio
+
+from page_pool import PagePool
+from proxy_pool import ProxyPool
+
+A = 'http://127.0.0.1:7001'
+B = 'http://127.0.0.1:7002'
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+        self.url = 'about:blank'
+
+    async def goto(self, url, **kwargs):
+        self.url = url
+
+
+class FakeContext:
+    def __init__(self, proxy):
+        self.proxy = proxy
+        self.pages = []
+        self.closed = False
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.refuse = set()  # 新建上下文时拒绝的代理
+
+    async def new_context(self, **kwargs):
+        proxy = kwargs.get('proxy', {}).get('server')
+        if proxy in self.refuse:
+            raise ConnectionError(f"代理拒绝连接: {proxy}")
+        return FakeContext(proxy)
+
+
+def make_pool(browser):
+    proxy_pool = ProxyPool([A, B], alpha=1.0)
+    proxy_pool.record(A, True, 50.0)
+    proxy_pool.record(B, True, 80.0)
+    page_pool = PagePool(browser, {}, proxy_pool=proxy_pool)
+    return proxy_pool, page_pool
+
+
+def test_recycle_moves_page_to_another_proxy():
+    async def run():
+        browser = FakeBrowser()
+        proxy_pool, page_pool = make_pool(browser)
+        [page] = await page_pool.open(1)
+        await page.goto('https://gmgn.ai/')
+        proxy_pool.record(A, False)
+
+        assert await page_pool.recycle_unhealthy() == 1
+        [new_page] = page_pool.pages
+        assert page.context.closed
+        assert page_pool.proxy_of(new_page) == B
+        assert page_pool.page_labels[new_page] == '页面1'
+        assert new_page.url == 'https://gmgn.ai/'
+        assert proxy_pool.states[A].in_use == 0
+        assert proxy_pool.states[B].in_use == 1
+        # 冷却期内不再换
+        proxy_pool.record(B, False)
+        proxy_pool.record(A, True, 50.0)
+        assert await page_pool.recycle_unhealthy() == 0
+
+    asyncio.run(run())
+
+
+def test_failed_recycle_keeps_the_old_page():
+    async def run():
+        browser = FakeBrowser()
+        proxy_pool, page_pool = make_pool(browser)
+        [page] = await page_pool.open(1)
+        proxy_pool.record(A, False)
+        browser.refuse.add(B)
+
+        # 新代理拒绝连接：不抛出，原页面和代理都保留
+        assert await page_pool.recycle_unhealthy() == 0
+        assert page_pool.pages == [page]
+        assert page_pool.proxy_of(page) == A
+        assert not page.context.closed
+        assert page_pool.contexts == [page.context]
+        assert proxy_pool.states[B].in_use == 0
+        assert page_pool.recycle_count == 0
+
+        # 下一轮新代理恢复后照常更换
+        browser.refuse.clear()
+        assert await page_pool.recycle_unhealthy() == 1
+        assert page_pool.proxy_of(page_pool.pages[0]) == B
+        assert page.context.closed
+
+    asyncio.run(run())
+
+
+def test_record_attributes_captures_to_each_page():
+    async def run():
+        browser = FakeBrowser()
+        page_pool = PagePool(browser, {})
+        pages = await page_pool.open(3)
+        assert len(page_pool.contexts) == 1  # 不使用代理时共用一个上下文
+
+        page_pool.record(pages[0], 20, 5)
+        page_pool.record(pages[0], 20, 0)
+        page_pool.record(pages[2], 10, 10)
+        page_pool.record(FakePage(None), 99, 99)  # 不属于页面池的页面不计入
+
+        assert page_pool.stats == {
+            '页面1': {'captures': 2, 'users': 40, 'new_users': 5},
+            '页面2': {},
+            '页面3': {'captures': 1, 'users': 10, 'new_users': 10},
+        }
+        assert page_pool.label(pages[1]) == '页面2'
+
+    asyncio.run(run())
+
+
+def test_proxy_list_opens_one_context_per_proxy():
+    async def run():
+        page_pool = PagePool(FakeBrowser(), {'viewport': None})
+        pages = await page_pool.open(1, [A, B])
+        assert [page.context.proxy for page in pages] == [A, B]
+        assert page_pool.label(pages[1]) == f'页面2 ({B})'
+        page_pool.record(pages[1], 3, 1)
+        assert page_pool.stats[f'页面2 ({B})']['users'] == 3
+
+    asyncio.run(run())
@@ -1,127 +1,166 @@
 """
 代理配置检测工具
-帮助检测代理是否可用，以及是否需要代理
+并发探测直连、常见代理端口和用户指定的代理，测量连接 / 隧道 / TLS / 首字节耗时，
+按访问 gmgn.ai 的速度排序并写入 proxies_ranked.json，爬虫可用 --proxy auto 读取
 """
-import requests
 import sys
+from proxy_probe import (COMMON_PROXIES, CONTROL_URL, DIRECT, PROBE_TIMEOUT, PROBE_WORKERS,
+                         RANKED_PROXY_FILE, TARGET_URL, parse_ports, save_ranking, scan)
 
-def test_direct_connection():
-    """测试直接连接"""
-    print("🔍 测试1: 检查是否可以直接访问 gmgn.ai...")
-    try:
-        response = requests.get('https://gmgn.ai/', timeout=10)
-        if response.status_code == 200:
-            print("✅ 可以直接访问！不需要代理")
-            return True
-    except Exception as e:
-        print(f"❌ 无法直接访问: {e}")
-    return False
 
-def test_proxy(proxy_url):
-    """测试代理是否可用"""
-    print(f"\n🔍 测试2: 检查代理 {proxy_url} 是否可用...")
-    try:
-        proxies = {
-            'http': proxy_url,
-            'https': proxy_url
-        }
-        response = requests.get('https://www.google.com/', proxies=proxies, timeout=10)
-        if response.status_code == 200:
-            print("✅ 代理可用！")
-            return True
-    except Exception as e:
-        print(f"❌ 代理不可用: {e}")
-    return False
+def _fmt(value):
+    return '-' if value is None else f"{value:.0f}"
 
-def test_gmgn_with_proxy(proxy_url):
-    """测试通过代理访问 gmgn.ai"""
-    print(f"\n🔍 测试3: 通过代理访问 gmgn.ai...")
-    try:
-        proxies = {
-            'http': proxy_url,
-            'https': proxy_url
-        }
-        response = requests.get('https://gmgn.ai/', proxies=proxies, timeout=10)
-        if response.status_code == 200:
-            print("✅ 可以通过代理访问 gmgn.ai！")
-            return True
-    except Exception as e:
-        print(f"❌ 无法通过代理访问: {e}")
-    return False
 
-def main():
-    print("=" * 70)
-    print("🔧 GMGN 爬虫代理检测工具")
-    print("=" * 70)
+def print_ranking(results):
+    """打印排名表"""
+    print(f"\n{'#':>3}  {'代理':<32} {'连接':>6} {'隧道':>6} {'TLS':>6} {'首字节':>7} {'总计':>7}  对照  结果")
+    print("-" * 90)
+    for result in results:
+        target = result['target']
+        control = result['control']
+        if result['target_ok']:
+            status = f"✅ {target['status']}"
+        else:
+            status = f"❌ {target['error'] or target['status']}"
+        control_mark = '-' if control is None else ('✅' if result['control_ok'] else '❌')
+        print(f"{result['rank']:>3}  {result['proxy']:<32} {_fmt(target['connect_ms']):>6} {_fmt(target['tunnel_ms']):>6}"
+              f" {_fmt(target['tls_ms']):>6} {_fmt(target['ttfb_ms']):>7} {_fmt(target['total_ms']):>7}  {control_mark:^4}  {status[:40]}")
+    print("（单位: 毫秒）")
 
-    # 测试直接连接
-    if test_direct_connection():
-        print("\n" + "=" * 70)
-        print("✅ 结论: 你不需要代理！")
+
+def arg(flag, default=None):
+    if flag in sys.argv:
+        idx = sys.argv.index(flag)
+        if idx + 1 < len(sys.argv):
+            return sys.argv[idx + 1]
+    return default
+
+
+def collect_candidates():
+    """常见端口 + --proxies / --proxy-file / --ports 指定的代理"""
+    candidates = list(COMMON_PROXIES)
+
+    if '--proxies' in sys.argv:
+        idx = sys.argv.index('--proxies')
+        if idx + 1 < len(sys.argv):
+            candidates.extend(p.strip() for p in sys.argv[idx + 1].split(',') if p.strip())
+
+    if '--proxy-file' in sys.argv:
+        idx = sys.argv.index('--proxy-file')
+        if idx + 1 < len(sys.argv):
+            with open(sys.argv[idx + 1], 'r', encoding='utf-8') as f:
+                candidates.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+
+    if '--ports' in sys.argv:
+        idx = sys.argv.index('--ports')
+        if idx + 1 < len(sys.argv):
+            host = arg('--host', '127.0.0.1')
+            scheme = arg('--scheme', 'http')
+            candidates.extend(f"{scheme}://{host}:{port}" for port in parse_ports(sys.argv[idx + 1]))
+
+    return candidates
+
+
+def print_advice(results):
+    best = next((result for result in results if result['target_ok']), None)
+    print("\n" + "=" * 70)
+    if best is None:
+        print("❌ 未找到可用的代理")
+        print("=" * 70)
+        print("\n📝 建议:")
+        print("1. 检查你的代理软件（Clash/v2ray）是否正在运行")
+        print("2. 检查代理软件的端口设置")
+        print("3. 常见端口：")
+        print("   - Clash: 7890")
+        print("   - v2ray: 1080")
+        print("   - Shadowsocks: 1087")
+        print("\n4. 如果使用其他端口，可以指定端口范围或代理列表重新检测：")
+        print("   python test_proxy.py --ports 7890-7899")
+        print("   python test_proxy.py --proxies http://127.0.0.1:你的端口")
+        return
+
+    if best['proxy'] == DIRECT:
+        print("✅ 结论: 你不需要代理！直连最快")
         print("=" * 70)
         print("\n📝 建议:")
         print("1. 编辑 config.py，将 PROXY 设置为 None：")
         print("   PROXY = None")
-        print("\n2. 然后运行爬虫：")
-        print("   python gmgn_crawler_v2.py")
+    else:
+        print(f"✅ 最快的代理: {best['proxy']}（总耗时 {best['target']['total_ms']:.0f}ms）")
+        print("=" * 70)
+        print("\n📝 建议:")
+        print("1. 编辑 config.py，设置代理：")
+        print(f"   PROXY = '{best['proxy']}'")
+    print("\n2. 然后运行爬虫（auto 表示使用排名第一的代理，--proxies auto 使用所有可用代理）：")
+    print("   python gmgn_crawler_v2.py --proxy auto")
+
+
+def self_test():
+    """用本地假 gmgn 服务器和几个不同延迟的替身代理跑一遍完整流程"""
+    from benchmark import FakeGmgnServer
+    from test_proxy_probe import StandInProxy
+
+    server = FakeGmgnServer().start()
+    stand_ins = [StandInProxy(delay).start() for delay in (0.2, 0.0, 0.05)]
+    try:
+        candidates = [proxy.url for proxy in stand_ins] + ['http://127.0.0.1:9']  # 9 端口通常没有服务
+        results = scan(candidates, target=server.url + '/', control=server.url + '/', timeout=2, include_direct=False)
+        print_ranking(results)
+        expected = [stand_ins[1].url, stand_ins[2].url, stand_ins[0].url, 'http://127.0.0.1:9']
+        ranked = [result['proxy'] for result in results]
+        if ranked == expected and all(proxy.requests == 2 for proxy in stand_ins):
+            print("\n✅ 自检通过: 按延迟正确排序，无效端口排在最后")
+            return True
+        print(f"\n❌ 自检失败: 排序为 {ranked}")
+        return False
+    finally:
+        for proxy in stand_ins:
+            proxy.stop()
+        server.stop()
+
+
+def main():
+    if '--help' in sys.argv or '-h' in sys.argv:
+        print("GMGN 爬虫代理检测工具")
+        print("\n用法:")
+        print("  python test_proxy.py [选项]")
+        print("\n选项:")
+        print("  --proxies <代理列表>  额外检测的代理，用逗号分隔")
+        print("  --proxy-file <文件>   额外检测的代理，每行一个")
+        print("  --ports <端口范围>    检测 --host 上的一组端口，例如 7890-7899,1080")
+        print("  --host <地址>         端口范围所在的主机（默认 127.0.0.1）")
+        print("  --scheme <协议>       端口范围的代理协议 http 或 socks5（默认 http）")
+        print(f"  --target <URL>        目标站点（默认 {TARGET_URL}）")
+        print(f"  --control <URL>       对照站点（默认 {CONTROL_URL}）")
+        print(f"  --timeout <秒>        每个阶段的超时（默认 {PROBE_TIMEOUT}）")
+        print(f"  --workers <数量>      并发探测数（默认 {PROBE_WORKERS}）")
+        print(f"  --output <文件>       排名结果文件（默认 {RANKED_PROXY_FILE}）")
+        print("  --self-test          用本地替身代理测试探测流程")
         return
 
-    # 测试常见代理
-    common_proxies = [
-        'http://127.0.0.1:7890',  # Clash 默认
-        'http://127.0.0.1:7891',
-        'socks5://127.0.0.1:1080',  # v2ray 默认
-        'http://127.0.0.1:1087',
-        'http://127.0.0.1:10809',
-    ]
-
-    print("\n🔍 扫描常见代理端口...")
-    working_proxy = None
-
-    for proxy in common_proxies:
-        if test_proxy(proxy):
-            working_proxy = proxy
-            if test_gmgn_with_proxy(proxy):
-                print("\n" + "=" * 70)
-                print(f"✅ 找到可用的代理: {proxy}")
-                print("=" * 70)
-                print("\n📝 建议:")
-                print("1. 编辑 config.py，设置代理：")
-                print(f"   PROXY = '{proxy}'")
-                print("\n2. 然后运行爬虫：")
-                print("   python gmgn_crawler_v2.py")
-                return
-            break
-
-    # 没有找到可用的代理
-    print("\n" + "=" * 70)
-    print("❌ 未找到可用的代理")
+    if '--self-test' in sys.argv:
+        sys.exit(0 if self_test() else 1)
+
     print("=" * 70)
-    print("\n📝 建议:")
-    print("1. 检查你的代理软件（Clash/v2ray）是否正在运行")
-    print("2. 检查代理软件的端口设置")
-    print("3. 常见端口：")
-    print("   - Clash: 7890")
-    print("   - v2ray: 1080")
-    print("   - Shadowsocks: 1087")
-    print("\n4. 如果使用其他端口，请手动设置 config.py：")
-    print("   PROXY = 'http://127.0.0.1:你的端口'")
-
-    # 提示用户手动输入
-    print("\n" + "-" * 70)
-    user_proxy = input("\n如果你知道代理地址，请输入（或直接回车跳过）: ").strip()
-    if user_proxy:
-        if not user_proxy.startswith(('http://', 'socks5://')):
-            user_proxy = f'http://{user_proxy}'
-        print(f"\n测试用户提供的代理: {user_proxy}")
-        if test_proxy(user_proxy) and test_gmgn_with_proxy(user_proxy):
-            print(f"\n✅ 代理可用！请在 config.py 中设置:")
-            print(f"   PROXY = '{user_proxy}'")
-        else:
-            print(f"\n❌ 代理不可用，请检查地址和端口")
+    print("🔧 GMGN 爬虫代理检测工具")
+    print("=" * 70)
+
+    target = arg('--target', TARGET_URL)
+    control = arg('--control', CONTROL_URL)
+    candidates = collect_candidates()
+    print(f"\n🔍 并发检测直连和 {len(candidates)} 个代理（目标 {target}，对照 {control}）...")
+
+    results = scan(candidates, target=target, control=control,
+                   timeout=float(arg('--timeout', PROBE_TIMEOUT)), workers=int(arg('--workers', PROBE_WORKERS)))
+    print_ranking(results)
+
+    output = save_ranking(results, arg('--output', RANKED_PROXY_FILE), target, control)
+    print(f"\n💾 排名已保存: {output.absolute()}")
+    print_advice(results)
 
 if __name__ == '__main__':
     try:
         main()
     except KeyboardInterrupt:
-        print("\n\n已取消")
\ No newline at end of file
+        print("\n\n已取消")
@@ -0,0 +1,73 @@
+"""
+proxy_pool 测试：EWMA 记分、按健康度分配代理、换代理判断和释放
+运行: python -m pytest test_proxy_pool.py
+"""
+import pytest
+
+from proxy_pool import UNHEALTHY_ERROR_RATE, ProxyPool
+
+A = 'http://127.0.0.1:7001'
+B = 'http://127.0.0.1:7002'
+
+
+def test_record_updates_ewma():
+    pool = ProxyPool([A, B], alpha=0.5)
+    pool.record(A, True, 100.0)
+    pool.record(A, True, 200.0)
+    state = pool.states[A]
+    assert state.latency_ms == 150.0
+    assert state.error_rate == 0.0
+
+    pool.record(A, False, error='timeout')
+    assert state.error_rate == 0.5
+    assert state.latency_ms == 150.0  # 失败不计延迟
+    assert (state.checks, state.failures, state.last_error) == (3, 1, 'timeout')
+
+    # 池外的代理直接忽略
+    pool.record('http://unknown:1', False)
+    assert set(pool.states) == {A, B}
+
+
+def test_requires_a_proxy():
+    with pytest.raises(ValueError):
+        ProxyPool([])
+
+
+def test_acquire_prefers_healthy_and_idle():
+    pool = ProxyPool([A, B], alpha=1.0)
+    pool.record(A, True, 50.0)
+    pool.record(B, True, 80.0)
+    assert pool.acquire() == A
+    # A 上已有一个上下文，得分翻倍后 B 更好
+    assert pool.acquire() == B
+    assert pool.acquire(exclude={A}) == B
+
+    pool.record(A, False)
+    assert not pool.states[A].healthy
+    assert pool.acquire() == B
+    # 只剩被排除的代理时照常分配
+    assert pool.acquire(exclude={A, B}) == B
+
+
+def test_release_never_goes_negative():
+    pool = ProxyPool([A])
+    assert pool.acquire() == A
+    pool.release(A)
+    pool.release(A)
+    pool.release('http://unknown:1')
+    assert pool.states[A].in_use == 0
+
+
+def test_should_replace_needs_a_healthy_alternative():
+    pool = ProxyPool([A, B], alpha=1.0)
+    assert not pool.should_replace(A)
+
+    pool.record(A, False)
+    assert pool.states[A].error_rate >= UNHEALTHY_ERROR_RATE
+    assert pool.should_replace(A)
+
+    # 其他代理也不健康时不换
+    pool.record(B, False)
+    assert not pool.should_replace(A)
+    assert pool.healthy_count() == 0
+    assert not pool.should_replace('http://unknown:1')
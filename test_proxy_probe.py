@@ -0,0 +1,124 @@
+"""
+proxy_probe 测试：两个延迟不同的本地替身代理，探测结果应按耗时排序
+运行: python -m pytest test_proxy_probe.py
+StandInProxy 也供 test_proxy.py --self-test 使用
+"""
+import select
+import socket
+import socketserver
+import threading
+import time
+from urllib.parse import urlsplit
+
+from benchmark import FakeGmgnServer
+from proxy_probe import PROBE_TIMEOUT, _ok, probe_url, scan
+
+
+class StandInProxy:
+    """本地替身代理：支持 CONNECT 隧道和绝对地址的 HTTP 请求，可以人为增加延迟"""
+
+    def __init__(self, delay=0.0, port=0):
+        proxy = self
+        self.delay = delay
+        self.requests = 0
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                proxy.requests += 1
+                head = b''
+                while b'\r\n\r\n' not in head:
+                    chunk = self.request.recv(4096)
+                    if not chunk:
+                        return
+                    head += chunk
+                line, rest = head.split(b'\r\n', 1)
+                method, request_target, version = line.decode('latin-1').split(' ', 2)
+                time.sleep(proxy.delay)
+
+                if method == 'CONNECT':
+                    host, port = request_target.rsplit(':', 1)
+                    upstream = socket.create_connection((host, int(port)), timeout=PROBE_TIMEOUT)
+                    self.request.sendall(b'HTTP/1.1 200 Connection Established\r\n\r\n')
+                    pending = head.split(b'\r\n\r\n', 1)[1]
+                else:
+                    target = urlsplit(request_target)
+                    upstream = socket.create_connection((target.hostname, target.port or 80),
+                                                        timeout=PROBE_TIMEOUT)
+                    path = target.path or '/'
+                    if target.query:
+                        path += '?' + target.query
+                    pending = f'{method} {path} {version}\r\n'.encode('latin-1') + rest
+                if pending:
+                    upstream.sendall(pending)
+                self._relay(self.request, upstream)
+
+            @staticmethod
+            def _relay(client, upstream):
+                sockets = [client, upstream]
+                try:
+                    while True:
+                        readable, _, _ = select.select(sockets, [], [], PROBE_TIMEOUT)
+                        if not readable:
+                            return
+                        for sock in readable:
+                            data = sock.recv(65536)
+                            if not data:
+                                return
+                            (upstream if sock is client else client).sendall(data)
+                finally:
+                    upstream.close()
+
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def test_scan_ranks_faster_proxy_first():
+    target = FakeGmgnServer().start()
+    slow = StandInProxy(delay=0.3).start()
+    fast = StandInProxy(delay=0.0).start()
+    try:
+        results = scan([slow.url, fast.url], target=f"{target.url}/", control=None, include_direct=False)
+    finally:
+        fast.stop()
+        slow.stop()
+        target.stop()
+
+    assert [result['proxy'] for result in results] == [fast.url, slow.url]
+    assert [result['rank'] for result in results] == [1, 2]
+    assert all(result['target_ok'] for result in results)
+    assert results[0]['target']['total_ms'] < results[1]['target']['total_ms']
+    assert slow.requests == 1 and fast.requests == 1
+
+
+def test_proxy_auth_required_is_not_reachable():
+    measurement = {'error': None, 'status': 407}
+    assert not _ok(measurement)
+    assert _ok({**measurement, 'status': 403})  # Cloudflare 挡住探测请求，但站点可达
+    assert not _ok({**measurement, 'status': 502})
+
+
+def test_socks5_proxy_without_port_uses_1080(monkeypatch):
+    addresses = []
+
+    def refuse(address, timeout=None):
+        addresses.append(address)
+        raise ConnectionRefusedError('refused')
+
+    monkeypatch.setattr(socket, 'create_connection', refuse)
+    for proxy in ('socks5://127.0.0.1', 'socks5h://127.0.0.1', 'http://127.0.0.1'):
+        assert probe_url(proxy, 'https://gmgn.ai/')['error'] == 'refused'
+    assert addresses == [('127.0.0.1', 1080), ('127.0.0.1', 1080), ('127.0.0.1', 80)]
@@ -0,0 +1,144 @@
+"""
+query_index 测试：索引查询与直接过滤排序的结果一致，日志中未压缩的用户参与查询，日志回放缓存增量更新
+运行: python -m pytest test_query_index.py
+"""
+import itertools
+import json
+from benchmark import SyntheticUsers
+import query_index
+from journal_store import JournalStore, read_journal
+from query_index import QueryIndex, overlay_path_for
+
+
+def _store(snapshot):
+    store = JournalStore(snapshot, history=False, handle_index=False, compact_every=1000)
+    store.load()
+    return store
+
+
+def _reference(users, tags=(), min_followers=None, max_followers=None, platform=None, handle_prefix=None,
+               sort='followers', limit=20):
+    rows = [(row, user) for row, user in enumerate(users)
+            if all(tag in user['user_tags'] for tag in tags)
+            and (min_followers is None or user['followers'] >= min_followers)
+            and (max_followers is None or user['followers'] <= max_followers)
+            and (platform is None or user['platform'] == platform)
+            and (handle_prefix is None or user['handle'].lower().startswith(handle_prefix.lower()))]
+    if sort == 'handle':
+        rows.sort(key=lambda item: (item[1]['handle'].lower(), item[0]))
+    elif sort == 'followers':
+        rows.sort(key=lambda item: (-item[1]['followers'], item[0]))
+    else:
+        rows.sort(key=lambda item: (item[1]['followers'], -item[0]))
+    return [user for _, user in rows[:limit]]
+
+
+def _snapshot_rows(snapshot, store):
+    """快照中的行顺序（按粉丝数降序写出），日志中的新用户排在后面"""
+    from json_stream import iter_users
+    users = {user['user_id']: user for user in iter_users(snapshot)}
+    order = list(users)
+    current = dict(store.users.items())
+    order += [user_id for user_id in current if user_id not in users]
+    return [current[user_id] for user_id in order]
+
+
+def test_queries_match_reference_with_journal_overlay(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    synthetic = SyntheticUsers(page_size=100, overlap=0.2, seed=11)
+    store = _store(snapshot)
+    for _ in range(4):
+        store.merge(synthetic.page())
+    store.compact()
+    store.merge(synthetic.page())  # 压缩之后的新用户和更新只在日志中
+
+    index = QueryIndex.open(snapshot)
+    assert index.journal_users
+    users = _snapshot_rows(snapshot, store)
+    handles = sorted({user['handle'][:6] for user in users})[:2]
+    cases = itertools.product(
+        [(), ('kol',), ('kol', 'founder')],
+        [(None, None), (50, None), (None, 200), (10, 1000)],
+        [None, handles[0]],
+        ['followers', 'followers-asc', 'handle'],
+    )
+    for tags, (low, high), prefix, sort in cases:
+        found, _ = index.query(tags, low, high, None, prefix, sort, limit=15)
+        assert found == _reference(users, tags, low, high, None, prefix, sort, limit=15), (tags, low, high, prefix, sort)
+
+
+def test_journal_replay_is_cached_and_resumed(tmp_path, monkeypatch):
+    snapshot = tmp_path / 'users.json'
+    synthetic = SyntheticUsers(page_size=20, overlap=0, seed=2)
+    store = _store(snapshot)
+    store.merge(synthetic.page())
+    store.compact()
+    store.merge(synthetic.page())
+
+    first = QueryIndex.open(snapshot)
+    overlay_file = overlay_path_for(snapshot)
+    assert overlay_file.exists()
+    assert len(first.journal_users) == 20
+
+    store.merge(synthetic.page())  # 当前日志追加，从上次的位置继续读
+    starts = []
+    monkeypatch.setattr(query_index, 'read_journal',
+                        lambda path, offset=0: starts.append(offset) or read_journal(path, offset))
+    second = QueryIndex.open(snapshot)
+    assert starts and all(start > 0 for start in starts)
+    assert len(second.journal_users) == 40
+    cache = json.loads(overlay_file.read_text(encoding='utf-8'))
+    assert dict(cache['journals']) == {store.journal_file.name: store.journal_file.stat().st_size}
+    assert sorted(row for row, _ in second.journal_users.values()) == list(range(20, 60))
+
+    store.close()  # 压缩后日志清空，缓存随之失效
+    third = QueryIndex.open(snapshot)
+    assert third.journal_users == {}
+    found, _ = third.query(limit=100)
+    assert len(found) == 60
+
+
+def test_rebuild_regenerates_binary_snapshot(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    store = _store(snapshot)
+    store.merge(SyntheticUsers(page_size=30, overlap=0).page())
+    store.close()
+    store.binary_file.unlink()  # 例如快照不是爬虫写出的
+
+    found, _ = QueryIndex.open(snapshot).query(('kol',), limit=100)
+    assert store.binary_file.exists()
+    assert QueryIndex.open(snapshot, rebuild=True).query(('kol',), limit=100)[0] == found
+    assert not list(tmp_path.glob('users.json.bin.*'))
+
+
+def test_platform_uses_posting_list(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    synthetic = SyntheticUsers(page_size=100, overlap=0, seed=6)
+    store = _store(snapshot)
+    for _ in range(3):
+        page = synthetic.page()
+        for user in page:
+            # 大部分是 platform 0，少数 1 / 2；个别用户的平台值不标准
+            user['platform'] = {0: 2, 1: 1, 2: 1}.get(int(user['user_id']) % 20, 0)
+        page[0]['platform'] = '2'
+        page[1]['platform'] = 2.0
+        store.merge(page)
+    store.compact()
+    page = synthetic.page()
+    for user in page[:10]:
+        user['platform'] = 2
+    store.merge(page)
+
+    index = QueryIndex.open(snapshot)
+    users = _snapshot_rows(snapshot, store)
+    for platform, tags, sort in itertools.product([0, 1, 2, 7], [(), ('kol',)], ['followers', 'handle']):
+        found, plan = index.query(tags, None, None, platform, None, sort, limit=15)
+        expected = _reference(users, tags, None, None, platform, None, sort, limit=15)
+        assert found == expected, (platform, tags, sort)
+
+    found, plan = index.query(platform=2, limit=1000)
+    assert plan.startswith('使用 platform:2 索引')
+    assert len(index.platform_rows(2)) == sum(user['platform'] == 2 for user in users[:index.count])
+    scanned = int(plan.split('检查 ')[1].split(' 行')[0])
+    assert scanned == len(index.platform_rows(2)) < index.count
+    assert len(index.platform_rows('2')) == 0
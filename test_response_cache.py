@@ -0,0 +1,95 @@
+"""
+response_cache 测试：命中 / 未命中计数、达到容量时淘汰最久未用的指纹，
+以及 v2 爬虫命中缓存时仍然合并并计入请求数和页面统计
+运行: python -m pytest test_response_cache.py
+"""
+import asyncio
+import json
+from collections import Counter
+from benchmark import SyntheticUsers
+from response_cache import ResponseCache
+
+
+def test_counts_hits_and_misses():
+    cache = ResponseCache(maxsize=4)
+    body = b'{"code": 0}'
+    fingerprint = cache.fingerprint(body)
+    assert cache.get(fingerprint, len(body)) is None
+    cache.add(fingerprint, [{'user_id': '1'}])
+    assert cache.get(fingerprint, len(body)) == [{'user_id': '1'}]
+    assert cache.get(cache.fingerprint(b'other'), 5) is None
+    assert (cache.hits, cache.misses, cache.bytes_skipped) == (1, 2, len(body))
+
+
+def test_evicts_least_recently_used():
+    cache = ResponseCache(maxsize=2)
+    a, b, c = (cache.fingerprint(body) for body in (b'a', b'b', b'c'))
+    cache.add(a, [])
+    cache.add(b, [])
+    assert cache.get(a) == []  # a 变为最近使用
+    cache.add(c, [])
+    assert list(cache.fingerprints) == [a, c]
+    assert cache.get(b) is None
+
+
+def test_disabled_cache_never_hits():
+    cache = ResponseCache(maxsize=0)
+    fingerprint = cache.fingerprint(b'a')
+    cache.add(fingerprint, [])
+    assert cache.get(fingerprint) is None
+    assert cache.misses == 0
+
+
+class FakePage:
+    pass
+
+
+class FakeFrame:
+    def __init__(self, page):
+        self.page = page
+
+
+class FakeRequest:
+    timing = {'responseStart': 12.0}
+
+
+class FakeResponse:
+    def __init__(self, url, body, page):
+        self.url = url
+        self.status = 200
+        self._body = body
+        self.frame = FakeFrame(page)
+        self.request = FakeRequest()
+
+    async def body(self):
+        return self._body
+
+
+def test_cached_hit_still_merges_and_counts(tmp_path):
+    from gmgn_crawler_v2 import GmgnCrawlerV2
+    from page_pool import PagePool
+
+    crawler = GmgnCrawlerV2(output_file=tmp_path / 'users.json', proxy_pool=None)
+    crawler.live_stats_thread.join()
+    page = FakePage()
+    crawler.page_pool = PagePool(None, {})
+    crawler.page_pool.page_labels[page] = '页面1'
+    crawler.page_pool.stats['页面1'] = Counter()
+
+    users = SyntheticUsers(page_size=5, overlap=0).page()
+    body = json.dumps({'code': 0, 'data': {'users': users}}).encode('utf-8')
+    merged = []
+    merge = crawler.writer.merge
+    crawler.writer.merge = lambda batch: merged.append(len(batch)) or merge(batch)
+
+    async def run():
+        for _ in range(3):
+            await crawler.handle_response(FakeResponse(crawler.target_url_prefix + '?q=a', body, page))
+
+    asyncio.run(run())
+    assert crawler.response_cache.hits == 2
+    assert merged == [5, 5, 5]
+    assert crawler.request_count == 3
+    assert crawler.page_pool.stats['页面1'] == {'captures': 3, 'users': 15, 'new_users': 5}
+    assert len(crawler.store.users) == 5
+    crawler.writer.close()
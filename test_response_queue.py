@@ -0,0 +1,84 @@
+"""
+response_queue 测试：入队前按 URL 过滤、队列满时丢弃并计数、处理出错不影响工作协程、停止时处理完队列
+运行: python -m pytest test_response_queue.py
+"""
+import asyncio
+from response_queue import ResponseQueue
+
+PREFIX = 'https://gmgn.ai/vas/api/v1/twitter/user/search'
+
+
+class FakeResponse:
+    def __init__(self, url):
+        self.url = url
+
+
+def test_filters_by_url_and_counts_drops():
+    async def run():
+        handled = []
+
+        async def handler(response):
+            handled.append(response.url)
+
+        queue = ResponseQueue(handler, PREFIX, maxsize=3, workers=2)
+        for i in range(5):
+            queue.submit(FakeResponse(f'{PREFIX}?q={i}'))
+        queue.submit(FakeResponse('https://gmgn.ai/static/app.js'))
+
+        assert queue.seen == 6
+        assert queue.enqueued == 3
+        assert queue.dropped == 2
+        assert queue.max_depth == 3
+
+        queue.start()
+        await queue.drain()
+        assert handled == [f'{PREFIX}?q={i}' for i in range(3)]
+        assert queue.processed == 3
+
+    asyncio.run(run())
+
+
+def test_handler_errors_do_not_stop_workers():
+    async def run():
+        handled = []
+
+        async def handler(response):
+            if response.url.endswith('bad'):
+                raise ValueError('bad response')
+            handled.append(response.url)
+
+        queue = ResponseQueue(handler, PREFIX, workers=1)
+        queue.start()
+        for suffix in ('?q=1', '?q=bad', '?q=2', '?q=bad', '?q=3'):
+            queue.submit(FakeResponse(PREFIX + suffix))
+        await asyncio.wait_for(queue.queue.join(), 5)
+
+        assert handled == [PREFIX + '?q=1', PREFIX + '?q=2', PREFIX + '?q=3']
+        assert queue.processed == 5
+        assert all(not task.done() for task in queue._tasks)
+        await queue.drain()
+
+    asyncio.run(run())
+
+
+def test_drain_processes_queued_items_then_stops():
+    async def run():
+        handled = []
+
+        async def handler(response):
+            await asyncio.sleep(0.01)
+            handled.append(response.url)
+
+        queue = ResponseQueue(handler, PREFIX, workers=2)
+        queue.start()
+        for i in range(10):
+            queue.submit(FakeResponse(f'{PREFIX}?q={i}'))
+        tasks = list(queue._tasks)
+        await queue.drain()
+
+        assert sorted(handled) == sorted(f'{PREFIX}?q={i}' for i in range(10))
+        assert queue.queue.empty()
+        assert all(task.done() for task in tasks)
+        assert queue._tasks == []
+
+    asyncio.run(run())
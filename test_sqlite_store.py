@@ -0,0 +1,108 @@
+"""
+sqlite_store 测试：批量 upsert、从日志版本导入，以及与 JSON 版本一致的统计结果
+运行: python -m pytest test_sqlite_store.py
+"""
+from analyze_data import collect_stats_sqlite
+from benchmark import SyntheticUsers
+from journal_store import JournalStore
+from json_stream import iter_users
+from sqlite_store import SqliteStore
+from user_stats import UserStats
+
+
+def _sqlite(snapshot, **kwargs):
+    store = SqliteStore(snapshot, history=False, handle_index=False, **kwargs)
+    store.load()
+    return store
+
+
+def test_upsert_replaces_user_and_tags(tmp_path):
+    store = _sqlite(tmp_path / 'users.json', export_json=False)
+    user = {'handle': 'a', 'user_id': '1', 'user_tags': ['kol', 'founder'],
+            'platform': 0, 'followers': 10, 'followed': False}
+    assert store.merge([user]) == 1
+    assert store.merge([{**user, 'user_tags': ['kol'], 'followers': 20}]) == 0
+
+    assert store.count() == 1
+    assert list(store.iter_users()) == [{**user, 'user_tags': ['kol'], 'followers': 20}]
+    assert list(store.iter_users('founder')) == []
+    assert store.tag_counts() == [('kol', 1)]
+    store.close()
+
+
+def test_first_load_imports_snapshot_and_journal(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    synthetic = SyntheticUsers(page_size=20, overlap=0.3)
+    journal = JournalStore(snapshot, history=False, handle_index=False)
+    journal.load()
+    for _ in range(3):
+        journal.merge(synthetic.page())
+    journal.compact()
+    journal.merge(synthetic.page())  # 压缩之后的用户只在日志中
+
+    store = _sqlite(snapshot, export_json=False)
+    assert {user['user_id']: user for user in store.iter_users()} == dict(journal.users.items())
+    store.close()
+
+
+def test_stats_match_json_path(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    synthetic = SyntheticUsers(page_size=50, overlap=0.4, seed=7)
+    store = _sqlite(snapshot)
+    for _ in range(6):
+        store.merge(synthetic.page())
+    store.close()  # 导出 JSON 快照
+
+    db = SqliteStore(snapshot, export_json=False, history=False, handle_index=False)
+    sqlite_report = collect_stats_sqlite(db)
+    json_report = UserStats().add_all(iter_users(snapshot)).report()
+    db.close()
+
+    assert sqlite_report['total_users'] == json_report['total_users']
+    assert sqlite_report['tag_counts'] == json_report['tag_counts']
+    assert sqlite_report['platform_counts'] == json_report['platform_counts']
+    assert sqlite_report['top_users'] == json_report['top_users']
+    assert sqlite_report['followers']['percentiles'] == json_report['followers']['percentiles']
+    assert sqlite_report['followers']['max'] == json_report['followers']['max']
+    assert sqlite_report['followers']['min'] == json_report['followers']['min']
+    assert sqlite_report['tag_top_users'] == json_report['tag_top_users']
+
+
+def test_tied_tag_counts_follow_snapshot_order(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    store = _sqlite(snapshot)
+    store.merge([
+        {'handle': 'a', 'user_id': '1', 'user_tags': ['zeta'], 'platform': 0, 'followers': 5, 'followed': False},
+        {'handle': 'b', 'user_id': '2', 'user_tags': ['beta', 'alpha'], 'platform': 0, 'followers': 9,
+         'followed': False},
+    ])
+    store.close()
+
+    db = SqliteStore(snapshot, export_json=False, history=False, handle_index=False)
+    expected = UserStats().add_all(iter_users(snapshot)).report()['tag_counts']
+    assert db.tag_counts() == expected == [('beta', 1), ('alpha', 1), ('zeta', 1)]
+    db.close()
+
+
+def test_import_command_includes_uncompacted_journal(tmp_path):
+    from analyze_data import import_sqlite
+
+    snapshot = tmp_path / 'users.json'
+    synthetic = SyntheticUsers(page_size=20, overlap=0.3, seed=3)
+    journal = JournalStore(snapshot, history=False, handle_index=False)
+    journal.load()
+    for _ in range(3):
+        journal.merge(synthetic.page())
+    journal.compact()
+    journal.merge(synthetic.page())
+    journal.merge(synthetic.page())
+
+    imported = tmp_path / 'imported.db'
+    import_sqlite(snapshot, imported)
+    loaded = _sqlite(snapshot, db_file=tmp_path / 'loaded.db', export_json=False)  # 首次加载时自动导入
+
+    db = SqliteStore(snapshot, db_file=imported, export_json=False, history=False, handle_index=False)
+    assert {user['user_id']: user for user in db.iter_users()} == dict(journal.users.items())
+    assert list(db.iter_users()) == list(loaded.iter_users())
+    db.close()
+    loaded.close()
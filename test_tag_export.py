@@ -0,0 +1,39 @@
+"""
+tag_export 测试：只重新导出有变化的标签（包括并列用户的顺序变化），删除已不存在的标签的文件
+运行: python -m pytest test_tag_export.py
+"""
+import json
+from json_stream import write_snapshot
+from tag_export import export_tags, tag_file
+
+
+def _user(user_id, followers, tags):
+    return {'handle': f'h{user_id}', 'user_id': user_id, 'user_tags': tags,
+            'platform': 0, 'followers': followers, 'followed': False}
+
+
+def test_export_skips_unchanged_and_removes_stale_tags(tmp_path):
+    snapshot = tmp_path / 'users.json'
+    output_dir = tmp_path / 'exports'
+    users = [_user('1', 100, ['kol']), _user('2', 50, ['kol', 'founder']), _user('3', 50, ['kol'])]
+    write_snapshot(snapshot, users, len(users))
+
+    exported, skipped, removed = export_tags(snapshot, output_dir)
+    assert exported == {'kol': 3, 'founder': 1}
+    assert skipped == [] and removed == []
+
+    # 只交换两个粉丝数相同的用户，kol 的文件内容顺序变了，需要重新导出
+    write_snapshot(snapshot, [users[0], users[2], users[1]], len(users))
+    exported, skipped, removed = export_tags(snapshot, output_dir)
+    assert exported == {'kol': 3}
+    assert skipped == ['founder']
+    with open(tag_file(output_dir, 'kol'), encoding='utf-8') as f:
+        assert [user['user_id'] for user in json.load(f)['users']] == ['1', '3', '2']
+
+    # founder 标签消失后删除它的文件，目录中不是导出生成的文件保留
+    (output_dir / 'notes_users.json').write_text('{}', encoding='utf-8')
+    write_snapshot(snapshot, [users[0], _user('2', 50, ['kol']), users[2]], len(users))
+    exported, skipped, removed = export_tags(snapshot, output_dir)
+    assert removed == ['founder']
+    assert not tag_file(output_dir, 'founder').exists()
+    assert (output_dir / 'notes_users.json').exists()
@@ -0,0 +1,109 @@
+"""
+user_stats 测试：单次遍历的统计与直接排序计算的结果一致，状态保存后可以继续累加
+运行: python -m pytest test_user_stats.py
+"""
+import json
+import math
+from collections import Counter
+from benchmark import SyntheticUsers
+from user_stats import UserStats
+
+
+def _users(count, seed=0):
+    synthetic = SyntheticUsers(page_size=count, overlap=0, seed=seed)
+    return synthetic.page()
+
+
+def _reference(users, top_k=10):
+    """不考虑效率的直接计算：排序后取分位数和 Top-K"""
+    followers = sorted(user['followers'] for user in users)
+    tag_counter = Counter(tag for user in users for tag in user['user_tags'])
+    ranked = sorted(users, key=lambda user: user['followers'], reverse=True)  # 稳定排序，并列时先到的在前
+    return {
+        'total_users': len(users),
+        'tag_counts': tag_counter.most_common(),
+        'avg': sum(followers) / len(users),
+        'min': followers[0],
+        'max': followers[-1],
+        'percentiles': {p: followers[max(1, math.ceil(p / 100 * len(users))) - 1] for p in (50, 90, 99)},
+        'top_users': ranked[:top_k],
+        'tag_top': {tag: [user for user in ranked if tag in user['user_tags']][:3] for tag in tag_counter},
+    }
+
+
+def test_single_pass_matches_sorted_reference():
+    users = _users(500)
+    report = UserStats().add_all(iter(users)).report()
+    expected = _reference(users)
+
+    assert report['total_users'] == expected['total_users']
+    assert report['tag_counts'] == expected['tag_counts']
+    assert report['followers']['avg'] == expected['avg']
+    assert report['followers']['min'] == expected['min']
+    assert report['followers']['max'] == expected['max']
+    assert report['followers']['percentiles'] == expected['percentiles']
+    assert report['top_users'] == expected['top_users']
+    for tag, _, top in report['tag_top_users']:
+        assert top == expected['tag_top'][tag]
+
+
+def test_ties_keep_arrival_order():
+    users = [{'user_id': str(i), 'followers': 7, 'user_tags': ['kol'], 'platform': 0} for i in range(15)]
+    report = UserStats().add_all(users).report()
+    assert [user['user_id'] for user in report['top_users']] == [str(i) for i in range(10)]
+
+
+def test_state_round_trip_continues_accumulating():
+    users = _users(300, seed=3)
+    stats = UserStats().add_all(users[:200])
+    state = json.loads(json.dumps(stats.state()))  # 与 .analysis 缓存一样经过 JSON
+    restored = UserStats.from_state(state).add_all(users[200:])
+    assert restored.report() == UserStats().add_all(users).report()
+
+
+def test_empty_input():
+    report = UserStats().report()
+    assert report['total_users'] == 0
+    assert report['followers']['avg'] == 0
+    assert report['top_users'] == []
+
+
+def _shuffle_updates(users, seed):
+    """已有用户的粉丝数升降、标签增减，以及新用户"""
+    import random
+    rng = random.Random(seed)
+    updated = []
+    for user in rng.sample(users, len(users) // 2):
+        user = dict(user)
+        user['followers'] = max(0, user['followers'] + rng.randint(-user['followers'], 5000))
+        if rng.random() < 0.3:
+            user['user_tags'] = rng.sample(['kol', 'founder', 'vc', 'dev', 'whale'], rng.randint(0, 2))
+        updated.append(user)
+    return updated
+
+
+def test_live_stats_deltas_match_full_recompute(tmp_path):
+    from journal_store import JournalStore
+    from user_stats import LiveStats
+
+    store = JournalStore(tmp_path / 'users.json', history=False, handle_index=False, compact_every=1000)
+    store.load()
+    users = _users(300, seed=5)
+    store.merge(users[:150])
+    live = LiveStats.attach(store)  # 统计已有数据，之后按差值更新
+    store.merge(users[150:])
+    for seed in range(4):
+        store.merge(_shuffle_updates(list(store.users.values()), seed))
+
+    report = live.report()
+    expected = UserStats().add_all(store.users.values()).report()  # 按行号（首次出现）顺序重新统计
+
+    assert report['total_users'] == expected['total_users']
+    assert dict(report['tag_counts']) == dict(expected['tag_counts'])
+    assert dict(report['platform_counts']) == dict(expected['platform_counts'])
+    assert report['followers']['avg'] == expected['followers']['avg']
+    assert report['followers']['max'] == expected['followers']['max']
+    assert report['top_users'] == expected['top_users']
+    ranked = sorted(store.users.values(), key=lambda user: user['followers'], reverse=True)
+    for tag, _, top in report['tag_top_users']:
+        assert top == [user for user in ranked if tag in user['user_tags']][:3]
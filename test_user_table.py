@@ -0,0 +1,73 @@
+"""
+user_table 测试：字典格式往返、user_id 规范化、标签顺序和无法压缩的记录
+运行: python -m pytest test_user_table.py
+"""
+from user_table import UserTable, _user_key
+
+
+def _user(user_id, handle='h', tags=(), followers=0):
+    return {'handle': handle, 'user_id': user_id, 'user_tags': list(tags),
+            'platform': 0, 'followers': followers, 'followed': False}
+
+
+def test_user_key_only_converts_canonical_ascii_digits():
+    assert _user_key('12') == 12
+    assert _user_key('0') == 0
+    assert _user_key('012') == '012'
+    assert _user_key('') == ''
+    assert _user_key('²') == '²'
+    assert _user_key('١٢') == '١٢'
+    assert _user_key('abc') == 'abc'
+
+
+def test_unicode_digit_ids_do_not_collide():
+    table = UserTable()
+    table['12'] = _user('12', 'ascii')
+    table['١٢'] = _user('١٢', 'arabic')
+    table['²'] = _user('²', 'superscript')
+    table['012'] = _user('012', 'padded')
+
+    assert len(table) == 4
+    assert table['12']['handle'] == 'ascii'
+    assert table['١٢']['handle'] == 'arabic'
+    assert table['²']['handle'] == 'superscript'
+    assert table['012']['handle'] == 'padded'
+    assert list(table) == ['12', '١٢', '²', '012']
+
+
+def test_round_trip_preserves_tags_order_and_updates_in_place():
+    table = UserTable()
+    first = _user('1', 'a', ['kol', 'founder'], 10)
+    second = _user('2', 'b', ['founder', 'kol'], 20)  # 与标签 ID 顺序不同
+    table['1'] = first
+    table['2'] = second
+    assert table['1'] == first
+    assert table['2'] == second
+
+    updated = _user('1', 'a2', ['kol'], 30)
+    table['1'] = updated
+    assert table.row_of('1') == 0
+    assert list(table.values()) == [updated, second]
+    assert [user['user_id'] for user in table.sorted_users()] == ['1', '2']
+
+
+def test_non_standard_records_are_kept_verbatim():
+    table = UserTable()
+    odd = {'handle': None, 'user_id': '3', 'user_tags': ['kol'], 'followers': '1k', 'extra': True}
+    table['3'] = odd
+    assert table['3'] == odd
+    assert table.get('missing') is None
+
+    copy = table.snapshot()
+    table['3'] = _user('3', 'c')
+    assert list(copy.values()) == [odd]
+
+
+def test_more_than_64_tags():
+    table = UserTable()
+    tags = [f"t{i}" for i in range(70)]
+    for i, tag in enumerate(tags):
+        table[str(i)] = _user(str(i), tags=[tag])
+    table['many'] = _user('many', tags=tags)
+    assert table['many']['user_tags'] == tags
+    assert table['69']['user_tags'] == ['t69']
@@ -0,0 +1,96 @@
+"""
+warm_start 测试：用户数据目录的首次 / 再次启动判断、启动耗时记录和汇总，
+以及持久化上下文在 PagePool 中直接使用自带的空白页
+运行: python -m pytest test_warm_start.py
+"""
+import asyncio
+import json
+
+from page_pool import PagePool
+from warm_start import StartupTimer, mark_profile, prepare_profile, summarize
+
+
+def test_profile_is_warm_only_after_a_successful_start(tmp_path):
+    profile = tmp_path / 'profiles' / 'gmgn'
+    profile_dir, warm = prepare_profile(profile)
+    assert profile_dir == profile and profile.is_dir()
+    assert not warm
+
+    # 浏览器没能启动（没有标记）时仍然算冷启动
+    assert prepare_profile(profile) == (profile, False)
+    mark_profile(profile)
+    assert prepare_profile(str(profile)) == (profile, True)
+
+
+def test_startup_timer_logs_first_capture_once(tmp_path):
+    log_file = tmp_path / 'startup_times.jsonl'
+    timer = StartupTimer('warm', log_file)
+    timer.mark('launch')
+    timer.mark('ready')
+    assert timer.first_capture() >= timer.marks['ready']
+    assert timer.first_capture() is None
+    assert timer.recorded
+
+    [line] = log_file.read_text(encoding='utf-8').splitlines()
+    entry = json.loads(line)
+    assert entry['mode'] == 'warm'
+    assert set(entry) == {'timestamp', 'mode', 'launch', 'ready', 'first_capture'}
+    assert timer.describe().startswith('热启动: 启动浏览器 ')
+    assert '第一次捕获' in timer.describe()
+
+
+def test_summarize_groups_by_mode(tmp_path, capsys):
+    log_file = tmp_path / 'startup_times.jsonl'
+    summarize(log_file)
+    assert '还没有记录' in capsys.readouterr().out
+
+    with open(log_file, 'w', encoding='utf-8') as f:
+        for mode, launch in (('cold', 3.0), ('cold', 5.0), ('cold', 4.0), ('warm', 1.0)):
+            f.write(json.dumps({'mode': mode, 'launch': launch, 'ready': launch + 1}) + '\n')
+    summarize(log_file)
+    out = capsys.readouterr().out.splitlines()
+    cold = next(line for line in out if line.startswith('cold'))
+    warm = next(line for line in out if line.startswith('warm'))
+    assert cold.split()[1:4] == ['3', '4.0', '5.0']
+    assert warm.split()[1:] == ['1', '1.0', '2.0', '-']
+
+
+class FakePage:
+    def __init__(self, context):
+        self.context = context
+
+
+class PersistentContext:
+    """launch_persistent_context 返回的上下文：启动时自带一个空白页"""
+
+    def __init__(self):
+        self.pages = [FakePage(self)]
+        self.closed = False
+
+    async def new_page(self):
+        page = FakePage(self)
+        self.pages.append(page)
+        return page
+
+    async def close(self):
+        self.closed = True
+
+
+def test_persistent_context_reuses_its_blank_page():
+    async def run():
+        context = PersistentContext()
+        blank = context.pages[0]
+        attached = []
+        page_pool = PagePool(None, {}, context=context, on_page=attached.append)
+        pages = await page_pool.open(2)
+
+        assert pages[0] is blank
+        assert pages[1].context is context
+        assert len(context.pages) == 2
+        assert attached == pages
+        # 持久化上下文由爬虫关闭，不归页面池管理
+        assert page_pool.contexts == []
+        await page_pool.close()
+        assert not context.closed
+
+    asyncio.run(run())
@@ -0,0 +1,380 @@
+"""
+GMGN 用户统计 - 单次遍历的聚合引擎 + 爬虫运行时的实时统计
+UserStats: 逐个接收用户，同时统计标签分布、粉丝数（最小/最大/平均/分位数）、平台分布，
+以及整体和每个标签的 Top-K（固定大小的堆），总开销 O(n log k)，可直接处理流式输入
+LiveStats: 挂在存储的合并步骤上，每合并一个用户按差值更新统计，随时可以查询，不读磁盘
+"""
+import heapq
+import math
+from collections import Counter
+
+# 整体 Top-K
+TOP_K = 10
+# 每个标签的 Top-K
+TAG_TOP_K = 3
+# 报告中展示的标签数
+TOP_TAGS = 5
+# 报告中的粉丝数分位点
+PERCENTILES = (50, 90, 99)
+
+
+class TopK:
+    """保留粉丝数最多的 k 个用户；粉丝数相同时先到的优先（与稳定排序一致）"""
+
+    def __init__(self, k):
+        self.k = k
+        self.heap = []  # 小顶堆: (followers, -seq, user)
+
+    def push(self, followers, seq, user):
+        item = (followers, -seq, user)
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+        elif item[:2] > self.heap[0][:2]:
+            heapq.heapreplace(self.heap, item)
+
+    def items(self):
+        """按粉丝数降序返回用户"""
+        return [user for _, _, user in sorted(self.heap, key=lambda x: x[:2], reverse=True)]
+
+    def state(self):
+        return [list(item) for item in self.heap]
+
+    @classmethod
+    def from_state(cls, k, heap):
+        top = cls(k)
+        top.heap = [tuple(item) for item in heap]  # 保存的列表已满足堆序
+        return top
+
+
+class UserStats:
+    def __init__(self, top_k=TOP_K, tag_top_k=TAG_TOP_K):
+        self.total_users = 0
+        self.tag_counter = Counter()
+        self.platform_counter = Counter()
+        self.follower_counts = Counter()  # 粉丝数 -> 用户数，用于精确计算分位数
+        self.followers_sum = 0
+        self.followers_min = None
+        self.followers_max = None
+        self.top = TopK(top_k)
+        self.tag_top_k = tag_top_k
+        self.tag_top = {}  # 标签 -> TopK
+
+    def add(self, user):
+        """累加一个用户"""
+        seq = self.total_users
+        self.total_users += 1
+
+        followers = user.get('followers', 0)
+        self.followers_sum += followers
+        self.follower_counts[followers] += 1
+        if self.followers_min is None or followers < self.followers_min:
+            self.followers_min = followers
+        if self.followers_max is None or followers > self.followers_max:
+            self.followers_max = followers
+
+        self.platform_counter[user.get('platform', 0)] += 1
+        self.top.push(followers, seq, user)
+
+        for tag in user.get('user_tags', []):
+            self.tag_counter[tag] += 1
+            top = self.tag_top.get(tag)
+            if top is None:
+                top = self.tag_top[tag] = TopK(self.tag_top_k)
+            top.push(followers, seq, user)
+
+    def add_all(self, users):
+        for user in users:
+            self.add(user)
+        return self
+
+    def state(self):
+        """可 JSON 序列化的完整状态，恢复后可以继续 add()（计数器按插入顺序保存，报告中并列项的顺序不变）"""
+        return {
+            'total_users': self.total_users,
+            'tag_counter': list(self.tag_counter.items()),
+            'platform_counter': list(self.platform_counter.items()),
+            'follower_counts': list(self.follower_counts.items()),
+            'followers_sum': self.followers_sum,
+            'followers_min': self.followers_min,
+            'followers_max': self.followers_max,
+            'top_k': self.top.k,
+            'top': self.top.state(),
+            'tag_top_k': self.tag_top_k,
+            'tag_top': [(tag, top.state()) for tag, top in self.tag_top.items()],
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        stats = cls(state['top_k'], state['tag_top_k'])
+        stats.total_users = state['total_users']
+        stats.tag_counter = Counter(dict(state['tag_counter']))
+        stats.platform_counter = Counter(dict(state['platform_counter']))
+        stats.follower_counts = Counter(dict(state['follower_counts']))
+        stats.followers_sum = state['followers_sum']
+        stats.followers_min = state['followers_min']
+        stats.followers_max = state['followers_max']
+        stats.top = TopK.from_state(stats.top.k, state['top'])
+        stats.tag_top = {tag: TopK.from_state(stats.tag_top_k, heap) for tag, heap in state['tag_top']}
+        return stats
+
+    def percentile(self, p):
+        """粉丝数的第 p 百分位（最近秩法）"""
+        if self.total_users == 0:
+            return 0
+        rank = max(1, math.ceil(p / 100 * self.total_users))
+        seen = 0
+        for followers in sorted(self.follower_counts):
+            seen += self.follower_counts[followers]
+            if seen >= rank:
+                return followers
+        return self.followers_max
+
+    def report(self, top_tags=TOP_TAGS):
+        """生成与 analyze_users 报告对应的统计数据"""
+        tag_counts = self.tag_counter.most_common()
+        return {
+            'total_users': self.total_users,
+            'tag_counts': tag_counts,
+            'followers': {
+                'avg': self.followers_sum / self.total_users if self.total_users else 0,
+                'max': self.followers_max or 0,
+                'min': self.followers_min or 0,
+                'percentiles': {p: self.percentile(p) for p in PERCENTILES},
+            },
+            'top_users': self.top.items(),
+            'platform_counts': self.platform_counter.most_common(),
+            'tag_top_users': [(tag, count, self.tag_top[tag].items()) for tag, count in tag_counts[:top_tags]],
+        }
+
+
+class TopBuffer:
+    """可更新的 Top-K 缓冲区：保存组内粉丝数最多的至多 2k 个用户
+
+    floor 记录缓冲区外用户排序键的上界：被挤出或没能进入缓冲区的用户的最大排序键
+    （缓冲区外的用户再次出现时会重新经过 offer，所以上界一直成立；组内没有缓冲区外的用户时为 None）。
+    排序键高于 floor 的缓冲区用户一定排在所有缓冲区外用户前面，这样的用户不少于 k 个时
+    前 k 名可以直接从缓冲区得到（O(k)）；缓冲区中的用户粉丝数下降或离开本组，
+    使这样的用户少于 k 个时 stale() 为真，查询时再从用户表重建（O(n)，很少发生）
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.capacity = 2 * k
+        self.entries = {}  # user_id -> 排序键 (followers, -row)
+        self.floor = None
+
+    def _exclude(self, key):
+        if self.floor is None or key > self.floor:
+            self.floor = key
+
+    def offer(self, user_id, key, group_size):
+        """组内用户出现或更新"""
+        if user_id in self.entries or len(self.entries) < self.capacity:
+            self.entries[user_id] = key
+        else:
+            lowest = min(self.entries, key=self.entries.__getitem__)
+            if key > self.entries[lowest]:
+                self._exclude(self.entries.pop(lowest))
+                self.entries[user_id] = key
+            else:
+                self._exclude(key)
+        if group_size <= len(self.entries):
+            self.floor = None  # 整组都在缓冲区中
+
+    def discard(self, user_id, group_size):
+        """用户离开本组"""
+        self.entries.pop(user_id, None)
+        if group_size <= len(self.entries):
+            self.floor = None
+
+    def reset(self, items):
+        """用 (user_id, key) 列表重建"""
+        ranked = heapq.nlargest(self.capacity + 1, items, key=lambda item: item[1])
+        self.entries = dict(ranked[:self.capacity])
+        self.floor = ranked[self.capacity][1] if len(ranked) > self.capacity else None
+
+    def rekey(self, row_of):
+        """用户表的行号变化后（压缩后换到新快照）按新行号重算排序键；
+        floor 的行号部分取上界 0，仍然是缓冲区外用户排序键的上界"""
+        self.entries = {user_id: (key[0], -row_of(user_id)) for user_id, key in self.entries.items()}
+        if self.floor is not None:
+            self.floor = (self.floor[0], 0)
+
+    def _ranked(self):
+        return sorted(self.entries.items(), key=lambda item: item[1], reverse=True)
+
+    def stale(self):
+        """缓冲区已不能确定前 k 名时返回 True"""
+        if self.floor is None:
+            return False
+        return sum(1 for key in self.entries.values() if key > self.floor) < min(self.k, len(self.entries))
+
+    def top(self):
+        """按排序键降序返回前 k 个 user_id"""
+        return [user_id for user_id, _ in self._ranked()[:self.k]]
+
+
+class UpdateRecorder:
+    """后台统计已有数据期间挂在存储上，按顺序记下合并产生的 (old, new)，统计完成后回放"""
+
+    def __init__(self):
+        self.updates = []
+
+    def update(self, old, new):
+        self.updates.append((old, new))
+
+
+class LiveStats:
+    @classmethod
+    def attach(cls, store, top_k=TOP_K, tag_top_k=TAG_TOP_K):
+        """统计存储中的已有数据并挂到存储上，只在拷贝用户表和回放时短暂持有存储锁
+
+        在锁内拷贝用户表的各列（与 compact 相同）并换上 UpdateRecorder，在锁外扫描拷贝，
+        最后在锁内回放扫描期间合并的用户，再换成 LiveStats
+        """
+        with store.lock:
+            table = store.users.snapshot()
+            recorder = store.stats = UpdateRecorder()
+        stats = cls(table, top_k, tag_top_k)
+        with store.lock:
+            stats.table = store.users  # 之后取回 Top 用户和重建缓冲区都用存储中的表
+            for old, new in recorder.updates:
+                stats.update(old, new)
+            store.stats = stats
+        return stats
+
+    def __init__(self, table, top_k=TOP_K, tag_top_k=TAG_TOP_K):
+        self.table = table  # 存储中的 UserTable，用于取回 Top 用户和重建缓冲区
+        self.top_k = top_k
+        self.tag_top_k = tag_top_k
+        self.rebuild()
+
+    def rebuild(self):
+        """从用户表重新计算全部统计（启动时调用一次）"""
+        self.total_users = 0
+        self.tag_counter = Counter()
+        self.platform_counter = Counter()
+        self.histogram = [0] * 65  # 按 followers.bit_length() 分桶: 0, 1, 2-3, 4-7, ...
+        self.followers_sum = 0
+        self.top = TopBuffer(self.top_k)
+        self.tag_top = {}
+        for row, user in enumerate(self.table.values()):
+            self._add(user, row)  # values() 按行号顺序返回，不需要再查索引（拷贝出的表没有索引）
+
+    def renumber(self):
+        """用户表的行号变化后调用，只重算缓冲区中的排序键（O(缓冲区大小)）"""
+        for buffer in (self.top, *self.tag_top.values()):
+            buffer.rekey(self.table.row_of)
+
+    @staticmethod
+    def _bucket(followers):
+        return min(max(followers, 0).bit_length(), 64)
+
+    def _sort_key(self, user, row=None):
+        if row is None:
+            row = self.table.row_of(user['user_id'])
+        return (user.get('followers', 0), -row)
+
+    def _add(self, user, row=None):
+        followers = user.get('followers', 0)
+        self.total_users += 1
+        self.followers_sum += followers
+        self.histogram[self._bucket(followers)] += 1
+        self.platform_counter[user.get('platform', 0)] += 1
+
+        key = self._sort_key(user, row)
+        self.top.offer(user['user_id'], key, self.total_users)
+        for tag in user.get('user_tags', []):
+            self.tag_counter[tag] += 1
+            top = self.tag_top.get(tag)
+            if top is None:
+                top = self.tag_top[tag] = TopBuffer(self.tag_top_k)
+            top.offer(user['user_id'], key, self.tag_counter[tag])
+
+    def update(self, old, new):
+        """合并一个用户后调用：old 为合并前的记录（新用户为 None），按差值修正统计"""
+        if old is None:
+            self._add(new)
+            return
+        if old == new:
+            return
+
+        user_id = new['user_id']
+        old_followers = old.get('followers', 0)
+        new_followers = new.get('followers', 0)
+        self.followers_sum += new_followers - old_followers
+        self.histogram[self._bucket(old_followers)] -= 1
+        self.histogram[self._bucket(new_followers)] += 1
+        self.platform_counter[old.get('platform', 0)] -= 1
+        self.platform_counter[new.get('platform', 0)] += 1
+        self.platform_counter += Counter()  # 去掉计数为 0 的项
+
+        key = self._sort_key(new)
+        self.top.offer(user_id, key, self.total_users)
+
+        old_tags = set(old.get('user_tags', []))
+        new_tags = set(new.get('user_tags', []))
+        for tag in old_tags - new_tags:
+            self.tag_counter[tag] -= 1
+            self.tag_top[tag].discard(user_id, self.tag_counter[tag])
+            if self.tag_counter[tag] == 0:
+                del self.tag_counter[tag]
+                del self.tag_top[tag]
+        for tag in new_tags:
+            if tag not in old_tags:
+                self.tag_counter[tag] += 1
+            top = self.tag_top.get(tag)
+            if top is None:
+                top = self.tag_top[tag] = TopBuffer(self.tag_top_k)
+            top.offer(user_id, key, self.tag_counter[tag])
+
+    def _top_users(self, buffer, tag=None):
+        if buffer.stale():
+            # 罕见情况：前几名的粉丝数下降或离开标签，扫描用户表重建
+            buffer.reset((user['user_id'], self._sort_key(user)) for user in self.table.values()
+                         if tag is None or tag in user.get('user_tags', []))
+        return [self.table[user_id] for user_id in buffer.top()]
+
+    def percentile(self, p):
+        """粉丝数第 p 百分位所在分桶的上界（近似值）"""
+        if self.total_users == 0:
+            return 0
+        rank = max(1, math.ceil(p / 100 * self.total_users))
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if seen >= rank:
+                return (1 << bucket) - 1
+        return 0
+
+    def report(self, top_tags=TOP_TAGS):
+        """当前统计，格式与 UserStats.report() 相同（分位数和最小值为分桶近似值）
+
+        开销与用户总数无关（标签数 + 各 Top 缓冲区大小）；只有某个 Top 缓冲区失效时（见 TopBuffer）
+        才会扫描一次用户表重建该缓冲区
+        """
+        tag_counts = self.tag_counter.most_common()
+        top_users = self._top_users(self.top)
+        lowest = next((bucket for bucket, count in enumerate(self.histogram) if count), 0)
+        return {
+            'total_users': self.total_users,
+            'tag_counts': tag_counts,
+            'followers': {
+                'avg': self.followers_sum / self.total_users if self.total_users else 0,
+                'max': top_users[0].get('followers', 0) if top_users else 0,
+                'min': (1 << lowest) >> 1,
+                'percentiles': {p: self.percentile(p) for p in PERCENTILES},
+                'approximate': True,
+            },
+            'top_users': top_users,
+            'platform_counts': self.platform_counter.most_common(),
+            'tag_top_users': [(tag, count, self._top_users(self.tag_top[tag], tag))
+                              for tag, count in tag_counts[:top_tags]],
+        }
+
+    def summary_line(self, top_tags=3):
+        """一行实时统计摘要"""
+        tags = ' / '.join(f"{tag} {count}" for tag, count in self.tag_counter.most_common(top_tags))
+        avg = self.followers_sum / self.total_users if self.total_users else 0
+        return (f"📊 实时统计: {self.total_users} 个用户 | {tags} | "
+                f"平均粉丝 {avg:.0f}，P50 ≤ {self.percentile(50)}，P90 ≤ {self.percentile(90)}")
@@ -0,0 +1,181 @@
+"""
+GMGN 紧凑用户表 - 替代 {user_id: user_dict} 的内存存储
+followers / platform / followed 存在 array 列中，标签映射为小整数 ID 并以位集合存储，
+user_id 能转成整数时按整数保存；读写时在边界上与原来的字典格式互相转换，
+每个用户的内存开销从约 1KB 降到约 200 字节
+"""
+from array import array
+
+# 可以压缩存储的标准字段（与接口返回的字段顺序一致）
+STANDARD_FIELDS = ('handle', 'user_id', 'user_tags', 'platform', 'followers', 'followed')
+_STANDARD_KEYS = frozenset(STANDARD_FIELDS)
+
+
+def _user_key(user_id):
+    """user_id 是规范的十进制数字串（只含 ASCII 数字）时转成整数保存"""
+    if isinstance(user_id, str) and user_id.isascii() and user_id.isdecimal() and (user_id == '0' or user_id[0] != '0'):
+        return int(user_id)
+    return user_id
+
+
+def _user_id(key):
+    return str(key) if isinstance(key, int) else key
+
+
+class UserTable:
+    def __init__(self):
+        self.index = {}  # user_id 键 -> 行号
+        self.keys_by_row = []  # 行号 -> user_id 键
+        self.handles = []
+        self.followers = array('q')
+        self.platform = array('b')
+        self.followed = array('b')
+        self.tag_bits = array('Q')  # 超过 64 个标签时换成 list
+        self.tag_names = []  # 标签 ID -> 标签名
+        self.tag_ids = {}  # 标签名 -> 标签 ID
+        self.tag_order = {}  # 行号 -> 标签元组（少数标签顺序与 ID 顺序不一致的用户）
+        self.records = {}  # 行号 -> 原始字典（字段不标准、无法压缩的用户）
+
+    def tag_id(self, tag):
+        """返回标签 ID，新标签自动分配"""
+        tag_id = self.tag_ids.get(tag)
+        if tag_id is None:
+            tag_id = len(self.tag_names)
+            self.tag_names.append(tag)
+            self.tag_ids[tag] = tag_id
+            if tag_id == 64 and isinstance(self.tag_bits, array):
+                self.tag_bits = list(self.tag_bits)
+        return tag_id
+
+    def tags_of(self, bits):
+        """位集合 -> 标签名列表（按 ID 顺序）"""
+        tags = []
+        tag_id = 0
+        while bits:
+            if bits & 1:
+                tags.append(self.tag_names[tag_id])
+            bits >>= 1
+            tag_id += 1
+        return tags
+
+    @staticmethod
+    def _compressible(user):
+        return (user.keys() == _STANDARD_KEYS
+                and isinstance(user['handle'], str)
+                and isinstance(user['user_tags'], list)
+                and type(user['followers']) is int and -2 ** 63 <= user['followers'] < 2 ** 63
+                and type(user['platform']) is int and -128 <= user['platform'] < 128
+                and type(user['followed']) is bool)
+
+    def _write_row(self, row, user):
+        self.records.pop(row, None)
+        self.tag_order.pop(row, None)
+
+        if not self._compressible(user):
+            # 原样保存，读取时返回原始字典
+            self.records[row] = user
+            self.handles[row] = user.get('handle')
+            self.followers[row] = user.get('followers', 0) if type(user.get('followers', 0)) is int else 0
+            self.platform[row] = 0
+            self.followed[row] = 0
+            self.tag_bits[row] = 0
+            return
+
+        bits = 0
+        tag_ids = []
+        for tag in user['user_tags']:
+            tag_id = self.tag_id(tag)
+            bits |= 1 << tag_id
+            tag_ids.append(tag_id)
+        if tag_ids != sorted(set(tag_ids)):
+            self.tag_order[row] = tuple(user['user_tags'])
+
+        self.handles[row] = user['handle']
+        self.followers[row] = user['followers']
+        self.platform[row] = user['platform']
+        self.followed[row] = user['followed']
+        self.tag_bits[row] = bits
+
+    def row_user(self, row):
+        """把一行还原成原来的字典格式"""
+        record = self.records.get(row)
+        if record is not None:
+            return record
+
+        tags = self.tag_order.get(row)
+        return {
+            'handle': self.handles[row],
+            'user_id': _user_id(self.keys_by_row[row]),
+            'user_tags': list(tags) if tags is not None else self.tags_of(self.tag_bits[row]),
+            'platform': self.platform[row],
+            'followers': self.followers[row],
+            'followed': bool(self.followed[row]),
+        }
+
+    # ---- 字典接口，存储层可以像使用 users_dict 一样使用 ----
+
+    def __len__(self):
+        return len(self.keys_by_row)
+
+    def __contains__(self, user_id):
+        return _user_key(user_id) in self.index
+
+    def __getitem__(self, user_id):
+        return self.row_user(self.index[_user_key(user_id)])
+
+    def row_of(self, user_id):
+        """user_id 对应的行号（即首次出现的顺序）"""
+        return self.index[_user_key(user_id)]
+
+    def get(self, user_id, default=None):
+        row = self.index.get(_user_key(user_id))
+        return default if row is None else self.row_user(row)
+
+    def __setitem__(self, user_id, user):
+        key = _user_key(user_id)
+        row = self.index.get(key)
+        if row is None:
+            row = len(self.keys_by_row)
+            self.index[key] = row
+            self.keys_by_row.append(key)
+            self.handles.append(None)
+            self.followers.append(0)
+            self.platform.append(0)
+            self.followed.append(0)
+            self.tag_bits.append(0)
+        self._write_row(row, user)
+
+    def __iter__(self):
+        return (_user_id(key) for key in self.keys_by_row)
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+        return (self.row_user(row) for row in range(len(self.keys_by_row)))
+
+    def items(self):
+        return ((_user_id(key), self.row_user(row)) for row, key in enumerate(self.keys_by_row))
+
+    # ---- 快照 ----
+
+    def snapshot(self):
+        """拷贝当前各列（不含 user_id 索引，也不还原字典），用于后台写快照"""
+        table = UserTable.__new__(UserTable)
+        table.index = None
+        table.keys_by_row = self.keys_by_row.copy()
+        table.handles = self.handles.copy()
+        table.followers = array('q', self.followers)
+        table.platform = array('b', self.platform)
+        table.followed = array('b', self.followed)
+        table.tag_bits = self.tag_bits[:]
+        table.tag_names = self.tag_names.copy()
+        table.tag_ids = self.tag_ids.copy()
+        table.tag_order = self.tag_order.copy()
+        table.records = self.records.copy()
+        return table
+
+    def sorted_users(self):
+        """按 followers 降序逐个返回用户字典（粉丝数相同时保持插入顺序）"""
+        rows = sorted(range(len(self.keys_by_row)), key=self.followers.__getitem__, reverse=True)
+        return (self.row_user(row) for row in rows)
@@ -0,0 +1,91 @@
+"""
+GMGN 浏览器热启动 - 持久化的浏览器用户数据目录 + 启动耗时记录
+使用 launch_persistent_context 时 Cookie、Cloudflare 验证结果、localStorage 和 HTTP 缓存
+都保存在 BROWSER_PROFILE_DIR 中，下次启动不用重新下载 gmgn.ai 的脚本、重新过验证；
+StartupTimer 记录启动浏览器、页面就绪和捕获到第一个请求的耗时，每次运行以一行 JSON
+追加到 startup_times.jsonl，便于比较冷启动和热启动
+"""
+import time
+from datetime import datetime
+from pathlib import Path
+from statistics import median
+from json_codec import dumps, loads
+
+# 浏览器用户数据目录
+BROWSER_PROFILE_DIR = 'browser_profile'
+# 热启动时自动打开的页面
+WARM_START_URL = 'https://gmgn.ai/'
+# 启动耗时记录
+STARTUP_LOG = 'startup_times.jsonl'
+
+# 用户数据目录中的标记文件，存在时说明之前成功用该目录启动过
+_MARKER = '.gmgn_profile'
+
+
+def prepare_profile(profile_dir=BROWSER_PROFILE_DIR):
+    """创建用户数据目录，返回 (目录, 是否已有之前运行留下的数据)"""
+    profile_dir = Path(profile_dir)
+    profile_dir.mkdir(parents=True, exist_ok=True)
+    return profile_dir, (profile_dir / _MARKER).exists()
+
+
+def mark_profile(profile_dir=BROWSER_PROFILE_DIR):
+    """浏览器成功启动后标记目录，下次启动算作热启动"""
+    (Path(profile_dir) / _MARKER).write_text(datetime.now().isoformat(), encoding='utf-8')
+
+
+class StartupTimer:
+    def __init__(self, mode, log_file=STARTUP_LOG):
+        self.mode = mode  # cold（临时上下文）/ profile-cold（第一次使用用户数据目录）/ warm
+        self.log_file = log_file
+        self.start = time.perf_counter()
+        self.marks = {}  # 阶段 -> 自启动以来的秒数
+        self.recorded = False
+
+    def mark(self, stage):
+        self.marks[stage] = round(time.perf_counter() - self.start, 3)
+        return self.marks[stage]
+
+    def first_capture(self):
+        """记录第一次捕获并写入日志，返回耗时（秒）；只在第一次调用时生效"""
+        if self.recorded:
+            return None
+        self.recorded = True
+        elapsed = self.mark('first_capture')
+        with open(self.log_file, 'a', encoding='utf-8') as f:
+            f.write(dumps({'timestamp': datetime.now().isoformat(), 'mode': self.mode, **self.marks}) + '\n')
+        return elapsed
+
+    def describe(self):
+        """一行说明，例如: 热启动: 启动浏览器 1.2s / 页面就绪 2.5s"""
+        names = {'launch': '启动浏览器', 'ready': '页面就绪', 'first_capture': '第一次捕获'}
+        modes = {'cold': '冷启动', 'profile-cold': '冷启动（新建用户数据目录）', 'warm': '热启动'}
+        stages = ' / '.join(f"{names.get(stage, stage)} {seconds:.1f}s" for stage, seconds in self.marks.items())
+        return f"{modes.get(self.mode, self.mode)}: {stages}"
+
+
+def summarize(log_file=STARTUP_LOG):
+    """按启动方式汇总 startup_times.jsonl：运行次数和各阶段耗时的中位数"""
+    runs = {}
+    if Path(log_file).exists():
+        with open(log_file, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    entry = loads(line)
+                    runs.setdefault(entry.get('mode'), []).append(entry)
+
+    if not runs:
+        print(f"{log_file} 中还没有记录（使用 python gmgn_crawler_v2.py --warm-start 运行后生成）")
+        return
+    print(f"{'启动方式':<14} {'次数':>4} {'启动浏览器':>10} {'页面就绪':>10} {'第一次捕获':>10}（中位数，秒）")
+    for mode, entries in runs.items():
+        cells = []
+        for stage in ('launch', 'ready', 'first_capture'):
+            values = [entry[stage] for entry in entries if stage in entry]
+            cells.append(f"{median(values):>10.1f}" if values else f"{'-':>10}")
+        print(f"{mode:<14} {len(entries):>4} {' '.join(cells)}")
+
+
+if __name__ == '__main__':
+    import sys
+    summarize(sys.argv[1] if len(sys.argv) > 1 else STARTUP_LOG)